@@ -124,6 +124,21 @@ def render_diff_summary_with_values(engine, change_event_id: str, diff_summary:
         c4.metric("Rejected", rejected)
         c5.metric("Hash backfilled", backfilled)
 
+        dq_counts = d.get("dq_reject_counts") or {}
+        if dq_counts:
+            st.caption(
+                f"{int(d.get('dq_rejected_count', 0) or 0):,} row(s) rejected by data-quality rules: "
+                + ", ".join(f"{code} ({n:,})" for code, n in dq_counts.items())
+            )
+
+        dup_pks = int(d.get("duplicate_pk_count", 0) or 0)
+        if dup_pks:
+            st.caption(
+                f"{dup_pks:,} PK(s) appeared more than once in the file; "
+                f"{int(d.get('duplicate_rows_dropped', 0) or 0):,} row(s) dropped "
+                f"(policy: {d.get('duplicate_policy', 'last')}). Sample: {d.get('duplicate_pks_sample', [])}"
+            )
+
         if updated == 0:
             st.caption("No updates.")
             return
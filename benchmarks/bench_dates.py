@@ -0,0 +1,91 @@
+# benchmarks/bench_dates.py
+"""
+Date parsing throughput: src.dates vs the per-row paths it replaced.
+
+    python benchmarks/bench_dates.py [--rows 300000] [--file data/raw/budget_vs_actual.csv]
+
+The "before" functions are copies of the pre-dates.py code paths:
+transform_*._to_month_start (dateutil per row via .apply) and the staging
+date column in run_import (pd.to_datetime without a format).
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import pandas as pd
+from dateutil import parser
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.dates import clear_format_cache, month_start_strings, to_dates  # noqa: E402
+
+
+def _old_month_start(x):
+    if pd.isna(x):
+        return None
+    try:
+        dt = parser.parse(str(x))
+        return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0).date().isoformat()
+    except Exception:
+        return None
+
+
+def old_month_starts(s: pd.Series) -> pd.Series:
+    return s.apply(_old_month_start)
+
+
+def old_staging_dates(s: pd.Series) -> pd.Series:
+    return pd.to_datetime(s, errors="coerce").dt.date
+
+
+def new_month_starts(s: pd.Series) -> pd.Series:
+    clear_format_cache()
+    return month_start_strings(s, source="bench.Date")
+
+
+def new_staging_dates(s: pd.Series) -> pd.Series:
+    clear_format_cache()
+    return to_dates(s, source="bench.Date")
+
+
+def _time(func: Callable[[pd.Series], pd.Series], s: pd.Series, repeat: int) -> Tuple[float, pd.Series]:
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = func(s)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--file", default=str(ROOT / "data" / "raw" / "budget_vs_actual.csv"))
+    ap.add_argument("--column", default="Date")
+    ap.add_argument("--rows", type=int, default=300_000)
+    ap.add_argument("--repeat", type=int, default=3, help="Best of N for the new paths.")
+    args = ap.parse_args(argv)
+
+    base = pd.read_csv(args.file, dtype=str, usecols=[args.column])[args.column]
+    reps = -(-args.rows // len(base))
+    s = pd.Series(pd.concat([base] * reps, ignore_index=True)[: args.rows], name=args.column)
+    print(f"{len(s):,} rows, {s.nunique():,} distinct values ({args.file})")
+
+    cases = [
+        ("month start", old_month_starts, new_month_starts),
+        ("staging date", old_staging_dates, new_staging_dates),
+    ]
+    print(f"{'path':<14}{'before s':>10}{'after s':>10}{'speedup':>10}  same")
+    for name, old, new in cases:
+        t_old, out_old = _time(old, s, 1)
+        t_new, out_new = _time(new, s, args.repeat)
+        print(f"{name:<14}{t_old:>10.2f}{t_new:>10.3f}{t_old / t_new:>9.0f}x  {out_old.tolist() == out_new.tolist()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# benchmarks/bench_gold_columnar.py
+"""
+Gold fact as CSV vs Parquet vs Arrow IPC: file size, export time and reader timings.
+
+    python benchmarks/bench_gold_columnar.py [--rows 1490000] [--url postgresql+psycopg2://...]
+
+Builds a scratch schema (sql/schema.sql + the compact fact table) holding about --rows
+synthetic fact rows (whole months of every department x category x scenario x source), then:
+  - exports the gold fact with export_gold_fact_to_csv and export_gold_columnar (parquet, arrow),
+    reporting time, size and the process's peak RSS after each
+  - reads each file back: full scan to pandas, one year of months, sum of amount by department
+Reader timings are best of --repeat. Needs pyarrow. The schema is dropped afterwards unless --keep.
+"""
+from __future__ import annotations
+
+import argparse
+import resource
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.db import load_db_config, make_engine  # noqa: E402
+from src.ddl import apply_schema  # noqa: E402
+from src.export import export_gold_columnar, export_gold_fact_to_csv  # noqa: E402
+from src.fact_dims import ensure_fact_storage  # noqa: E402
+from src.gold_columnar import require_pyarrow  # noqa: E402
+
+SCHEMA = "bench_gold_columnar"
+DEPARTMENTS, CATEGORIES, SCENARIOS, SOURCES = 20, 50, 2, 2
+GOLD_DTYPES = {c: "category" for c in ("department", "category", "scenario", "source")}
+
+
+def _mb(n_bytes: int) -> str:
+    return f"{n_bytes / 1e6:,.1f} MB"
+
+
+def _peak_mb() -> str:
+    # ru_maxrss is KiB on Linux
+    return f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MB"
+
+
+def _best(func: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def build(engine: Engine, rows: int) -> int:
+    """Fill the scratch fact table; returns the number of months (the first is 1990-01)."""
+    per_month = DEPARTMENTS * CATEGORIES * SCENARIOS * SOURCES
+    months = max(1, round(rows / per_month))
+    apply_schema(engine, ROOT / "sql" / "schema.sql")
+    ensure_fact_storage(engine)
+    with engine.begin() as conn:
+        for table, column, n, prefix in (
+            ("dim_department", "department", DEPARTMENTS, "Dept"),
+            ("dim_category", "category", CATEGORIES, "Category"),
+            ("dim_scenario", "scenario", SCENARIOS, "Scenario"),
+            ("dim_source", "source", SOURCES, "source"),
+        ):
+            conn.execute(
+                text(f"INSERT INTO {table} ({column}) SELECT :p || '_' || i FROM generate_series(1, :n) AS i"),
+                {"p": prefix, "n": n},
+            )
+        conn.execute(
+            text(
+                """
+                INSERT INTO fact_finance_compact
+                  (month_start, department_id, category_id, scenario_id, source_id, amount, row_count)
+                SELECT (DATE '1990-01-01' + make_interval(months => m))::date,
+                       d.department_id, c.category_id, s.scenario_id, o.source_id,
+                       round((random() * 2000000 - 200000)::numeric, 2), 1
+                FROM generate_series(0, :months - 1) AS m
+                CROSS JOIN dim_department d CROSS JOIN dim_category c
+                CROSS JOIN dim_scenario s CROSS JOIN dim_source o
+                """
+            ),
+            {"months": months},
+        )
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE fact_finance_compact"))
+    return months
+
+
+def export(engine: Engine, out_dir: Path) -> Dict[str, Path]:
+    paths = {fmt: out_dir / f"gold_fact_finance.{fmt}" for fmt in ("csv", "parquet", "arrow")}
+    print("export")
+    for fmt, path in paths.items():
+        t0 = time.perf_counter()
+        if fmt == "csv":
+            export_gold_fact_to_csv(engine, path)
+        else:
+            export_gold_columnar(engine, path, fmt)
+        elapsed = time.perf_counter() - t0
+        print(f"  {fmt:<8} {elapsed:>7.1f}s  {_mb(path.stat().st_size):>10}   peak RSS so far {_peak_mb()}")
+    return paths
+
+
+def report(paths: Dict[str, Path], first_year: int, repeat: int) -> None:
+    pa = require_pyarrow()
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    def arrow_table():
+        with pa.memory_map(str(paths["arrow"])) as source:
+            return pa.ipc.open_file(source).read_all()
+
+    lo, hi = date(first_year, 1, 1), date(first_year, 12, 1)
+
+    def csv_year():
+        df = pd.read_csv(paths["csv"], dtype=GOLD_DTYPES, parse_dates=["month_start"])
+        return df[(df["month_start"] >= pd.Timestamp(lo)) & (df["month_start"] <= pd.Timestamp(hi))]
+
+    def arrow_year():
+        t = arrow_table()
+        return t.filter(pc.and_(pc.greater_equal(t["month_start"], lo), pc.less_equal(t["month_start"], hi))).to_pandas()
+
+    def arrow_sum(t):
+        return t.group_by("department").aggregate([("amount", "sum")]).to_pandas()
+
+    cases = [
+        (
+            "full scan to pandas",
+            lambda: pd.read_csv(paths["csv"], dtype=GOLD_DTYPES, parse_dates=["month_start"]),
+            lambda: pq.read_table(paths["parquet"]).to_pandas(),
+            lambda: arrow_table().to_pandas(),
+        ),
+        (
+            f"one year ({first_year})",
+            csv_year,
+            lambda: pq.read_table(paths["parquet"], filters=[("month_start", ">=", lo), ("month_start", "<=", hi)]).to_pandas(),
+            arrow_year,
+        ),
+        (
+            "sum by department",
+            lambda: pd.read_csv(paths["csv"], usecols=["department", "amount"], dtype=GOLD_DTYPES)
+            .groupby("department", observed=True)["amount"].sum(),
+            lambda: arrow_sum(pq.read_table(paths["parquet"], columns=["department", "amount"])),
+            lambda: arrow_sum(arrow_table().select(["department", "amount"])),
+        ),
+    ]
+    print()
+    print(f"read (best of {repeat})      {'csv':>9}{'parquet':>10}{'arrow':>9}")
+    for name, *funcs in cases:
+        ms = [_best(f, repeat) * 1000 for f in funcs]
+        print(f"  {name:<24}{ms[0]:>7.0f}ms{ms[1]:>8.0f}ms{ms[2]:>7.0f}ms")
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--url", default=None, help="SQLAlchemy URL (default: config/db.yml)")
+    ap.add_argument("--rows", type=int, default=1_490_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out-dir", default=None, help="Where the exported files go (default: a temp dir).")
+    ap.add_argument("--keep", action="store_true", help=f"Keep the {SCHEMA} schema.")
+    args = ap.parse_args(argv)
+    require_pyarrow()
+
+    admin = create_engine(args.url, future=True) if args.url else make_engine(load_db_config(ROOT / "config" / "db.yml"))
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    # search_path in the URL: every pooled connection (and raw COPY connection) sees the scratch schema
+    engine = create_engine(
+        make_url(admin.url.render_as_string(hide_password=False)).update_query_dict({"options": f"-csearch_path={SCHEMA}"}),
+        future=True,
+    )
+    try:
+        t0 = time.perf_counter()
+        build(engine, args.rows)
+        with engine.begin() as conn:
+            n = conn.execute(text("SELECT count(*) FROM fact_finance_compact")).scalar()
+        print(f"{n:,} fact rows (built in {time.perf_counter() - t0:.0f}s)")
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = export(engine, Path(args.out_dir or tmp))
+            report(paths, 1991, args.repeat)
+    finally:
+        engine.dispose()
+        if not args.keep:
+            with admin.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        admin.dispose()
+
+
+if __name__ == "__main__":
+    main()
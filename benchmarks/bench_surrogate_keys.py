@@ -0,0 +1,183 @@
+# benchmarks/bench_surrogate_keys.py
+"""
+Text PK vs BIGINT surrogate key (etl_key_dictionary / transaction_sk) on a large staging table.
+
+    python benchmarks/bench_surrogate_keys.py [--rows 10000000] [--url postgresql+psycopg2://...]
+
+Builds a scratch schema holding a stg_budget_transactions-shaped table with both keys
+(TXN-style text PK and a unique BIGINT surrogate) plus the dictionary the surrogate needs,
+then reports:
+  - index size: text PK vs bigint unique index (and the dictionary's own footprint)
+  - join: an incoming batch joined to staging on the text key vs the bigint key
+  - merge fetch: `pk = ANY(:ids)` chunks (merge_upsert's fetch) on text vs bigint
+Timings are best of --repeat on a warm cache. The schema is dropped afterwards unless --keep.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.db import load_db_config, make_engine  # noqa: E402
+
+SCHEMA = "bench_surrogate"
+
+
+def _mb(n_bytes: int) -> str:
+    return f"{n_bytes / 2**20:,.0f} MB"
+
+
+def _best(func: Callable[[], None], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def build(engine: Engine, rows: int, batch_rows: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"SET LOCAL search_path TO {SCHEMA}"))
+        conn.execute(text("""
+            CREATE TABLE etl_key_dictionary (
+              key_space TEXT NOT NULL,
+              external_id TEXT NOT NULL,
+              surrogate_id BIGINT NOT NULL,
+              PRIMARY KEY (key_space, external_id)
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO etl_key_dictionary (key_space, external_id, surrogate_id)
+            SELECT 'stg_budget_transactions.transaction_id', 'TXN' || (100000 + i), i
+            FROM generate_series(1, :rows) AS i
+        """), {"rows": rows})
+        conn.execute(text("CREATE UNIQUE INDEX etl_key_dictionary_surrogate_id_key ON etl_key_dictionary (surrogate_id)"))
+
+        conn.execute(text("""
+            CREATE TABLE stg (
+              transaction_id TEXT NOT NULL,
+              transaction_sk BIGINT NOT NULL,
+              date DATE,
+              budget_amount NUMERIC(18,2),
+              actual_amount NUMERIC(18,2)
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO stg
+            SELECT 'TXN' || (100000 + i), i, DATE '2020-01-01' + (i % 2000), (i % 100000) * 0.01, (i % 70000) * 0.01
+            FROM generate_series(1, :rows) AS i
+        """), {"rows": rows})
+        conn.execute(text("ALTER TABLE stg ADD CONSTRAINT stg_pkey PRIMARY KEY (transaction_id)"))
+        conn.execute(text("CREATE UNIQUE INDEX stg_sk ON stg (transaction_sk)"))
+
+        # Incoming batch: a random sample of existing keys, carried with both key forms
+        conn.execute(text("""
+            CREATE TABLE incoming AS
+            SELECT transaction_id, transaction_sk FROM stg
+            WHERE transaction_sk IN (SELECT (random() * (:rows - 1))::bigint + 1 FROM generate_series(1, :n))
+        """), {"rows": rows, "n": batch_rows})
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.stg"))
+        conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.incoming"))
+        conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.etl_key_dictionary"))
+
+
+def report(engine: Engine, rows: int, repeat: int, fetch_keys: int, fetch_chunk: int) -> None:
+    with engine.connect() as conn:
+        conn.execute(text(f"SET search_path TO {SCHEMA}"))
+        size = lambda rel: conn.execute(text("SELECT pg_relation_size(CAST(:r AS regclass))"), {"r": rel}).scalar()
+        total = lambda rel: conn.execute(text("SELECT pg_total_relation_size(CAST(:r AS regclass))"), {"r": rel}).scalar()
+        collation = conn.execute(text("SELECT datcollate FROM pg_database WHERE datname = current_database()")).scalar()
+        batch = conn.execute(text("SELECT count(*) FROM incoming")).scalar()
+
+        pk_size, sk_size = size("stg_pkey"), size("stg_sk")
+        print(f"{rows:,} staging rows, incoming batch {batch:,} rows, collation {collation}, "
+              f"PostgreSQL {conn.execute(text('SHOW server_version')).scalar()}")
+        print()
+        print("index size")
+        print(f"  text PK (transaction_id)          {_mb(pk_size):>10}")
+        print(f"  bigint unique (transaction_sk)    {_mb(sk_size):>10}   {1 - sk_size / pk_size:.0%} smaller")
+        print(f"  etl_key_dictionary (table + idx)  {_mb(total('etl_key_dictionary')):>10}   (cost of the surrogate layer)")
+
+        def join(col: str) -> Callable[[], None]:
+            sql = text(f"SELECT count(*), sum(s.actual_amount) FROM incoming i JOIN stg s ON s.{col} = i.{col}")
+            return lambda: conn.execute(sql).one()
+
+        print()
+        print(f"join incoming -> staging (best of {repeat})")
+        t_text, t_sk = _best(join("transaction_id"), repeat), _best(join("transaction_sk"), repeat)
+        print(f"  on text key                       {t_text:>9.3f}s")
+        print(f"  on bigint key                     {t_sk:>9.3f}s   {t_text / t_sk:.2f}x")
+
+        conn.execute(text("SET enable_hashjoin = off"))
+        conn.execute(text("SET enable_mergejoin = off"))
+        t_text_nl, t_sk_nl = _best(join("transaction_id"), repeat), _best(join("transaction_sk"), repeat)
+        conn.execute(text("RESET enable_hashjoin"))
+        conn.execute(text("RESET enable_mergejoin"))
+        print(f"  on text key, index nested loop    {t_text_nl:>9.3f}s")
+        print(f"  on bigint key, index nested loop  {t_sk_nl:>9.3f}s   {t_text_nl / t_sk_nl:.2f}x")
+
+        rng = random.Random(7)
+        sks = rng.sample(range(1, rows + 1), fetch_keys)
+        ids = [f"TXN{100000 + i}" for i in sks]
+        fetch_text = text("SELECT * FROM stg WHERE transaction_id = ANY(:ids)")
+        fetch_sk = text("SELECT * FROM stg WHERE transaction_sk = ANY(:ids)")
+
+        def fetch(sql, keys: List) -> Callable[[], None]:
+            def run() -> None:
+                for i in range(0, len(keys), fetch_chunk):
+                    conn.execute(sql, {"ids": keys[i : i + fetch_chunk]}).fetchall()
+            return run
+
+        print()
+        print(f"merge fetch, {fetch_keys:,} keys in chunks of {fetch_chunk:,} (best of {repeat})")
+        t_text, t_sk = _best(fetch(fetch_text, ids), repeat), _best(fetch(fetch_sk, sks), repeat)
+        print(f"  text = ANY(text[])                {t_text:>9.3f}s")
+        print(f"  bigint = ANY(bigint[])            {t_sk:>9.3f}s   {t_text / t_sk:.2f}x")
+
+        resolve = text(
+            "SELECT external_id, surrogate_id FROM etl_key_dictionary "
+            "WHERE key_space = 'stg_budget_transactions.transaction_id' AND external_id = ANY(:ids)"
+        )
+        t_resolve = _best(fetch(resolve, ids), repeat)
+        print(f"  (resolve_surrogate_keys lookup    {t_resolve:>9.3f}s   paid once per import for the same keys)")
+
+
+def main(argv: List[str] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--url", default=None, help="SQLAlchemy URL (default: config/db.yml)")
+    ap.add_argument("--rows", type=int, default=10_000_000)
+    ap.add_argument("--batch-rows", type=int, default=1_000_000, help="Incoming rows joined to staging.")
+    ap.add_argument("--fetch-keys", type=int, default=200_000)
+    ap.add_argument("--fetch-chunk", type=int, default=20_000, help="merge_upsert's fetch chunk size.")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--keep", action="store_true", help=f"Keep the {SCHEMA} schema.")
+    args = ap.parse_args(argv)
+
+    engine = create_engine(args.url, future=True) if args.url else make_engine(load_db_config(ROOT / "config" / "db.yml"))
+    t0 = time.perf_counter()
+    build(engine, args.rows, args.batch_rows)
+    print(f"(built in {time.perf_counter() - t0:.0f}s)")
+    try:
+        report(engine, args.rows, args.repeat, args.fetch_keys, args.fetch_chunk)
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -48,6 +48,22 @@ CREATE TABLE IF NOT EXISTS etl_conflicts (
   resolved_at TIMESTAMPTZ
 );
 
+-- Rows rejected by data-quality rules (one row per failed rule)
+CREATE TABLE IF NOT EXISTS etl_rejected_rows (
+  reject_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  change_event_id UUID NOT NULL REFERENCES etl_change_events(change_event_id),
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  table_name TEXT NOT NULL,
+  source_row_num INTEGER,
+  pk TEXT,
+  rule_code TEXT NOT NULL,
+  column_name TEXT,
+  value TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_etl_rejected_rows_event
+  ON etl_rejected_rows(change_event_id);
+
 -- ============================
 -- STAGING TABLES
 -- ============================
@@ -99,6 +115,31 @@ ALTER TABLE stg_budget_transactions
 ALTER TABLE stg_budget_transactions
   ADD COLUMN IF NOT EXISTS source_row_num INTEGER;
 
+-- Written by audit.start_change_event / log_row_change
+ALTER TABLE etl_change_events
+  ADD COLUMN IF NOT EXISTS dry_run BOOLEAN NOT NULL DEFAULT false,
+  ADD COLUMN IF NOT EXISTS date_min DATE,
+  ADD COLUMN IF NOT EXISTS date_max DATE;
+
+ALTER TABLE etl_row_changes
+  ALTER COLUMN row_change_id SET DEFAULT gen_random_uuid();
+
+-- Surrogate keys: external text IDs -> BIGINT, used by merge for fetches/joins.
+-- The external ID stays the table's PK and is what audit rows record.
+CREATE TABLE IF NOT EXISTS etl_key_dictionary (
+  key_space TEXT NOT NULL,
+  external_id TEXT NOT NULL,
+  surrogate_id BIGSERIAL NOT NULL UNIQUE,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (key_space, external_id)
+);
+
+ALTER TABLE stg_budget_transactions
+  ADD COLUMN IF NOT EXISTS transaction_sk BIGINT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_stg_budget_transactions_sk
+  ON stg_budget_transactions(transaction_sk);
+
 -- Helpful indexes for diffing/diagnostics
 CREATE INDEX IF NOT EXISTS idx_stg_sales_orders_row_hash
   ON stg_sales_orders(row_hash);
@@ -106,20 +147,141 @@ CREATE INDEX IF NOT EXISTS idx_stg_sales_orders_row_hash
 CREATE INDEX IF NOT EXISTS idx_stg_budget_transactions_row_hash
   ON stg_budget_transactions(row_hash);
 
+-- Month-scoped fact rebuilds range-join on these (date >= month AND date < month + 1)
+CREATE INDEX IF NOT EXISTS idx_stg_sales_orders_order_date
+  ON stg_sales_orders(order_date);
+
+CREATE INDEX IF NOT EXISTS idx_stg_budget_transactions_date
+  ON stg_budget_transactions(date);
+
+-- ============================
+-- CATEGORY MAP (config/category_map.csv, loaded by src/category_map.sync_category_map)
+-- Every distinct map file is a version; fact rebuilds apply the latest one
+-- ============================
+CREATE TABLE IF NOT EXISTS category_map_versions (
+  version_id SERIAL PRIMARY KEY,
+  checksum TEXT NOT NULL,
+  source_path TEXT,
+  loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS dim_category_map (
+  version_id INT NOT NULL REFERENCES category_map_versions(version_id),
+  raw_category TEXT NOT NULL,
+  canonical_category TEXT NOT NULL,
+  default_department TEXT,
+  PRIMARY KEY (version_id, raw_category)
+);
+
+CREATE OR REPLACE VIEW category_map_current AS
+SELECT raw_category, canonical_category, default_department
+FROM dim_category_map
+WHERE version_id = (SELECT max(version_id) FROM category_map_versions);
+
 -- ============================
 -- FACT TABLE
+-- Keyed on SMALLINT dimension ids; fact_finance_monthly is a view with the text columns
+-- (created by src/fact_dims.ensure_fact_storage, which also migrates a fact_finance_monthly table)
 -- ============================
-CREATE TABLE IF NOT EXISTS fact_finance_monthly (
+CREATE TABLE IF NOT EXISTS dim_department (
+  department_id SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  department TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS dim_category (
+  category_id SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  category TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS dim_scenario (
+  scenario_id SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  scenario TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS dim_source (
+  source_id SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  source TEXT NOT NULL UNIQUE
+);
+
+-- Staging rows behind each key (row_count) let incremental maintenance drop keys that reach zero rows.
+-- The primary key leads with month_start, so it also serves month-range reads.
+CREATE TABLE IF NOT EXISTS fact_finance_compact (
+  month_start DATE NOT NULL,
+  department_id SMALLINT NOT NULL,
+  category_id SMALLINT NOT NULL,
+  scenario_id SMALLINT NOT NULL,
+  source_id SMALLINT NOT NULL,
+  amount NUMERIC NOT NULL,
+  row_count BIGINT,
+  last_change_event_id UUID,
+  last_updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  CONSTRAINT fact_finance_compact_pkey
+    PRIMARY KEY (month_start, department_id, category_id, scenario_id, source_id)
+);
+
+-- Fact months whose staging rows an import has committed but whose fact update has not.
+-- Written in the merge's transaction, cleared once the fact is up to date; months left
+-- behind by a failed import are rebuilt by the next one.
+CREATE TABLE IF NOT EXISTS fact_pending_months (
+  change_event_id UUID NOT NULL,
   month_start DATE NOT NULL,
+  PRIMARY KEY (change_event_id, month_start)
+);
+
+-- One-row version stamp of the fact table, bumped in the transaction of every fact write;
+-- result caches (src/fact_query.py) read it by primary key instead of scanning the fact table.
+CREATE TABLE IF NOT EXISTS fact_version (
+  id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  version BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO fact_version (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+-- ============================
+-- BI ROLLUPS (src/rollups.py)
+-- Refreshed from fact_finance_monthly for the quarters/years each fact change touches
+-- ============================
+CREATE TABLE IF NOT EXISTS fact_finance_quarterly (
+  quarter_start DATE NOT NULL,
   department TEXT NOT NULL,
   category TEXT NOT NULL,
   scenario TEXT NOT NULL,
+  source TEXT NOT NULL,
   amount NUMERIC NOT NULL,
+  row_count BIGINT,
+  PRIMARY KEY (quarter_start, department, category, scenario, source)
+);
+
+CREATE TABLE IF NOT EXISTS fact_finance_yearly (
+  year_start DATE NOT NULL,
+  department TEXT NOT NULL,
+  category TEXT NOT NULL,
+  scenario TEXT NOT NULL,
   source TEXT NOT NULL,
-  last_change_event_id UUID,
-  last_updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-  PRIMARY KEY (month_start, department, category, scenario, source)
+  amount NUMERIC NOT NULL,
+  row_count BIGINT,
+  PRIMARY KEY (year_start, department, category, scenario, source)
 );
 
-CREATE INDEX IF NOT EXISTS idx_fact_month
-  ON fact_finance_monthly(month_start);
+-- Actual vs budget per month, with year-to-date running totals
+CREATE TABLE IF NOT EXISTS fact_finance_variance (
+  month_start DATE NOT NULL,
+  department TEXT NOT NULL,
+  category TEXT NOT NULL,
+  actual_amount NUMERIC NOT NULL,
+  budget_amount NUMERIC NOT NULL,
+  variance_amount NUMERIC NOT NULL,
+  ytd_actual_amount NUMERIC NOT NULL,
+  ytd_budget_amount NUMERIC NOT NULL,
+  ytd_variance_amount NUMERIC NOT NULL,
+  PRIMARY KEY (month_start, department, category)
+);
+
+-- Per-month fingerprint of the fact table, maintained with the rollups; the gold export
+-- compares it with its manifest to skip months (or whole exports) that did not change
+CREATE TABLE IF NOT EXISTS fact_month_digests (
+  month_start DATE PRIMARY KEY,
+  fingerprint TEXT NOT NULL,
+  row_count BIGINT NOT NULL
+);
@@ -0,0 +1,129 @@
+# src/amounts.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Money is carried as int64 minor units (cents) between parsing and the DB boundary
+CENTS_PER_UNIT = 100
+
+# Currency symbols and whitespace (incl. non-breaking space) stripped on the slow path
+CURRENCY_PATTERN = "[\\s\u00a0$€£¥₹]"
+# The same characters for str.strip() around a value, e.g. before spotting "(...)" negatives
+CURRENCY_CHARS = " \u00a0$€£¥₹"
+
+
+@dataclass
+class AmountParseResult:
+    values: pd.Series  # numeric; NaN where missing or unparseable
+    unparseable: int  # non-blank inputs that could not be parsed
+
+
+def parse_amounts(s: pd.Series, *, decimal_comma: bool = False) -> AmountParseResult:
+    """
+    Vectorized currency/amount coercion.
+
+    Handles:
+      - currency symbols and surrounding whitespace ($1,200.50)
+      - thousands separators (',' by default; '.' and "'" when decimal_comma=True)
+      - accounting negatives: (123.45) -> -123.45
+      - locale decimal commas when decimal_comma=True (1.234,56 -> 1234.56)
+    """
+    # Already numeric (the usual CSV case): keep the dtype so int columns stay int
+    if pd.api.types.is_numeric_dtype(s.dtype) and not pd.api.types.is_bool_dtype(s.dtype):
+        return AmountParseResult(values=s, unparseable=0)
+
+    text = s.astype("string").str.strip()
+    present = text.notna() & (text != "")
+
+    # currency outside the parentheses ("$(4)", "(4) €") must not hide the accounting negative
+    bare = text.str.strip(CURRENCY_CHARS)
+    negative = (bare.str.startswith("(") & bare.str.endswith(")")).fillna(False).astype(bool)
+
+    # Fast path: literal replaces + a straight cast cover the common "$1,234.50" shape
+    if decimal_comma:
+        cleaned = text.str.replace(".", "", regex=False).str.replace("'", "", regex=False).str.replace(",", ".", regex=False)
+    else:
+        cleaned = text.str.replace("$", "", regex=False).str.replace(",", "", regex=False)
+    cleaned = cleaned.str.strip(CURRENCY_CHARS).str.strip("()")
+
+    try:
+        values = cleaned.astype("float64")
+    except (ValueError, TypeError):
+        # Slow path: other currency symbols / stray separators, then coerce what's left
+        cleaned = cleaned.str.replace(CURRENCY_PATTERN, "", regex=True)
+        if not decimal_comma:
+            cleaned = cleaned.str.replace("'", "", regex=False)
+        values = pd.to_numeric(cleaned, errors="coerce").astype("float64")
+
+    values = values.where(~negative, -values)
+
+    unparseable = int((present.fillna(False).astype(bool) & values.isna()).sum())
+    return AmountParseResult(values=values, unparseable=unparseable)
+
+
+def to_number(s: pd.Series, *, decimal_comma: bool = False) -> pd.Series:
+    """Convenience wrapper returning only the parsed values as float64."""
+    return parse_amounts(s, decimal_comma=decimal_comma).values.astype("float64")
+
+
+def _decimal_cents(value: Decimal) -> int:
+    """Decimal amount -> int cents, half away from zero (as NUMERIC rounding in PostgreSQL)."""
+    return int((value * CENTS_PER_UNIT).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_cents(values: pd.Series) -> pd.Series:
+    """
+    Numeric amounts -> nullable Int64 cents, rounded half away from zero at the cent like
+    PostgreSQL's NUMERIC (so 0.125 -> 13 and 1.005 -> 101, not the binary float's neighbour).
+    Integer columns scale exactly. Float values close to half a cent are rounded from their
+    shortest decimal form (repr), which is the text they were parsed from for any amount of up
+    to 15 significant digits; the rest round directly. Later sums and comparisons are exact
+    integer operations.
+    """
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return values.astype("Int64") * CENTS_PER_UNIT
+
+    floats = values.astype("float64").to_numpy()
+    scaled = floats * CENTS_PER_UNIT
+    cents = np.rint(scaled)
+    with np.errstate(invalid="ignore"):
+        near_half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half):
+        cents[i] = _decimal_cents(Decimal(repr(float(floats[i]))))
+    missing = np.isnan(cents)
+    out = pd.array(np.where(missing, 0, cents).astype("int64"), dtype="Int64")
+    out[missing] = pd.NA
+    return pd.Series(out, index=values.index, name=values.name)
+
+
+def parse_cents(s: pd.Series, *, decimal_comma: bool = False) -> AmountParseResult:
+    """parse_amounts(), returning Int64 cents instead of float values."""
+    parsed = parse_amounts(s, decimal_comma=decimal_comma)
+    return AmountParseResult(values=to_cents(parsed.values), unparseable=parsed.unparseable)
+
+
+def cents_to_amount(cents: pd.Series) -> pd.Series:
+    """Int64 cents -> float64 amounts (NaN for missing), for CSV/display output."""
+    return cents.astype("Float64").div(CENTS_PER_UNIT).astype("float64")
+
+
+def decimal_to_cents(value: Any) -> Optional[int]:
+    """DB NUMERIC (Decimal/float/int) -> int cents; None stays None."""
+    if value is None:
+        return None
+    if isinstance(value, Decimal):
+        return _decimal_cents(value)
+    return _decimal_cents(Decimal(repr(float(value))))
+
+
+def cents_to_decimal(value: Any) -> Optional[Decimal]:
+    """int cents -> Decimal with two places for NUMERIC parameters; None stays None."""
+    if value is None:
+        return None
+    return Decimal(int(value)).scaleb(-2)
@@ -3,12 +3,14 @@ from __future__ import annotations
 
 import uuid
 import json
+from contextlib import nullcontext
 from dataclasses import dataclass
 from datetime import date
 from typing import Optional, Dict, Any, List
 
+import pandas as pd
 from sqlalchemy import text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
 
 
 @dataclass
@@ -109,6 +111,53 @@ def log_row_change(
         )
 
 
+def log_rejected_rows(
+    engine: Engine,
+    *,
+    change_event_id: str,
+    table_name: str,
+    rejects: pd.DataFrame,
+    chunk_size: int = 5000,
+    conn: Optional[Connection] = None,
+) -> int:
+    """
+    Bulk-insert data-quality rejects (source_row_num, pk, rule_code, column_name, value)
+    for one change event. Returns the number of reject rows written.
+    With conn, the rows are written in the caller's transaction.
+    """
+    if rejects is None or rejects.empty:
+        return 0
+
+    # Plain Python values for the driver (ints / text / None)
+    row_nums = rejects["source_row_num"].astype(object).where(rejects["source_row_num"].notna(), None)
+    pks = rejects["pk"].astype(object).where(rejects["pk"].notna(), None)
+    values = rejects["value"].astype(object).where(rejects["value"].notna(), None)
+    params = [
+        {
+            "eid": change_event_id,
+            "t": table_name,
+            "rn": None if rn is None else int(rn),
+            "pk": None if pk is None else str(pk),
+            "code": str(code),
+            "col": col,
+            "val": None if val is None else str(val),
+        }
+        for rn, pk, code, col, val in zip(row_nums, pks, rejects["rule_code"], rejects["column_name"], values)
+    ]
+
+    sql = text(
+        """
+        INSERT INTO etl_rejected_rows
+        (change_event_id, table_name, source_row_num, pk, rule_code, column_name, value)
+        VALUES (:eid, :t, :rn, :pk, :code, :col, :val)
+        """
+    )
+    with nullcontext(conn) if conn is not None else engine.begin() as c:
+        for i in range(0, len(params), chunk_size):
+            c.execute(sql, params[i : i + chunk_size])
+    return len(params)
+
+
 def finish_change_event(
     engine: Engine,
     *,
@@ -1,12 +1,141 @@
 # src/bootstrap_gold.py
 from __future__ import annotations
 
+import io
 from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
 import pandas as pd
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
-from src.audit import start_change_event, log_row_change, finish_change_event
+from src.audit import start_change_event, finish_change_event, log_rejected_rows
+from src.dq import REJECT_COLUMNS
+from src.fact_dims import DIMENSIONS, sync_dimensions
+from src.rollups import refresh_rollups
+
+
+GOLD_REQUIRED = ["month_start", "department", "category", "scenario", "amount", "source"]
+CHUNK_ROWS = 500_000  # gold rows read, checked and loaded per batch (one COPY + upsert + audit insert)
+
+STAGE_TABLE = "gold_bootstrap_rows"
+# Gold files written from float amounts carry artefacts like 1234.5600000000002; the fact
+# holds money, so amounts are rounded to the cent on the way in
+AMOUNT_SCALE = 2
+FACT_KEY_IDS = "month_start, department_id, category_id, scenario_id, source_id"
+
+
+def _check_chunk(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Vectorized checks of one chunk of gold rows. Returns (valid rows ready for COPY, rejects)
+    where rejects has one row per failed check (REJECT_COLUMNS, as logged by data-quality rules).
+    """
+    months = pd.to_datetime(df["month_start"], errors="coerce")
+    amounts = pd.to_numeric(df["amount"], errors="coerce")
+
+    checks = [
+        ("GOLD_MONTH_INVALID", "month_start", months.isna()),
+        ("GOLD_AMOUNT_INVALID", "amount", ~np.isfinite(amounts.astype("float64"))),
+    ] + [
+        ("GOLD_DIMENSION_MISSING", d.column, df[d.column].isna() | (df[d.column].str.strip() == ""))
+        for d in DIMENSIONS
+    ]
+
+    bad = pd.Series(False, index=df.index)
+    rejects: List[pd.DataFrame] = []
+    for code, column, mask in checks:
+        mask = mask.fillna(True).astype(bool)
+        bad |= mask
+        if mask.any():
+            rejects.append(
+                pd.DataFrame(
+                    {
+                        "source_row_num": df.loc[mask, "source_row_num"],
+                        "pk": None,
+                        "rule_code": code,
+                        "column_name": column,
+                        "value": df.loc[mask, column],
+                    }
+                )
+            )
+
+    ok = ~bad
+    valid = pd.DataFrame(
+        {
+            "source_row_num": df.loc[ok, "source_row_num"],
+            "month_start": months[ok].dt.strftime("%Y-%m-%d"),
+            **{d.column: df.loc[ok, d.column] for d in DIMENSIONS},
+            # the file's own text: NUMERIC parses it exactly (no float round trip)
+            "amount": df.loc[ok, "amount"].str.strip(),
+        }
+    )
+    reject_frame = pd.concat(rejects, ignore_index=True) if rejects else pd.DataFrame(columns=REJECT_COLUMNS)
+    return valid, reject_frame
+
+
+def _copy_rows(conn, valid: pd.DataFrame) -> None:
+    """COPY one chunk of checked rows into the (emptied) stage table, on the caller's transaction."""
+    conn.execute(text(f"TRUNCATE {STAGE_TABLE}"))
+    buf = io.StringIO()
+    valid.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    cur = conn.connection.cursor()
+    try:
+        cur.copy_expert(
+            f"COPY {STAGE_TABLE} (source_row_num, month_start, {', '.join(d.column for d in DIMENSIONS)}, amount) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+    finally:
+        cur.close()
+
+
+def _upsert_stage(conn, eid: str) -> None:
+    """
+    Set-based upsert of the stage table into fact_finance_compact plus one audit row per gold
+    row. A key repeated in the chunk keeps its last row (file order), as row-by-row upserts would.
+    """
+    sync_dimensions(conn, STAGE_TABLE)
+    joins = "\n".join(f"JOIN {d.table} USING ({d.column})" for d in DIMENSIONS)
+    conn.execute(
+        text(
+            f"""
+            INSERT INTO fact_finance_compact
+              ({FACT_KEY_IDS}, amount, last_change_event_id, last_updated_at)
+            SELECT DISTINCT ON ({FACT_KEY_IDS})
+                   {FACT_KEY_IDS}, round(s.amount, {AMOUNT_SCALE}), :eid, now()
+            FROM {STAGE_TABLE} s
+            {joins}
+            ORDER BY {FACT_KEY_IDS}, s.source_row_num DESC
+            ON CONFLICT ({FACT_KEY_IDS}) DO UPDATE SET
+              amount = EXCLUDED.amount,
+              last_change_event_id = EXCLUDED.last_change_event_id,
+              last_updated_at = now()
+            """
+        ),
+        {"eid": eid},
+    )
+    conn.execute(
+        text(
+            f"""
+            INSERT INTO etl_row_changes
+              (row_change_id, change_event_id, table_name, pk, op, applied, conflict,
+               changed_columns, db_before, db_after)
+            SELECT gen_random_uuid(), :eid, 'fact_finance_monthly',
+                   concat_ws('|', month_start, department, category, scenario, source),
+                   'INSERT', true, false, CAST(:cols AS text[]), NULL,
+                   jsonb_build_object(
+                     'month_start', month_start::text, 'department', department, 'category', category,
+                     'scenario', scenario, 'amount', round(amount, {AMOUNT_SCALE}), 'source', source,
+                     'source_row_num', source_row_num
+                   )
+            FROM {STAGE_TABLE}
+            ORDER BY source_row_num
+            """
+        ),
+        {"eid": eid, "cols": GOLD_REQUIRED},
+    )
 
 
 def bootstrap_fact_from_gold_csv(
@@ -15,112 +144,110 @@ def bootstrap_fact_from_gold_csv(
     gold_csv_path: Path,
     actor: str = "bootstrap",
     truncate_first: bool = True,
+    chunk_rows: int = CHUNK_ROWS,
 ) -> dict:
     """
     Bootstrap the DB from an existing gold_fact_finance.csv.
 
     What it does:
     - Creates a change_event in etl_change_events
-    - Optionally TRUNCATEs fact_finance_monthly (default True for a clean init)
-    - Inserts each gold row into fact_finance_monthly
-    - Writes a row-level audit entry into etl_row_changes for each inserted fact row
+    - Optionally TRUNCATEs the fact table (default True for a clean init)
+    - Reads the file in chunks; rows with an unparseable month or amount, or an empty
+      dimension, are rejected (vectorized) and logged to etl_rejected_rows
+    - COPYs each chunk's valid rows into a temp table and upserts them into the fact table
+      (fact_finance_compact) in one statement, dimension keys resolved by join
+    - Writes a row-level audit entry into etl_row_changes for each loaded row (one
+      INSERT ... SELECT per chunk)
+    All of it, and the rollup refresh, is one transaction: a failed load leaves the DB as it was.
 
-    Note: This bootstraps the FACT table only. It does not backfill staging tables.
+    Note: This bootstraps the FACT table only. Backfill the staging tables from the raw
+    archive with src/bootstrap_staging.py, or the first import inserts every historical row.
     """
 
     if not gold_csv_path.exists():
         raise FileNotFoundError(f"Gold CSV not found: {gold_csv_path}")
 
-    df = pd.read_csv(gold_csv_path)
-
-    required = {"month_start", "department", "category", "scenario", "amount", "source"}
-    missing = required - set(df.columns)
+    header = pd.read_csv(gold_csv_path, nrows=0)
+    missing = set(GOLD_REQUIRED) - set(header.columns)
     if missing:
         raise ValueError(f"Gold CSV missing required columns: {sorted(missing)}")
 
-    # Normalize
-    df["month_start"] = pd.to_datetime(df["month_start"], errors="coerce").dt.date
-    df["amount"] = pd.to_numeric(df["amount"], errors="coerce")
-
-    # Drop invalid rows
-    df = df.dropna(subset=["month_start", "amount"])
-
-    date_min = df["month_start"].min() if len(df) else None
-    date_max = df["month_start"].max() if len(df) else None
-
     ctx = start_change_event(
         engine,
         actor=actor,
         source_name="bootstrap_gold",
         file_name=gold_csv_path.name,
         dry_run=False,
-        date_min=date_min,
-        date_max=date_max,
     )
     eid = ctx.change_event_id
 
     inserted = 0
     rejected = 0
+    months: Set[str] = set()
+    date_min: Optional[str] = None
+    date_max: Optional[str] = None
 
-    with engine.begin() as conn:
-        if truncate_first:
-            conn.execute(text("TRUNCATE TABLE fact_finance_monthly"))
-
-        for _, r in df.iterrows():
-            try:
-                row = {
-                    "month_start": r["month_start"],
-                    "department": str(r["department"]),
-                    "category": str(r["category"]),
-                    "scenario": str(r["scenario"]),
-                    "amount": float(r["amount"]),
-                    "source": str(r["source"]),
-                    "eid": eid,
-                }
-
-                conn.execute(
-                    text(
-                        """
-                        INSERT INTO fact_finance_monthly
-                          (month_start, department, category, scenario, amount, source,
-                           last_change_event_id, last_updated_at)
-                        VALUES
-                          (:month_start, :department, :category, :scenario, :amount, :source,
-                           :eid, now())
-                        ON CONFLICT (month_start, department, category, scenario, source)
-                        DO UPDATE SET
-                          amount = EXCLUDED.amount,
-                          last_change_event_id = EXCLUDED.last_change_event_id,
-                          last_updated_at = now()
-                        """
-                    ),
-                    row,
+    try:
+        with engine.begin() as conn:
+            if truncate_first:
+                conn.execute(text("TRUNCATE TABLE fact_finance_compact"))
+            conn.execute(
+                text(
+                    f"""
+                    CREATE TEMPORARY TABLE {STAGE_TABLE} (
+                      source_row_num BIGINT NOT NULL,
+                      month_start DATE NOT NULL,
+                      {", ".join(f"{d.column} TEXT NOT NULL" for d in DIMENSIONS)},
+                      amount NUMERIC NOT NULL
+                    ) ON COMMIT DROP
+                    """
                 )
+            )
 
-                pk = f"{row['month_start']}|{row['department']}|{row['category']}|{row['scenario']}|{row['source']}"
-
-                log_row_change(
-                    engine,
-                    change_event_id=eid,
-                    table_name="fact_finance_monthly",
-                    pk=pk,
-                    op="INSERT",
-                    changed_columns=["month_start", "department", "category", "scenario", "amount", "source"],
-                    db_before=None,
-                    db_after={
-                        "month_start": str(row["month_start"]),
-                        "department": row["department"],
-                        "category": row["category"],
-                        "scenario": row["scenario"],
-                        "amount": row["amount"],
-                        "source": row["source"],
-                    },
-                    applied=True,
-                )
+            # only empty fields are missing: "NA" / "None" are valid dimension names here
+            chunks = pd.read_csv(
+                gold_csv_path, usecols=GOLD_REQUIRED, dtype=str, keep_default_na=False, na_values=[""],
+                chunksize=chunk_rows,
+            )
+            for chunk in chunks:
+                chunk.insert(0, "source_row_num", chunk.index.astype(int) + 2)  # file line (header = 1)
+                valid, rejects = _check_chunk(chunk)
+
+                if not rejects.empty:
+                    rejected += int(rejects["source_row_num"].nunique())
+                    log_rejected_rows(
+                        engine, change_event_id=eid, table_name="fact_finance_monthly", rejects=rejects, conn=conn
+                    )
+                if valid.empty:
+                    continue
+
+                _copy_rows(conn, valid)
+                _upsert_stage(conn, eid)
+                inserted += int(len(valid))
+                months.update(valid["month_start"].unique())
+                lo, hi = valid["month_start"].min(), valid["month_start"].max()  # ISO strings
+                date_min = lo if date_min is None else min(date_min, lo)
+                date_max = hi if date_max is None else max(date_max, hi)
 
-                inserted += 1
-            except Exception:
-                rejected += 1
+            conn.execute(
+                text("UPDATE etl_change_events SET date_min = :lo, date_max = :hi WHERE change_event_id = :eid"),
+                {"lo": date_min, "hi": date_max, "eid": eid},
+            )
+            # a truncated table is refilled in full; otherwise only the loaded months' periods
+            refresh_rollups(conn, None if truncate_first else sorted(months))
+    except Exception as e:
+        finish_change_event(
+            engine,
+            change_event_id=eid,
+            status="FAILED",
+            inserted=0,
+            updated=0,
+            unchanged=0,
+            conflicted=0,
+            rejected=0,
+            notes=f"{type(e).__name__}: {e}",
+        )
+        raise
 
     finish_change_event(
         engine,
@@ -139,6 +266,6 @@ def bootstrap_fact_from_gold_csv(
         "status": "SUCCESS",
         "inserted": inserted,
         "rejected": rejected,
-        "date_min": str(date_min) if date_min else None,
-        "date_max": str(date_max) if date_max else None,
+        "date_min": date_min,
+        "date_max": date_max,
     }
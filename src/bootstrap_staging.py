@@ -0,0 +1,383 @@
+# src/bootstrap_staging.py
+from __future__ import annotations
+
+import io
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from src.audit import start_change_event, finish_change_event, log_rejected_rows
+from src.category_map import DEFAULT_CATEGORY_MAP_PATH, sync_category_map
+from src.dq import DEFAULT_DQ_RULES_PATH, REJECT_COLUMNS, load_dq_rules
+from src.extract import read_table_clean_cols
+from src.merge import _resolve_duplicate_pks
+from src.rebuild_fact import rebuild_fact_months
+from src.transform_plan import DEFAULT_COLUMN_MAPS_PATH, StagingPlan, load_transform_plans
+from src.validate import require_columns
+
+
+COPY_NULL = r"\N"  # NULL marker in the COPY payloads, so empty strings stay empty strings
+
+
+@dataclass
+class ArchiveFile:
+    """One archive file parsed, checked and hashed by a worker, ready to COPY."""
+    source: str
+    path: Path
+    seq: int  # load order: a PK in several files keeps its row from the highest seq
+    raw_rows: int = 0
+    rows: int = 0
+    payload: bytes = b""  # archive_seq, staging columns, row hash as CSV (money in int cents)
+    rejects: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=REJECT_COLUMNS))
+    rejected_rows: int = 0
+    months: List[str] = field(default_factory=list)
+
+
+def discover_archive_files(archive_dir: Path, plans: Dict[str, StagingPlan]) -> List[Tuple[str, Path]]:
+    """
+    (source, path) for every raw file under archive_dir matching a source's `files:` patterns
+    (searched recursively), in load order: sorted by path relative to archive_dir, so
+    date-stamped names (or year folders) replay oldest first.
+    """
+    archive_dir = Path(archive_dir)
+    found: Dict[Path, str] = {}
+    for source, plan in plans.items():
+        for p in plan.find_files(archive_dir, recursive=True):
+            found.setdefault(p, source)
+    return [(found[p], p) for p in sorted(found, key=lambda p: p.relative_to(archive_dir).as_posix())]
+
+
+def stage_archive_file(
+    source: str,
+    path: Path,
+    seq: int,
+    column_maps_path: Path = DEFAULT_COLUMN_MAPS_PATH,
+    dq_rules_path: Path = DEFAULT_DQ_RULES_PATH,
+) -> ArchiveFile:
+    """
+    Read one raw file and build its staging rows exactly as run_import does (plan.build: typed
+    columns, data-quality rules, row hash), resolving in-file duplicate PKs by the source's
+    `duplicates:` policy. Runs in a worker process; everything returned is picklable.
+    """
+    plan = load_transform_plans(column_maps_path)[source]
+    raw = read_table_clean_cols(path, categorical_cols=plan.categorical_source_cols)
+    require_columns(raw, list(plan.required), context=f"{plan.label}: {path.name}")
+
+    build = plan.build(raw, load_dq_rules(dq_rules_path).get(plan.name, ()))
+    stg, dup_rejected, _ = _resolve_duplicate_pks(build.frame, plan.pk_col, plan.duplicate_policy, "source_row_num", 0)
+
+    months: List[str] = []
+    if plan.date_col:
+        months = sorted(pd.to_datetime(stg[plan.date_col], errors="coerce").dt.strftime("%Y-%m-01").dropna().unique().tolist())
+
+    rows = stg[plan.compare_cols]
+    rows.insert(0, "archive_seq", seq)
+    buf = io.StringIO()
+    rows.to_csv(buf, index=False, header=False, na_rep=COPY_NULL)
+    return ArchiveFile(
+        source=source,
+        path=path,
+        seq=seq,
+        raw_rows=int(len(raw)),
+        rows=int(len(stg)),
+        payload=buf.getvalue().encode("utf-8"),
+        rejects=build.rejects,
+        rejected_rows=build.rejected_rows + dup_rejected,
+        months=months,
+    )
+
+
+def _staged_files(
+    files: List[Tuple[str, Path]], workers: int, column_maps_path: Path, dq_rules_path: Path
+) -> Iterator[ArchiveFile]:
+    """Parsed files as they finish: on a pool of `workers` processes, or in-process for workers=1."""
+    if workers <= 1:
+        for seq, (source, path) in enumerate(files):
+            yield stage_archive_file(source, path, seq, column_maps_path, dq_rules_path)
+        return
+
+    # spawn, not fork: a forked child would inherit (and on exit close) the parent's DB sockets
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures: List[Future] = [
+            pool.submit(stage_archive_file, source, path, seq, column_maps_path, dq_rules_path)
+            for seq, (source, path) in enumerate(files)
+        ]
+        try:
+            for f in as_completed(futures):
+                yield f.result()
+        finally:
+            for f in futures:
+                f.cancel()
+
+
+def _stage_table(plan: StagingPlan) -> str:
+    return f"archive_{plan.table}"
+
+
+def _create_stage(conn, plan: StagingPlan) -> None:
+    """Temp table shaped like the staging table plus the file's load order (dropped on commit)."""
+    conn.execute(
+        text(
+            f"""
+            CREATE TEMPORARY TABLE {_stage_table(plan)} ON COMMIT DROP AS
+            SELECT 0 AS archive_seq, t.* FROM {plan.table} t WITH NO DATA
+            """
+        )
+    )
+
+
+def _copy_file(conn, plan: StagingPlan, staged: ArchiveFile) -> None:
+    """COPY one file's rows into the plan's stage table, on the caller's transaction."""
+    cols = ", ".join(["archive_seq"] + plan.compare_cols)
+    cur = conn.connection.cursor()
+    try:
+        cur.copy_expert(
+            f"COPY {_stage_table(plan)} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+            io.BytesIO(staged.payload),
+        )
+    finally:
+        cur.close()
+
+
+def _upsert_stage(conn, plan: StagingPlan, change_event_id: str) -> Dict[str, int]:
+    """
+    Set-based upsert of the plan's stage table into its staging table, with one audit row per
+    inserted/updated row (db_before from the same snapshot the upsert reads, as merge_upsert
+    records it). The result matches importing the files one by one: a PK in several files gets
+    its last version, with the metadata (source_row_num) of the first file that had that
+    version (row_hash); a row whose stored row_hash already matches is left alone.
+    Money columns arrive in cents and are written as NUMERIC with two places (cents * 0.01),
+    like cents_to_decimal.
+    Returns {"rows", "inserted", "updated", "unchanged"}.
+    """
+    stage = _stage_table(plan)
+    pk = plan.pk_col
+    meta = set(plan.meta_cols)
+    business_cols = [c for c in plan.staging_cols if c not in (pk, plan.hash_col) and c not in meta]
+
+    cols = [pk] + [c for c in plan.compare_cols if c != pk]
+    values = [f"s.{c} * 0.01" if c in plan.money_cols else f"s.{c}" for c in cols]
+    key_join = ""
+    params: Dict[str, Any] = {"eid": change_event_id, "t": plan.table, "cols": business_cols}
+    if plan.surrogate_col:
+        # Every PK gets its BIGINT key here, so merge's surrogate fetch finds the rows next run
+        conn.execute(
+            text(
+                f"""
+                INSERT INTO etl_key_dictionary (key_space, external_id)
+                SELECT DISTINCT :ks, {pk}::text FROM {stage}
+                ON CONFLICT (key_space, external_id) DO NOTHING
+                """
+            ),
+            {"ks": plan.key_space},
+        )
+        cols.append(plan.surrogate_col)
+        values.append("d.surrogate_id")
+        key_join = f"JOIN etl_key_dictionary d ON d.key_space = :ks AND d.external_id = s.{pk}::text"
+        params["ks"] = plan.key_space
+
+    update_sql = ", ".join(
+        [f"{c} = EXCLUDED.{c}" for c in cols if c != pk]
+        + ["last_change_event_id = EXCLUDED.last_change_event_id", "last_updated_at = now()"]
+    )
+    row = conn.execute(
+        text(
+            f"""
+            WITH versions AS (
+              SELECT *, {plan.hash_col} IS DISTINCT FROM lag({plan.hash_col}) OVER (
+                          PARTITION BY {pk} ORDER BY archive_seq
+                        ) AS new_version
+              FROM {stage}
+            ),
+            src AS (
+              SELECT DISTINCT ON ({pk}) * FROM versions WHERE new_version ORDER BY {pk}, archive_seq DESC
+            ),
+            prev AS (
+              SELECT t.* FROM {plan.table} t JOIN src USING ({pk})
+            ),
+            up AS (
+              INSERT INTO {plan.table} AS t ({", ".join(cols)}, last_change_event_id, last_updated_at)
+              SELECT {", ".join(values)}, CAST(:eid AS uuid), now()
+              FROM src s
+              {key_join}
+              ON CONFLICT ({pk}) DO UPDATE SET {update_sql}
+              WHERE t.{plan.hash_col} IS DISTINCT FROM EXCLUDED.{plan.hash_col}
+              RETURNING t.*
+            ),
+            audit AS (
+              INSERT INTO etl_row_changes
+                (row_change_id, change_event_id, table_name, pk, op, applied, conflict,
+                 changed_columns, db_before, db_after)
+              SELECT gen_random_uuid(), CAST(:eid AS uuid), :t, up.{pk}::text,
+                     CASE WHEN prev.{pk} IS NULL THEN 'INSERT' ELSE 'UPDATE' END, true, false,
+                     CASE WHEN prev.{pk} IS NULL THEN CAST(:cols AS text[])
+                          ELSE ARRAY(
+                            SELECT c FROM unnest(CAST(:cols AS text[])) AS c
+                            WHERE to_jsonb(prev) -> c IS DISTINCT FROM to_jsonb(up) -> c
+                          )
+                     END,
+                     CASE WHEN prev.{pk} IS NULL THEN NULL ELSE to_jsonb(prev) END,
+                     to_jsonb(up) - 'last_change_event_id' - 'last_updated_at'
+              FROM up
+              LEFT JOIN prev USING ({pk})
+              RETURNING op
+            )
+            SELECT (SELECT count(*) FROM src) AS rows,
+                   count(*) FILTER (WHERE op = 'INSERT') AS inserted,
+                   count(*) FILTER (WHERE op = 'UPDATE') AS updated
+            FROM audit
+            """
+        ),
+        params,
+    ).mappings().one()
+    out = {k: int(row[k]) for k in ("rows", "inserted", "updated")}
+    out["unchanged"] = out["rows"] - out["inserted"] - out["updated"]
+    return out
+
+
+def backfill_staging_from_archive(
+    engine: Engine,
+    *,
+    archive_dir: Path,
+    actor: str = "bootstrap",
+    column_maps_path: Path = DEFAULT_COLUMN_MAPS_PATH,
+    dq_rules_path: Path = DEFAULT_DQ_RULES_PATH,
+    workers: Optional[int] = None,
+    rebuild_fact: bool = False,
+    category_map_path: Path = DEFAULT_CATEGORY_MAP_PATH,
+    progress_cb: Optional[Callable[[str], None]] = None,
+) -> dict:
+    """
+    Backfill the staging tables (stg_sales_orders / stg_budget_transactions) from a directory of
+    historical raw files, so the first incremental run after a bootstrap finds every historical
+    row by its row_hash instead of re-inserting it.
+
+    What it does:
+    - Finds the raw files under archive_dir (each source's `files:` patterns) and replays them
+      in path order
+    - Parses, checks and hashes each file with the source's staging plan (plan.build, the same
+      code run_import uses) in `workers` processes (default: one per CPU)
+    - COPYs each file's rows into a temp table as soon as its worker finishes, then upserts each
+      staging table in one statement: the last file wins for a PK seen more than once, rows whose
+      hash already matches are unchanged, surrogate keys are assigned
+    - Writes a row-level audit entry for each inserted/updated row and logs data-quality rejects
+    All of it is one transaction: a failed backfill leaves the staging tables as they were.
+    Protected columns are not checked: the archive is the history being restored.
+
+    rebuild_fact=True then rebuilds fact_finance_monthly for the backfilled months from staging,
+    after syncing category_map_path into the DB map (as run_import does).
+    """
+    def _progress(msg: str) -> None:
+        if progress_cb:
+            try:
+                progress_cb(msg)
+            except Exception:
+                pass
+
+    archive_dir = Path(archive_dir)
+    if not archive_dir.is_dir():
+        raise FileNotFoundError(f"Archive directory not found: {archive_dir}")
+
+    plans = load_transform_plans(column_maps_path)
+    files = discover_archive_files(archive_dir, plans)
+    if not files:
+        raise FileNotFoundError(f"No raw files for {sorted(plans)} under {archive_dir}")
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+
+    ctx = start_change_event(
+        engine,
+        actor=actor,
+        source_name="bootstrap_staging",
+        file_name=f"{archive_dir.name} ({len(files)} files)",
+        dry_run=False,
+    )
+    eid = ctx.change_event_id
+
+    used = [plans[s] for s in dict.fromkeys(source for source, _ in files)]
+    tables: Dict[str, Dict[str, int]] = {}
+    rejected = 0
+    months: Set[str] = set()
+
+    try:
+        with engine.begin() as conn:
+            for plan in used:
+                _create_stage(conn, plan)
+
+            _progress(f"Parsing {len(files)} archive file(s) on {workers} worker(s)…")
+            for done, staged in enumerate(_staged_files(files, workers, column_maps_path, dq_rules_path), start=1):
+                plan = plans[staged.source]
+                _copy_file(conn, plan, staged)
+                months.update(staged.months)
+                if staged.rejected_rows:
+                    rejected += staged.rejected_rows
+                    log_rejected_rows(engine, change_event_id=eid, table_name=plan.table, rejects=staged.rejects, conn=conn)
+                _progress(f"Staged {staged.path.name} ({staged.rows:,} rows) — {done}/{len(files)}")
+
+            for plan in used:
+                _progress(f"Loading {plan.table}…")
+                tables[plan.table] = _upsert_stage(conn, plan, str(eid))
+
+            if months:
+                conn.execute(
+                    text("UPDATE etl_change_events SET date_min = :lo, date_max = :hi WHERE change_event_id = :eid"),
+                    {"lo": min(months), "hi": max(months), "eid": eid},
+                )
+
+        fact_summary: Dict[str, Any] = {}
+        if rebuild_fact and months:
+            _progress("Syncing category map…")
+            sync_category_map(engine, category_map_path)
+            _progress(f"Rebuilding fact table ({len(months)} month(s))…")
+            rebuild = rebuild_fact_months(engine=engine, months=sorted(months), change_event_id=str(eid), workers=workers)
+            fact_summary = {"rebuild_scope": rebuild.scope, "rebuilt_months": rebuild.months or []}
+    except Exception as e:
+        finish_change_event(
+            engine,
+            change_event_id=eid,
+            status="FAILED",
+            inserted=0,
+            updated=0,
+            unchanged=0,
+            conflicted=0,
+            rejected=0,
+            notes=f"{type(e).__name__}: {e}",
+        )
+        raise
+
+    inserted = sum(t["inserted"] for t in tables.values())
+    updated = sum(t["updated"] for t in tables.values())
+    unchanged = sum(t["unchanged"] for t in tables.values())
+    finish_change_event(
+        engine,
+        change_event_id=eid,
+        status="SUCCESS",
+        inserted=inserted,
+        updated=updated,
+        unchanged=unchanged,
+        conflicted=0,
+        rejected=rejected,
+        notes=f"Staging backfill from {len(files)} archive file(s)"
+        + (" with fact rebuild." if rebuild_fact else " (fact table not rebuilt)."),
+    )
+
+    return {
+        "change_event_id": str(eid),
+        "status": "SUCCESS",
+        "files": len(files),
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": unchanged,
+        "rejected": rejected,
+        "tables": tables,
+        "date_min": min(months) if months else None,
+        "date_max": max(months) if months else None,
+        "fact_summary": fact_summary,
+    }
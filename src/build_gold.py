@@ -1,9 +1,14 @@
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 import pandas as pd
 
+from src.categorical import align_categories, decategorize
+from src.gold_columnar import gold_format, write_frame_columnar
+
 def build_gold_fact(sales_fact: pd.DataFrame, budget_fact: pd.DataFrame) -> pd.DataFrame:
-    fact = pd.concat([sales_fact, budget_fact], ignore_index=True)
+    # Shared sorted categories keep dims categorical through concat and sort
+    fact = pd.concat(align_categories([sales_fact, budget_fact]), ignore_index=True)
 
     load_id = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
     fact["load_id"] = load_id
@@ -12,6 +17,12 @@ def build_gold_fact(sales_fact: pd.DataFrame, budget_fact: pd.DataFrame) -> pd.D
     fact = fact.sort_values(["month_start","department","category","scenario"]).reset_index(drop=True)
     return fact
 
-def write_gold(fact: pd.DataFrame, out_path: Path):
+def write_gold(fact: pd.DataFrame, out_path: Path, fmt: Optional[str] = None):
+    # fmt: "csv" | "parquet" | "arrow"; by default from the suffix (.parquet, .arrow/.feather, else CSV)
+    fmt = gold_format(out_path, fmt)
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    fact.to_csv(out_path, index=False)
+    if fmt != "csv":
+        # typed columns; the categorical dimensions stay dictionary-encoded
+        write_frame_columnar(fact, out_path, fmt)
+        return
+    decategorize(fact).to_csv(out_path, index=False)
@@ -0,0 +1,73 @@
+# src/categorical.py
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+# Low-cardinality dimensions carried as pandas categoricals between read and the DB/CSV boundary
+DIMENSION_COLS: Sequence[str] = ("department", "category", "region", "payment_method", "scenario", "source")
+
+
+def is_categorical(s: pd.Series) -> bool:
+    return isinstance(s.dtype, pd.CategoricalDtype)
+
+
+def as_categorical(s: pd.Series, *, strip: bool = True) -> pd.Series:
+    """
+    Convert a column to a categorical with lexically sorted string categories.
+    With strip=True, surrounding whitespace is removed from the categories (not per row);
+    categories that collide after stripping are merged.
+    """
+    cat = s if is_categorical(s) else s.astype("category")
+
+    categories = pd.Index(cat.cat.categories).astype(str)
+    if strip:
+        categories = categories.str.strip()
+
+    if categories.is_unique and categories.is_monotonic_increasing:
+        if not categories.equals(pd.Index(cat.cat.categories)):
+            cat = cat.cat.rename_categories(categories)
+        return cat
+
+    merged = categories.unique().sort_values()
+    remap = np.append(merged.get_indexer(categories), -1)
+    codes = remap[cat.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=merged), index=s.index, name=s.name)
+
+
+def categorize(df: pd.DataFrame, cols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Convert the dimension columns present in df to categoricals (in place); returns df."""
+    for c in cols if cols is not None else DIMENSION_COLS:
+        if c in df.columns and not is_categorical(df[c]):
+            df[c] = as_categorical(df[c])
+    return df
+
+
+def align_categories(frames: Sequence[pd.DataFrame], cols: Optional[Iterable[str]] = None) -> List[pd.DataFrame]:
+    """
+    Give each categorical column the same sorted category union across frames,
+    so pd.concat keeps it categorical instead of falling back to object.
+    """
+    frames = list(frames)
+    for c in cols if cols is not None else DIMENSION_COLS:
+        present = [f for f in frames if c in f.columns]
+        if not present:
+            continue
+        values = set()
+        for f in present:
+            s = f[c]
+            values.update(s.cat.categories if is_categorical(s) else s.dropna().astype(str).unique())
+        dtype = pd.CategoricalDtype(sorted(values))
+        frames = [f.assign(**{c: f[c].astype(dtype)}) if c in f.columns else f for f in frames]
+    return frames
+
+
+def decategorize(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert categorical columns back to plain object values (None for missing) at the DB/CSV boundary."""
+    cat_cols = [c for c in df.columns if is_categorical(df[c])]
+    if not cat_cols:
+        return df
+    return df.assign(**{c: df[c].astype(object).where(df[c].notna(), None) for c in cat_cols})
@@ -0,0 +1,248 @@
+# src/category_map.py
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CATEGORY_MAP_PATH = ROOT / "config" / "category_map.csv"
+
+MAP_COLUMNS = ["raw_category", "canonical_category", "default_department"]
+
+
+@dataclass(frozen=True)
+class CompiledCategoryMap:
+    """
+    raw_category -> canonical_category / default_department, compiled to dicts.
+    Unknown raw categories map to themselves (canonical) and to missing (department).
+    """
+    canonical: Dict[str, str] = field(default_factory=dict)
+    default_department: Dict[str, str] = field(default_factory=dict)
+    path: Optional[Path] = None
+    mtime_ns: Optional[int] = None
+
+    @property
+    def empty(self) -> bool:
+        return not self.canonical
+
+    def lookup(self, s: pd.Series, missing: Optional[str] = None) -> Tuple[pd.Series, pd.Series]:
+        """
+        Vectorized lookup over a raw category column.
+        Work is done once per distinct value; rows only pay an integer take.
+        Returns (canonical_category, default_department) as categoricals aligned to s.
+        With `missing`, a NaN raw category becomes that canonical category (no department),
+        as the rebuild SQL's COALESCE does; otherwise it stays NaN.
+        """
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+        raw = pd.Series(pd.Index(uniques).astype(str), dtype=object)
+
+        canonical = raw.map(self.canonical).fillna(raw)
+        department = raw.map(self.default_department)
+        if missing is not None:
+            canonical = pd.concat([canonical, pd.Series([missing], dtype=object)], ignore_index=True)
+            department = pd.concat([department, pd.Series([None], dtype=object)], ignore_index=True)
+            codes = np.where(codes < 0, len(canonical) - 1, codes)
+        return _take_categorical(canonical, codes, s), _take_categorical(department, codes, s)
+
+
+def _take_categorical(per_unique: pd.Series, codes: np.ndarray, like: pd.Series) -> pd.Series:
+    """Expand per-distinct-value results back to rows as a categorical with sorted categories."""
+    categories = pd.Index(per_unique.dropna().unique()).sort_values()
+    remap = np.append(categories.get_indexer(per_unique), -1)
+    values = pd.Categorical.from_codes(remap[codes], categories=categories)
+    return pd.Series(values, index=like.index)
+
+
+def compile_category_map(category_map: Any) -> CompiledCategoryMap:
+    """
+    Accepts:
+      - CompiledCategoryMap (returned as-is)
+      - str / Path to a category map CSV (loaded through the mtime cache)
+      - pd.DataFrame with raw_category/canonical_category (and optional default_department)
+      - dict mapping raw_category -> canonical_category
+      - None / {} / empty -> identity mapping (no-op)
+    """
+    if isinstance(category_map, CompiledCategoryMap):
+        return category_map
+
+    if isinstance(category_map, (str, Path)):
+        return load_category_map(Path(category_map))
+
+    if isinstance(category_map, pd.DataFrame):
+        if category_map.empty or "raw_category" not in category_map.columns:
+            return CompiledCategoryMap()
+        raw = category_map["raw_category"].astype(str).str.strip()
+        canonical: Dict[str, str] = {}
+        if "canonical_category" in category_map.columns:
+            canon = category_map["canonical_category"]
+            canonical = {r: str(c).strip() for r, c in zip(raw, canon) if pd.notna(c)}
+        department: Dict[str, str] = {}
+        if "default_department" in category_map.columns:
+            dept = category_map["default_department"]
+            department = {r: str(d).strip() for r, d in zip(raw, dept) if pd.notna(d)}
+        return CompiledCategoryMap(canonical=canonical, default_department=department)
+
+    if isinstance(category_map, dict):
+        return CompiledCategoryMap(canonical={str(k): str(v) for k, v in category_map.items()})
+
+    # Fallback: treat as empty/no-op
+    return CompiledCategoryMap()
+
+
+# resolved path -> compiled map (rebuilt when the file's mtime changes)
+_CACHE: Dict[Path, CompiledCategoryMap] = {}
+
+
+def load_category_map(path: Path = DEFAULT_CATEGORY_MAP_PATH) -> CompiledCategoryMap:
+    """Load and compile a category map CSV once; recompiled only when the file's mtime changes."""
+    path = Path(path).resolve()
+    mtime_ns = path.stat().st_mtime_ns
+
+    cached = _CACHE.get(path)
+    if cached is not None and cached.mtime_ns == mtime_ns:
+        return cached
+
+    df = pd.read_csv(path, dtype=str)
+    df.columns = [str(c).strip() for c in df.columns]
+    compiled = compile_category_map(df)
+    compiled = CompiledCategoryMap(
+        canonical=compiled.canonical,
+        default_department=compiled.default_department,
+        path=path,
+        mtime_ns=mtime_ns,
+    )
+    _CACHE[path] = compiled
+    return compiled
+
+
+# ---------------------------
+# DB-side map (applied by the fact rebuild SQL)
+# ---------------------------
+
+@dataclass(frozen=True)
+class CategoryMapSync:
+    version_id: Optional[int]
+    changed: bool
+    changed_raw_categories: List[str] = field(default_factory=list)
+    months: List[str] = field(default_factory=list)  # fact months holding changed raw categories
+
+
+def map_checksum(cmap: CompiledCategoryMap) -> str:
+    payload = json.dumps([sorted(cmap.canonical.items()), sorted(cmap.default_department.items())])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _db_map(conn, version_id: Optional[int]) -> Dict[str, Tuple[str, Optional[str]]]:
+    if version_id is None:
+        return {}
+    rows = conn.execute(
+        text(
+            """
+            SELECT raw_category, canonical_category, default_department
+            FROM dim_category_map
+            WHERE version_id = :v
+            """
+        ),
+        {"v": version_id},
+    ).all()
+    return {str(r[0]): (str(r[1]), r[2]) for r in rows}
+
+
+def sync_category_map(engine: Engine, path: Path = DEFAULT_CATEGORY_MAP_PATH) -> CategoryMapSync:
+    """
+    Load the category map file into dim_category_map as a new version when its content differs
+    from the current version. Returns the raw categories whose mapping changed (added, removed or
+    re-pointed) and the months of staging rows carrying them: the only fact months to rebuild.
+    A missing file leaves the DB map as it is.
+    """
+    # local import: rebuild_fact is the heavier, DB-only module
+    from src.rebuild_fact import FACT_CONTRIBUTIONS
+
+    path = Path(path)
+    with engine.begin() as conn:
+        current = conn.execute(
+            text("SELECT version_id, checksum FROM category_map_versions ORDER BY version_id DESC LIMIT 1")
+        ).first()
+        current_id = int(current[0]) if current else None
+        if not path.exists():
+            return CategoryMapSync(version_id=current_id, changed=False)
+
+        cmap = load_category_map(path)
+        checksum = map_checksum(cmap)
+        if current and current[1] == checksum:
+            return CategoryMapSync(version_id=current_id, changed=False)
+
+        old = _db_map(conn, current_id)
+        new = {raw: (canon, cmap.default_department.get(raw)) for raw, canon in cmap.canonical.items()}
+        changed = sorted(raw for raw in set(old) | set(new) if old.get(raw) != new.get(raw))
+
+        version_id = int(
+            conn.execute(
+                text(
+                    "INSERT INTO category_map_versions (checksum, source_path) VALUES (:c, :p) RETURNING version_id"
+                ),
+                {"c": checksum, "p": str(path)},
+            ).scalar()
+        )
+        if new:
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO dim_category_map (version_id, raw_category, canonical_category, default_department)
+                    SELECT :v, r, c, d
+                    FROM unnest(CAST(:raw AS text[]), CAST(:canon AS text[]), CAST(:dept AS text[])) AS m(r, c, d)
+                    """
+                ),
+                {
+                    "v": version_id,
+                    "raw": list(new),
+                    "canon": [c for c, _ in new.values()],
+                    "dept": [d for _, d in new.values()],
+                },
+            )
+
+        months: List[str] = []
+        if changed:
+            selects = " UNION ".join(
+                f"SELECT DISTINCT date_trunc('month', {date_col})::date AS m FROM {table} "
+                f"WHERE {category_col} = ANY(CAST(:raw AS text[])) AND {date_col} IS NOT NULL"
+                for table, date_col, category_col in sorted(
+                    {(c.table, c.date_col, c.category_col) for c in FACT_CONTRIBUTIONS if c.category_map and c.category_col}
+                )
+            )
+            if selects:
+                rows = conn.execute(text(f"SELECT m::text FROM ({selects}) u ORDER BY 1"), {"raw": changed})
+                months = [str(m) for m in rows.scalars().all()]
+
+    return CategoryMapSync(version_id=version_id, changed=True, changed_raw_categories=changed, months=months)
+
+
+# version_id -> compiled map of that DB version
+_DB_CACHE: Dict[int, CompiledCategoryMap] = {}
+
+
+def load_db_category_map(engine: Engine) -> CompiledCategoryMap:
+    """The current DB map version compiled for pandas lookups (what the fact rebuild SQL applies)."""
+    with engine.begin() as conn:
+        version_id = conn.execute(text("SELECT max(version_id) FROM category_map_versions")).scalar()
+        if version_id is None:
+            return CompiledCategoryMap()
+        cached = _DB_CACHE.get(int(version_id))
+        if cached is not None:
+            return cached
+        rows = _db_map(conn, int(version_id))
+    compiled = CompiledCategoryMap(
+        canonical={raw: canon for raw, (canon, _) in rows.items()},
+        default_department={raw: dept for raw, (_, dept) in rows.items() if dept is not None},
+    )
+    _DB_CACHE[int(version_id)] = compiled
+    return compiled
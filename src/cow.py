@@ -0,0 +1,38 @@
+# src/cow.py
+from __future__ import annotations
+
+from contextlib import contextmanager, nullcontext
+from typing import Iterator
+
+import pandas as pd
+
+
+def _pandas_major() -> int:
+    try:
+        return int(pd.__version__.split(".", 1)[0])
+    except ValueError:
+        return 0
+
+
+def copy_on_write_always_on() -> bool:
+    """pandas >= 3 always uses Copy-on-Write; the option is deprecated there."""
+    return _pandas_major() >= 3
+
+
+@contextmanager
+def copy_on_write_mode(enabled: bool = True) -> Iterator[None]:
+    """
+    Run a block with pandas Copy-on-Write semantics.
+
+    Under CoW, column selections, filters and assign() share buffers with their parent until
+    one side is written, so the pipeline can drop defensive .copy() calls without
+    changing results. pandas 2.x opts in via the mode.copy_on_write option; on pandas 3
+    it is always on and this is a no-op.
+    """
+    if not enabled or copy_on_write_always_on():
+        ctx = nullcontext()
+    else:
+        ctx = pd.option_context("mode.copy_on_write", True)
+
+    with ctx:
+        yield
@@ -0,0 +1,155 @@
+# src/dates.py
+from __future__ import annotations
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from dateutil import parser
+
+
+# Tried in order; month-first variants come before day-first ones so ambiguous
+# values resolve the same way dateutil.parser.parse does by default.
+CANDIDATE_FORMATS: Sequence[str] = (
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y",
+    "%m/%d/%y",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+    "%Y/%m/%d",
+    "%d.%m.%Y",
+)
+
+DETECT_SAMPLE_SIZE = 200
+
+# source key (e.g. "budget.Date") -> detected strptime format
+_FORMAT_CACHE: Dict[str, Optional[str]] = {}
+
+
+def _parse_with_format(values: pd.Index, fmt: str) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(pd.to_datetime(values, format=fmt, errors="coerce"))
+
+
+def detect_date_format(values: Sequence[str], sample_size: int = DETECT_SAMPLE_SIZE) -> Optional[str]:
+    """
+    Pick the first candidate format that parses every sampled value.
+    Falls back to the format with the most hits; None if nothing matches.
+    """
+    sample = pd.Index(list(values)[:sample_size])
+    if sample.empty:
+        return None
+
+    best_fmt: Optional[str] = None
+    best_hits = 0
+    for fmt in CANDIDATE_FORMATS:
+        hits = int(_parse_with_format(sample, fmt).notna().sum())
+        if hits == len(sample):
+            return fmt
+        if hits > best_hits:
+            best_fmt, best_hits = fmt, hits
+    return best_fmt
+
+
+def clear_format_cache() -> None:
+    _FORMAT_CACHE.clear()
+
+
+def _dateutil_parse(x: str):
+    try:
+        return parser.parse(x)
+    except Exception:
+        return pd.NaT
+
+
+def _parse_uniques(uniques: pd.Index, source: Optional[str]) -> pd.DatetimeIndex:
+    """Parse distinct string values: cached/detected format first, dateutil for leftovers."""
+    if uniques.empty:
+        return pd.DatetimeIndex([])
+
+    fmt = _FORMAT_CACHE.get(source) if source else None
+    if fmt is None:
+        fmt = detect_date_format(uniques)
+        if source:
+            _FORMAT_CACHE[source] = fmt
+
+    parsed = _parse_with_format(uniques, fmt) if fmt else pd.DatetimeIndex([pd.NaT] * len(uniques))
+
+    # A cached format is kept only while it parses every value: a miss may mean this file uses
+    # another layout (e.g. month-first after a day-first one), so detection runs again with the
+    # missed values leading the sample, and wins when it parses more of the column.
+    missed = parsed.isna()
+    if source and fmt and missed.any():
+        redetected = detect_date_format(uniques[missed].append(uniques[~missed]))
+        if redetected and redetected != fmt:
+            candidate = _parse_with_format(uniques, redetected)
+            if candidate.notna().sum() > parsed.notna().sum():
+                _FORMAT_CACHE[source] = redetected
+                parsed = candidate
+
+    leftover = np.flatnonzero(parsed.isna())
+    if len(leftover):
+        fixed = pd.to_datetime([_dateutil_parse(uniques[i]) for i in leftover], errors="coerce")
+        values = parsed.to_numpy(copy=True)
+        values[leftover] = pd.DatetimeIndex(fixed).tz_localize(None).to_numpy(dtype="datetime64[ns]")
+        parsed = pd.DatetimeIndex(values)
+
+    return parsed
+
+
+def _factorize(s: pd.Series):
+    """Factorize a column into (codes, unique strings); NaN becomes code -1."""
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    uniques = pd.Index(uniques).astype(str).str.strip()
+    return codes, uniques
+
+
+def parse_dates(s: pd.Series, *, source: Optional[str] = None) -> pd.Series:
+    """
+    Parse a date column into datetime64[ns].
+
+    Each distinct value is parsed once. The strptime format is detected on the
+    first call and cached under `source` (e.g. "budget.Date") for later calls, which
+    re-detect it when it misses values. Unparseable values become NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        return s.dt.tz_localize(None) if getattr(s.dt, "tz", None) is not None else s
+
+    codes, uniques = _factorize(s)
+    parsed = _parse_uniques(uniques, source).to_numpy(dtype="datetime64[ns]")
+
+    # Append NaT so the NA sentinel (-1) indexes it
+    lookup = np.append(parsed, np.datetime64("NaT", "ns"))
+    return pd.Series(lookup[codes], index=s.index, name=s.name)
+
+
+def to_dates(s: pd.Series, *, source: Optional[str] = None) -> pd.Series:
+    """Parse a date column into python `date` objects (None for unparseable), memoized per distinct value."""
+    dt = parse_dates(s, source=source)
+    codes, uniques = pd.factorize(dt, use_na_sentinel=True)
+    lookup = np.empty(len(uniques) + 1, dtype=object)
+    lookup[:-1] = pd.DatetimeIndex(uniques).date
+    lookup[-1] = None
+    return pd.Series(lookup[codes], index=s.index, name=s.name, dtype=object)
+
+
+def to_month_start(s: pd.Series, *, source: Optional[str] = None) -> pd.Series:
+    """Vectorized month start (datetime64, midnight on the 1st) for a date column."""
+    dt = parse_dates(s, source=source)
+    months = dt.to_numpy(dtype="datetime64[ns]").astype("datetime64[M]").astype("datetime64[ns]")
+    return pd.Series(months, index=s.index, name=s.name)
+
+
+def month_start_strings(s: pd.Series, *, source: Optional[str] = None) -> pd.Series:
+    """Month start as 'YYYY-MM-01' strings (None for unparseable)."""
+    months = to_month_start(s, source=source)
+    codes, uniques = pd.factorize(months, use_na_sentinel=True)
+    lookup = np.empty(len(uniques) + 1, dtype=object)
+    lookup[:-1] = pd.DatetimeIndex(uniques).strftime("%Y-%m-%d")
+    lookup[-1] = None
+    return pd.Series(lookup[codes], index=s.index, name=s.name, dtype=object)
+
@@ -0,0 +1,230 @@
+# src/dq.py
+from __future__ import annotations
+
+import operator
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_DQ_RULES_PATH = ROOT / "config" / "dq_rules.yml"
+
+RULE_KINDS = ("not_null", "type", "range", "allowed", "date_window", "compare")
+
+REJECT_COLUMNS = ["source_row_num", "pk", "rule_code", "column_name", "value"]
+
+_COMPARE_OPS: Dict[str, Callable[[Any, Any], Any]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+@dataclass(frozen=True)
+class DQRule:
+    """
+    One declarative check on a staging column. kind:
+      - not_null:    column must have a value (rows already failing a type rule on it are not repeated)
+      - type:        a non-blank raw value must have converted (date/amount/int parse failures)
+      - range:       min <= value <= max (amount columns in currency units, compared in cents)
+      - allowed:     value in `values`
+      - date_window: min/max dates; max may be relative, e.g. {max_days_ahead: 366}
+      - compare:     column <op> other column (or `value`), e.g. actual_amount >= 0
+    Missing values only fail not_null and type.
+    """
+    code: str
+    kind: str
+    column: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class DQResult:
+    valid: pd.Series  # boolean mask aligned to the frame
+    rejects: pd.DataFrame  # one row per (row, failed rule): REJECT_COLUMNS
+
+    @property
+    def rejected_rows(self) -> int:
+        return int((~self.valid).sum())
+
+
+def compile_rules(name: str, specs: Sequence[Dict[str, Any]]) -> Tuple[DQRule, ...]:
+    """Compile one source's rule list; raises ValueError on an invalid rule."""
+    rules: List[DQRule] = []
+    for spec in specs or []:
+        spec = dict(spec)
+        kind = spec.pop("kind", None)
+        column = spec.pop("column", None)
+        if kind not in RULE_KINDS:
+            raise ValueError(f"[{name}] unknown rule kind '{kind}'. Expected one of {RULE_KINDS}")
+        if not column:
+            raise ValueError(f"[{name}] {kind} rule needs a column")
+        if kind == "compare" and spec.get("op") not in _COMPARE_OPS:
+            raise ValueError(f"[{name}] compare rule op must be one of {list(_COMPARE_OPS)}")
+        code = str(spec.pop("code", f"{column}_{kind}".upper()))
+        rules.append(DQRule(code=code, kind=kind, column=str(column), params=spec))
+    return tuple(rules)
+
+
+# resolved path -> (mtime_ns, rules per source)
+_CACHE: Dict[Path, Tuple[int, Dict[str, Tuple[DQRule, ...]]]] = {}
+
+
+def load_dq_rules(path: Path = DEFAULT_DQ_RULES_PATH) -> Dict[str, Tuple[DQRule, ...]]:
+    """Rules per source name (same keys as column_maps.yml); {} when the file is absent."""
+    path = Path(path).resolve()
+    if not path.exists():
+        return {}
+    mtime_ns = path.stat().st_mtime_ns
+
+    cached = _CACHE.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
+    cfg = yaml.safe_load(path.read_text()) or {}
+    rules = {str(name): compile_rules(str(name), specs) for name, specs in cfg.items()}
+    _CACHE[path] = (mtime_ns, rules)
+    return rules
+
+
+def _per_unique(s: pd.Series, fn: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """Apply a mask function to the distinct values only, then expand back to rows (NaN -> False)."""
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    per_unique = fn(pd.Series(uniques)).to_numpy(dtype=bool)
+    out = np.append(per_unique, False)[codes]
+    return pd.Series(out, index=s.index)
+
+
+def _blank(src: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(src.dtype):
+        return src.isna()
+    return src.isna() | _per_unique(src, lambda u: u.astype(str).str.strip() == "")
+
+
+def _date_window_fail(d: pd.Series, p: Dict[str, Any]) -> pd.Series:
+    d = pd.to_datetime(d, errors="coerce")
+    fail = pd.Series(False, index=d.index)
+    if "min" in p:
+        fail |= (d < pd.Timestamp(p["min"])).fillna(False)
+    if "max" in p:
+        fail |= (d > pd.Timestamp(p["max"])).fillna(False)
+    if "max_days_ahead" in p:
+        limit = pd.Timestamp(date.today() + timedelta(days=int(p["max_days_ahead"])))
+        fail |= (d > limit).fillna(False)
+    return fail
+
+
+def _scaled(value: Any, money: bool) -> Any:
+    return int(round(float(value) * 100)) if money else value
+
+
+def _failures(
+    rule: DQRule,
+    frame: pd.DataFrame,
+    raw: Optional[pd.DataFrame],
+    source_of: Callable[[str], str],
+    money_cols: Sequence[str],
+) -> pd.Series:
+    """Boolean mask of rows failing one rule (False where the rule does not apply)."""
+    s = frame[rule.column]
+    present = s.notna()
+    p = rule.params
+    money = rule.column in money_cols
+
+    if rule.kind == "not_null":
+        return ~present
+
+    if rule.kind == "type":
+        if raw is None or source_of(rule.column) not in raw.columns:
+            return pd.Series(False, index=frame.index)
+        return ~_blank(raw[source_of(rule.column)]) & ~present
+
+    if rule.kind == "range":
+        fail = pd.Series(False, index=frame.index)
+        if "min" in p:
+            fail |= (s < _scaled(p["min"], money)).fillna(False)
+        if "max" in p:
+            fail |= (s > _scaled(p["max"], money)).fillna(False)
+        return fail
+
+    if rule.kind == "allowed":
+        allowed = [str(v) for v in p.get("values") or []]
+        return present & ~s.astype(object).isin(allowed)
+
+    if rule.kind == "date_window":
+        # Few distinct dates per file: compare each once
+        return _per_unique(s, lambda u: _date_window_fail(u, p))
+
+    # compare
+    op = _COMPARE_OPS[p["op"]]
+    if "other" in p:
+        other = frame[p["other"]]
+        both = present & other.notna()
+    else:
+        other = _scaled(p.get("value"), money)
+        both = present
+    return both & ~op(s, other).fillna(True).astype(bool)
+
+
+def evaluate_rules(
+    frame: pd.DataFrame,
+    rules: Sequence[DQRule],
+    *,
+    pk_col: str,
+    raw: Optional[pd.DataFrame] = None,
+    source_of: Callable[[str], str] = lambda c: c,
+    money_cols: Sequence[str] = (),
+    row_num_col: str = "source_row_num",
+) -> DQResult:
+    """
+    Evaluate all rules as column-wise masks in one pass over the frame.
+    Only failing rows are materialized into the reject log (one entry per failed rule).
+    """
+    valid = np.ones(len(frame), dtype=bool)
+    parts: List[pd.DataFrame] = []
+
+    rules = [r for r in rules if r.column in frame.columns]
+    masks = {id(r): _failures(r, frame, raw, source_of, money_cols).to_numpy(dtype=bool) for r in rules}
+
+    # A value that failed to parse is reported once, as a type failure, not again as missing
+    type_fail: Dict[str, np.ndarray] = {}
+    for r in rules:
+        if r.kind == "type":
+            type_fail[r.column] = type_fail.get(r.column, False) | masks[id(r)]
+
+    for rule in rules:
+        fail = masks[id(rule)]
+        if rule.kind == "not_null" and rule.column in type_fail:
+            fail = fail & ~type_fail[rule.column]
+        if not fail.any():
+            continue
+        valid &= ~fail
+
+        bad = frame.loc[fail]
+        # Log what the file said where possible, not the converted value
+        src_col = source_of(rule.column)
+        values = raw.loc[fail, src_col] if raw is not None and src_col in raw.columns else bad[rule.column]
+        parts.append(
+            pd.DataFrame(
+                {
+                    "source_row_num": bad[row_num_col] if row_num_col in bad.columns else None,
+                    "pk": bad[pk_col].astype(object) if pk_col in bad.columns else None,
+                    "rule_code": rule.code,
+                    "column_name": rule.column,
+                    "value": values.astype(object),
+                },
+                index=bad.index,
+            )
+        )
+
+    rejects = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=REJECT_COLUMNS)
+    return DQResult(valid=pd.Series(valid, index=frame.index), rejects=rejects)
@@ -1,27 +1,359 @@
 # src/export.py
 from __future__ import annotations
 
+import gzip
+import io
+import json
+import os
+import shutil
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from pathlib import Path
-import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
+from src.fact_dims import DIMENSIONS
+from src.rollups import refresh_rollups
+from src.gold_columnar import (
+    AMOUNT_SCALE, BATCH_ROWS, COLUMNAR_FORMATS, GoldColumnarWriter, columnar_path, gold_format, gold_schema,
+    require_pyarrow,
+)
+
+
+GOLD_COLUMNS = ["month_start", "department", "category", "scenario", "amount", "source"]
+GOLD_ORDER = "month_start, department, category, scenario, source"
+
+MANIFEST_NAME = "_manifest.json"
+PARTITION_FILE = "part.csv"
+# Bumped when partition bytes change for the same rows; an older layout is rewritten in full.
+# 2: streamed COPY output (exact NUMERIC text instead of float-formatted amounts)
+# 3: fingerprints from fact_month_digests
+PARTITION_FORMAT = 3
+
+
+COMPRESSIONS = ("gzip", "zstd")
+COPY_BUFFER_SIZE = 1 << 20  # bytes handed to the file (or compressor) per write
+
+
+def _gold_copy_sql(where: str = "", *, cents: bool = False) -> str:
+    """COPY of the gold rows; cents=True rounds amount to two places (e.g. for decimal(18, 2) output)."""
+    columns = [f"round(amount, {AMOUNT_SCALE}) AS amount" if cents and c == "amount" else c for c in GOLD_COLUMNS]
+    return (
+        f"COPY (SELECT {', '.join(columns)} FROM fact_finance_monthly {where} ORDER BY {GOLD_ORDER}) "
+        "TO STDOUT WITH (FORMAT csv, HEADER)"
+    )
 
-def export_gold_fact_to_csv(engine: Engine, out_path: Path) -> Path:
+
+def _open_compressed(raw, compression: Optional[str]):
+    """Writable stream over the binary file `raw`, compressing on the fly."""
+    if compression is None:
+        return raw
+    if compression == "gzip":
+        # mtime=0: the same rows always give the same bytes
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise RuntimeError("zstd compression needs the 'zstandard' package (pip install zstandard)") from e
+        return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False, write_return_read=True)
+    raise ValueError(f"Unknown compression '{compression}'. Expected one of {COMPRESSIONS} or None")
+
+
+def copy_gold_to_file(
+    engine: Engine,
+    out_path: Path,
+    *,
+    where: str = "",
+    params: Optional[Dict[str, Any]] = None,
+    compression: Optional[str] = None,
+    buffer_size: int = COPY_BUFFER_SIZE,
+) -> int:
+    """
+    Stream gold rows straight from COPY ... TO STDOUT into out_path; nothing is materialized in
+    Python, so memory stays at one buffer whatever the fact size. `where` (psycopg2 placeholders,
+    values in `params`) limits the rows. Written to a temp file and renamed into place. Returns the row count.
+    """
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(out_path.name + ".tmp")
+
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cur:
+            # COPY takes no bind parameters: the driver inlines them (pyformat, e.g. %(m)s)
+            sql = cur.mogrify(_gold_copy_sql(where), params or {}).decode()
+            with tmp.open("wb", buffering=0) as raw:
+                # the one fixed-size buffer between COPY's per-row writes and the file/compressor
+                out = io.BufferedWriter(_open_compressed(raw, compression), buffer_size)
+                cur.copy_expert(sql, out)
+                out.close()  # flushes, then ends the compressed stream (raw itself stays open)
+            rows = int(cur.rowcount)
+        raw_conn.commit()
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        raw_conn.close()
+
+    os.replace(tmp, out_path)
+    return rows
+
+
+def export_gold_fact_to_csv(engine: Engine, out_path: Path, *, compression: Optional[str] = None) -> Path:
     """
     Export a Tableau Public friendly CSV (no audit fields needed).
+    Streamed through COPY; compression="gzip"/"zstd" compresses on the fly.
+    """
+    copy_gold_to_file(engine, out_path, compression=compression)
+    return out_path
+
+
+def _month_batches(cur, batch_rows: int) -> List[Tuple[str, str]]:
+    """Consecutive whole-month ranges (first, last) of about batch_rows gold rows each."""
+    cur.execute("SELECT month_start::text, count(*) FROM fact_finance_compact GROUP BY 1 ORDER BY 1")
+    batches: List[Tuple[str, str]] = []
+    first, rows = None, 0
+    for month, n in cur.fetchall():
+        first = first or month
+        rows += int(n)
+        if rows >= batch_rows:
+            batches.append((first, month))
+            first, rows = None, 0
+    if first is not None:
+        batches.append((first, month))
+    return batches
+
+
+def export_gold_columnar(
+    engine: Engine,
+    out_path: Path,
+    fmt: Optional[str] = None,
+    *,
+    batch_rows: int = BATCH_ROWS,
+) -> int:
     """
-    query = """
-    SELECT
-      month_start,
-      department,
-      category,
-      scenario,
-      amount,
-      source
-    FROM fact_finance_monthly
-    ORDER BY month_start, department, category, scenario, source
-    """
-    df = pd.read_sql(query, engine)
+    Export the gold rows as Parquet or Arrow IPC (fmt, or from the suffix), typed and with
+    dictionary-encoded dimensions. Whole months of about batch_rows rows are streamed through
+    COPY and parsed by Arrow's CSV reader (no Python objects per row); each becomes one batch /
+    Parquet row group, in month order, with min/max statistics. All batches read one snapshot;
+    memory stays at one batch. Returns the row count.
+    """
+    fmt = gold_format(out_path, fmt)
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"export_gold_columnar: expected one of {COLUMNAR_FORMATS}, got '{fmt}'")
+    pa = require_pyarrow()
+    import pyarrow.csv  # noqa: F401
+
+    schema = gold_schema(GOLD_COLUMNS)
+    convert = pa.csv.ConvertOptions(
+        column_types={c.name: pa.string() if pa.types.is_dictionary(c.type) else c.type for c in schema}
+    )
+
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cur:
+            # first statement of the transaction: every batch reads the same snapshot
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+            dictionaries = {}
+            for d in DIMENSIONS:
+                cur.execute(f"SELECT {d.column} FROM {d.table}")
+                dictionaries[d.column] = [r[0] for r in cur.fetchall()]
+
+            with GoldColumnarWriter(out_path, fmt, GOLD_COLUMNS, dictionaries) as writer:
+                for first, last in _month_batches(cur, batch_rows):
+                    buf = io.BytesIO()
+                    cur.copy_expert(
+                        cur.mogrify(
+                            # rounded: amounts bootstrapped from float gold files (1234.5600000000002)
+                            # would not fit the decimal(18, 2) column
+                            _gold_copy_sql("WHERE month_start BETWEEN %(first)s::date AND %(last)s::date", cents=True),
+                            {"first": first, "last": last},
+                        ).decode(),
+                        buf,
+                    )
+                    buf.seek(0)
+                    table = pa.csv.read_csv(buf, convert_options=convert).combine_chunks()
+                    del buf
+                    writer.write_columns(dict(zip(table.column_names, (c.chunk(0) for c in table.columns))))
+        raw_conn.rollback()
+    finally:
+        raw_conn.close()
+    return writer.rows
+
+
+# ---------------------------
+# Partitioned gold: <gold_dir>/month=YYYY-MM/part.csv + _manifest.json
+# ---------------------------
+
+@dataclass
+class GoldExportResult:
+    gold_dir: Path
+    written: List[str] = field(default_factory=list)  # partitions ('YYYY-MM') rewritten
+    removed: List[str] = field(default_factory=list)  # partitions whose month left the fact table
+    unchanged: int = 0  # checked partitions whose fingerprint matched
+    combined_path: Optional[Path] = None
+    columnar_paths: List[Path] = field(default_factory=list)  # Parquet / Arrow copies of the combined file
+    skipped: bool = False  # every checked fingerprint matched the manifest: nothing was written
+
+
+def partition_name(month: str) -> str:
+    """'2021-03-01' -> 'month=2021-03'"""
+    return f"month={str(month)[:7]}"
+
+
+def month_digests(conn, months: Optional[Sequence[str]] = None) -> Dict[str, str]:
+    """
+    Fingerprint of each month's fact rows, read from fact_month_digests (kept up to date by
+    every fact write, see src/rollups.py): a primary-key lookup instead of hashing the rows.
+    months=None covers every month in the fact table; months absent from the table are left out.
+    """
+    if not conn.execute(text("SELECT EXISTS (SELECT 1 FROM fact_month_digests)")).scalar():
+        # fact rows loaded before the digests existed: fill them once
+        refresh_rollups(conn, None, tables=["fact_month_digests"])
+    where = "WHERE month_start = ANY(CAST(:months AS date[]))" if months is not None else ""
+    rows = conn.execute(
+        text(f"SELECT month_start::text, fingerprint FROM fact_month_digests {where}"),
+        {"months": list(months)} if months is not None else {},
+    ).all()
+    return {str(r[0]): str(r[1]) for r in rows}
+
+
+def read_manifest(gold_dir: Path) -> Dict[str, Any]:
+    path = Path(gold_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {"partitions": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _write_json_atomic(path: Path, payload: Dict[str, Any]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _write_partition(engine: Engine, gold_dir: Path, month: str) -> int:
+    """Write one month's gold rows to its partition (streamed, temp file + rename). Returns the row count."""
+    return copy_gold_to_file(
+        engine,
+        gold_dir / partition_name(month) / PARTITION_FILE,
+        where="WHERE month_start = CAST(%(m)s AS date)",
+        params={"m": month},
+    )
+
+
+def combine_partitions(gold_dir: Path, out_path: Path) -> Path:
+    """
+    Concatenate the partitions in month order into one CSV (header written once).
+    Byte-level copy: the combined file equals a full ordered export without re-reading the DB.
+    """
+    manifest = read_manifest(gold_dir)
+    tmp = out_path.with_name(out_path.name + ".tmp")
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(out_path, index=False)
+    with tmp.open("wb") as out:
+        out.write((",".join(GOLD_COLUMNS) + "\n").encode("utf-8"))
+        for month in sorted(manifest["partitions"]):
+            with (gold_dir / manifest["partitions"][month]["file"]).open("rb") as part:
+                part.readline()  # header
+                shutil.copyfileobj(part, out, length=1 << 20)
+    os.replace(tmp, out_path)
     return out_path
+
+
+def export_gold_partitions(
+    engine: Engine,
+    gold_dir: Path,
+    *,
+    months: Optional[Sequence[str]] = None,
+    change_event_id: Optional[str] = None,
+    combined_path: Optional[Path] = None,
+    columnar: Sequence[str] = (),
+) -> GoldExportResult:
+    """
+    Incremental gold export, one CSV per month under gold_dir/month=YYYY-MM/.
+
+    months: the fact months the current change event touched ('YYYY-MM-01'); None checks all.
+    Each checked month's DB fingerprint is compared with _manifest.json: only partitions whose
+    fingerprint moved (or that are missing) are rewritten, and partitions of months no longer in
+    the fact table are removed. combined_path, when given, is rebuilt from the partitions
+    (only when a partition changed or the file is missing).
+    columnar: formats ("parquet", "arrow") also written next to combined_path, on the same condition.
+    When every fingerprint matches and all outputs exist, nothing is written (result.skipped),
+    not even the manifest.
+    """
+    if columnar and combined_path is None:
+        raise ValueError("export_gold_partitions: columnar copies need combined_path")
+    gold_dir = Path(gold_dir)
+    gold_dir.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(gold_dir)
+    parts: Dict[str, Dict[str, Any]] = manifest.setdefault("partitions", {})
+    result = GoldExportResult(gold_dir=gold_dir)
+    relayout = manifest.get("format") != PARTITION_FORMAT
+    if not parts or relayout:
+        months = None  # first export in this format: lay out every month
+
+    with engine.begin() as conn:
+        digests = month_digests(conn, months)
+
+    checked = {str(m)[:10] for m in months} if months is not None else set(digests) | {
+        f"{k}-01" for k in parts
+    }
+    now = datetime.now(timezone.utc).isoformat()
+
+    for month in sorted(checked):
+        key = month[:7]
+        digest = digests.get(month)
+        entry = parts.get(key)
+        path = gold_dir / partition_name(month)
+
+        if digest is None:
+            if entry is not None or path.exists():
+                shutil.rmtree(path, ignore_errors=True)
+                parts.pop(key, None)
+                result.removed.append(key)
+            continue
+
+        if (
+            not relayout
+            and entry is not None
+            and entry.get("fingerprint") == digest
+            and (path / PARTITION_FILE).exists()
+        ):
+            result.unchanged += 1
+            continue
+
+        rows = _write_partition(engine, gold_dir, month)
+        parts[key] = {
+            "file": f"{partition_name(month)}/{PARTITION_FILE}",
+            "rows": rows,
+            "fingerprint": digest,
+            "change_event_id": change_event_id,
+            "written_at": now,
+        }
+        result.written.append(key)
+
+    changed = bool(result.written or result.removed)
+    if changed or relayout:
+        manifest["format"] = PARTITION_FORMAT
+        manifest["updated_at"] = now
+        manifest["change_event_id"] = change_event_id
+        _write_json_atomic(gold_dir / MANIFEST_NAME, manifest)
+
+    outputs_exist = True
+    if combined_path is not None:
+        combined_path = Path(combined_path)
+        outputs_exist = combined_path.exists()
+        if changed or not combined_path.exists():
+            combine_partitions(gold_dir, combined_path)
+        result.combined_path = combined_path
+
+        for fmt in columnar:
+            path = columnar_path(combined_path, fmt)
+            outputs_exist = outputs_exist and path.exists()
+            if changed or not path.exists():
+                export_gold_columnar(engine, path, fmt)
+            result.columnar_paths.append(path)
+    result.skipped = not changed and not relayout and outputs_exist
+    return result
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Iterable, Optional
 import io
 
 import pandas as pd
@@ -58,16 +59,29 @@ def get_raw_row_count(path: Path) -> int:
         return 0
 
 
-def read_table_clean_cols(path: Path) -> pd.DataFrame:
-    """Read a CSV/XLSX file, normalize column names, and add source row position."""
+def read_table_clean_cols(path: Path, categorical_cols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Read a CSV/XLSX file, normalize column names, and add source row position.
+
+    categorical_cols: low-cardinality columns to parse straight into pandas categoricals
+    (e.g. Department/Region), so they never materialize as per-row Python strings.
+    """
+    categorical_cols = list(categorical_cols or [])
+    dtype = {c: "category" for c in categorical_cols} or None
+
     suffix = path.suffix.lower()
     if suffix in {".xlsx", ".xls"}:
-        df = pd.read_excel(path)
+        df = pd.read_excel(path, dtype=dtype)
     else:
-        df = pd.read_csv(path)
+        df = pd.read_csv(path, dtype=dtype)
 
     df.columns = [str(c).strip() for c in df.columns]
 
+    # Headers with stray whitespace don't match the dtype map; convert them after the rename
+    for c in categorical_cols:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+
     # Add a stable 1-based "Excel-like" row number INCLUDING header offset.
     # Header is row 1, so first data row is row 2.
     if "source_row_num" not in df.columns:
@@ -0,0 +1,278 @@
+# src/fact_delta.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from src.amounts import cents_to_decimal
+from src.category_map import CompiledCategoryMap
+from src.fact_dims import resolve_keys
+from src.rebuild_fact import (
+    FACT_CONTRIBUTIONS,
+    FactContribution,
+    fact_aggregate_sql,
+    rebuild_fact_months,
+    staging_backed_sql,
+)
+from src.rollups import refresh_rollups
+
+
+FACT_KEY = ["month_start", "department", "category", "scenario", "source"]
+DELTA_COLUMNS = FACT_KEY + ["amount_cents", "row_delta"]
+
+
+@dataclass
+class FactDeltaResult:
+    keys_upserted: int = 0
+    keys_deleted: int = 0
+    # months with pre-row_count fact rows; rebuilt instead of patched
+    rebuilt_months: List[str] = field(default_factory=list)
+    rebuild_scope: Optional[str] = None  # scope the rebuild of those months took ("months" | "full")
+
+
+def _contribution_frame(
+    c: FactContribution,
+    images: pd.DataFrame,
+    sign: int,
+    category_map: Optional[CompiledCategoryMap] = None,
+) -> pd.DataFrame:
+    """
+    Signed fact contributions of staging row images (money in cents) for one contribution.
+    category_map contributions go through the same map the rebuild SQL applies.
+    """
+    if c.date_col not in images.columns:
+        return pd.DataFrame(columns=DELTA_COLUMNS)
+
+    months = pd.to_datetime(images[c.date_col], errors="coerce").dt.strftime("%Y-%m-01")
+
+    def _dim(col: Optional[str], default: str, fallback: Optional[pd.Series] = None) -> Any:
+        if col is None or col not in images.columns:
+            s = pd.Series(None, index=images.index, dtype=object)
+        else:
+            s = images[col].astype(object)
+        if fallback is not None:
+            s = s.where(s.notna(), fallback.astype(object))
+        if col is None and fallback is None:
+            return default
+        return s.where(s.notna(), default)
+
+    canonical = default_department = None
+    if c.category_map and c.category_col in images.columns and category_map is not None and not category_map.empty:
+        canonical, default_department = category_map.lookup(images[c.category_col])
+
+    amounts: Any = 0
+    if c.amount_col in images.columns:
+        amounts = pd.to_numeric(images[c.amount_col], errors="coerce").fillna(0).astype("int64")
+    out = pd.DataFrame(
+        {
+            "month_start": months,
+            "department": _dim(c.department_col, c.department_default, default_department),
+            "category": _dim(None, c.category_default, canonical) if canonical is not None
+            else _dim(c.category_col, c.category_default),
+            "scenario": c.scenario,
+            "source": c.source,
+            "amount_cents": amounts * sign,
+            "row_delta": sign,
+        },
+        index=images.index,
+    )
+    return out.loc[months.notna()]
+
+
+def compute_fact_deltas(
+    table: str,
+    changes: Sequence[Tuple[Optional[Dict[str, Any]], Dict[str, Any]]],
+    category_map: Optional[CompiledCategoryMap] = None,
+) -> pd.DataFrame:
+    """
+    Net per-key deltas from merge before/after images of one staging table:
+    the db_before image is subtracted and the incoming image added, per fact contribution.
+    category_map: the DB's current map (load_db_category_map), as applied by the rebuild.
+    Keys whose amount and row count both net to zero are dropped.
+    """
+    contributions = [c for c in FACT_CONTRIBUTIONS if c.table == table]
+    if not contributions or not changes:
+        return pd.DataFrame(columns=DELTA_COLUMNS)
+
+    before = pd.DataFrame([b for b, _ in changes if b is not None])
+    after = pd.DataFrame([a for _, a in changes])
+
+    parts = [
+        _contribution_frame(c, images, sign, category_map)
+        for images, sign in ((before, -1), (after, 1))
+        if not images.empty
+        for c in contributions
+    ]
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return pd.DataFrame(columns=DELTA_COLUMNS)
+
+    deltas = pd.concat(parts, ignore_index=True).groupby(FACT_KEY, as_index=False)[["amount_cents", "row_delta"]].sum()
+    return deltas.loc[(deltas["amount_cents"] != 0) | (deltas["row_delta"] != 0)].reset_index(drop=True)
+
+
+def apply_fact_deltas(engine: Engine, deltas: pd.DataFrame, change_event_id: str) -> FactDeltaResult:
+    """
+    Patch the fact table (fact_finance_compact) in place, dimension keys resolved through the cache:
+      INSERT ... ON CONFLICT DO UPDATE SET amount = amount + delta, row_count = row_count + delta
+    then delete keys no staging row contributes to any more (row_count <= 0).
+    Months holding staging-backed fact rows without a row_count (loaded before it existed) are
+    rebuilt instead.
+    The rollups of the patched months are refreshed in the same transaction.
+    """
+    result = FactDeltaResult()
+    if deltas.empty:
+        return result
+
+    months = sorted(deltas["month_start"].unique().tolist())
+    keys = resolve_keys(engine, {c: deltas[c].tolist() for c in ("department", "category", "scenario", "source")})
+    deltas = deltas.assign(**keys)
+
+    with engine.begin() as conn:
+        legacy = conn.execute(
+            text(
+                f"""
+                SELECT DISTINCT f.month_start::text
+                FROM fact_finance_compact f
+                JOIN dim_source ds ON ds.source_id = f.source_id
+                WHERE f.month_start = ANY(CAST(:months AS date[])) AND f.row_count IS NULL
+                  AND {staging_backed_sql("f.month_start", "ds.source", "f.row_count")}
+                """
+            ),
+            {"months": months},
+        ).scalars().all()
+        result.rebuilt_months = sorted(str(m) for m in legacy)
+
+        patch = deltas.loc[~deltas["month_start"].isin(result.rebuilt_months)]
+        if not patch.empty:
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO fact_finance_compact AS f
+                    (month_start, department_id, category_id, scenario_id, source_id, amount, row_count,
+                     last_change_event_id, last_updated_at)
+                    SELECT d.month_start, d.department_id, d.category_id, d.scenario_id, d.source_id,
+                           d.amount, d.row_count, :eid, now()
+                    FROM unnest(
+                      CAST(:months AS date[]), CAST(:departments AS smallint[]), CAST(:categories AS smallint[]),
+                      CAST(:scenarios AS smallint[]), CAST(:sources AS smallint[]), CAST(:amounts AS numeric[]),
+                      CAST(:row_counts AS bigint[])
+                    ) AS d(month_start, department_id, category_id, scenario_id, source_id, amount, row_count)
+                    ON CONFLICT (month_start, department_id, category_id, scenario_id, source_id) DO UPDATE SET
+                      amount = f.amount + EXCLUDED.amount,
+                      row_count = f.row_count + EXCLUDED.row_count,
+                      last_change_event_id = EXCLUDED.last_change_event_id,
+                      last_updated_at = now()
+                    """
+                ),
+                {
+                    "eid": change_event_id,
+                    "months": patch["month_start"].tolist(),
+                    "departments": [int(v) for v in patch["department_id"]],
+                    "categories": [int(v) for v in patch["category_id"]],
+                    "scenarios": [int(v) for v in patch["scenario_id"]],
+                    "sources": [int(v) for v in patch["source_id"]],
+                    "amounts": [cents_to_decimal(v) for v in patch["amount_cents"]],
+                    "row_counts": [int(v) for v in patch["row_delta"]],
+                },
+            )
+            result.keys_upserted = int(len(patch))
+
+            deleted = conn.execute(
+                text(
+                    """
+                    DELETE FROM fact_finance_compact
+                    WHERE month_start = ANY(CAST(:months AS date[])) AND row_count <= 0
+                    """
+                ),
+                {"months": sorted(patch["month_start"].unique().tolist())},
+            )
+            result.keys_deleted = int(deleted.rowcount or 0)
+            refresh_rollups(conn, sorted(patch["month_start"].unique().tolist()))
+
+    if result.rebuilt_months:
+        plan = rebuild_fact_months(engine=engine, months=result.rebuilt_months, change_event_id=change_event_id)
+        result.rebuild_scope = plan.scope
+
+    return result
+
+
+def verify_fact(engine: Engine, months: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Compare fact_finance_monthly with a fresh aggregate of the staging tables (all months, or
+    just `months`). Returns one row per mismatching key (empty frame when consistent).
+    Only staging-backed fact rows (staging_backed_sql) are compared: a rebuild keeps the rest.
+    """
+    month_filter = bool(months)
+    fact_filter = "AND month_start = ANY(CAST(:months AS date[]))" if month_filter else ""
+    sql = text(
+        f"""
+        WITH fresh AS (
+          {fact_aggregate_sql(month_filter)}
+        ),
+        cur AS (
+          SELECT month_start, department, category, scenario, source, amount, row_count
+          FROM fact_finance_monthly
+          WHERE {staging_backed_sql("month_start", "source", "row_count")} {fact_filter}
+        )
+        SELECT month_start, department, category, scenario, source,
+               fresh.amount AS expected_amount, cur.amount AS actual_amount,
+               fresh.row_count AS expected_rows, cur.row_count AS actual_rows
+        FROM fresh
+        FULL OUTER JOIN cur USING (month_start, department, category, scenario, source)
+        WHERE fresh.amount IS DISTINCT FROM cur.amount
+           OR fresh.row_count IS DISTINCT FROM cur.row_count
+        ORDER BY month_start, department, category, scenario, source
+        """
+    )
+    params: Dict[str, Any] = {"months": months} if month_filter else {}
+
+    with engine.begin() as conn:
+        rows = conn.execute(sql, params).mappings().all()
+    return pd.DataFrame([dict(r) for r in rows])
+
+
+def pending_fact_months(engine: Engine, exclude_event_id: Optional[str] = None) -> Tuple[List[str], List[str]]:
+    """
+    (months, change_event_ids) recorded in fact_pending_months by imports whose staging merge
+    committed but whose fact update did not (other than exclude_event_id, the running import).
+    Imports are expected to run one at a time, so such entries belong to imports that failed.
+    """
+    with engine.begin() as conn:
+        rows = conn.execute(
+            text(
+                """
+                SELECT change_event_id::text AS eid, month_start::text AS month_start
+                FROM fact_pending_months
+                WHERE change_event_id IS DISTINCT FROM CAST(:eid AS uuid)
+                """
+            ),
+            {"eid": exclude_event_id},
+        ).mappings().all()
+    return sorted({r["month_start"] for r in rows}), sorted({r["eid"] for r in rows})
+
+
+def clear_pending_fact_months(engine: Engine, change_event_ids: Sequence[str]) -> None:
+    """Forget the pending fact months of these change events (their fact update committed)."""
+    if not change_event_ids:
+        return
+    with engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM fact_pending_months WHERE change_event_id = ANY(CAST(:ids AS uuid[]))"),
+            {"ids": [str(i) for i in change_event_ids]},
+        )
+
+
+def verify_due(engine: Engine, every: int) -> bool:
+    """True on every `every`-th successful import (0 disables periodic verification)."""
+    if every <= 0:
+        return False
+    with engine.begin() as conn:
+        n = conn.execute(
+            text("SELECT count(*) FROM etl_change_events WHERE status IN ('SUCCESS', 'CONFLICTS')")
+        ).scalar()
+    return (int(n or 0) + 1) % every == 0
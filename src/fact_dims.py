@@ -0,0 +1,208 @@
+# src/fact_dims.py
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+@dataclass(frozen=True)
+class Dimension:
+    """A text attribute of the fact key, stored once in its own table under a SMALLINT key."""
+    column: str  # name column in the dimension table and in the compatibility view
+    table: str
+    key_col: str
+
+
+DIMENSIONS: Tuple[Dimension, ...] = (
+    Dimension(column="department", table="dim_department", key_col="department_id"),
+    Dimension(column="category", table="dim_category", key_col="category_id"),
+    Dimension(column="scenario", table="dim_scenario", key_col="scenario_id"),
+    Dimension(column="source", table="dim_source", key_col="source_id"),
+)
+
+FACT_STORE = "fact_finance_compact"  # physical table, keyed on dimension ids
+FACT_VIEW = "fact_finance_monthly"  # compatibility view with the text columns
+LEGACY_TABLE = "fact_finance_monthly_legacy"
+VERSION_TABLE = "fact_version"  # one row, bumped with every fact write
+
+STORE_COLUMNS = (
+    "month_start, department_id, category_id, scenario_id, source_id, amount, row_count, "
+    "last_change_event_id, last_updated_at"
+)
+
+
+def compat_view_sql() -> str:
+    joins = "\n".join(f"    JOIN {d.table} USING ({d.key_col})" for d in DIMENSIONS)
+    return f"""
+    CREATE OR REPLACE VIEW {FACT_VIEW} AS
+    SELECT f.month_start, department, category, scenario, f.amount, source,
+           f.last_change_event_id, f.last_updated_at, f.row_count
+    FROM {FACT_STORE} f
+{joins}
+    """
+
+
+def sync_dimensions(conn, source_table: str) -> None:
+    """Add the dimension values found in `source_table` (text-keyed fact rows) that are new."""
+    for d in DIMENSIONS:
+        conn.execute(
+            text(
+                f"""
+                INSERT INTO {d.table} ({d.column})
+                SELECT DISTINCT s.{d.column} FROM {source_table} s
+                WHERE NOT EXISTS (SELECT 1 FROM {d.table} x WHERE x.{d.column} = s.{d.column})
+                ORDER BY 1
+                ON CONFLICT ({d.column}) DO NOTHING
+                """
+            )
+        )
+
+
+def store_resolved(conn, source_table: str, target_table: str = FACT_STORE) -> None:
+    """INSERT text-keyed fact rows from `source_table` into a compact table, resolving keys by join."""
+    sync_dimensions(conn, source_table)
+    joins = "\n".join(f"JOIN {d.table} USING ({d.column})" for d in DIMENSIONS)
+    conn.execute(
+        text(
+            f"""
+            INSERT INTO {target_table} ({STORE_COLUMNS})
+            SELECT s.month_start, department_id, category_id, scenario_id, source_id,
+                   s.amount, s.row_count, s.last_change_event_id, s.last_updated_at
+            FROM {source_table} s
+            {joins}
+            """
+        )
+    )
+
+
+def bump_fact_version(conn) -> int:
+    """Move the fact version stamp on the caller's connection, so it commits with the fact write."""
+    return int(
+        conn.execute(
+            text(
+                f"""
+                INSERT INTO {VERSION_TABLE} (id, version, updated_at) VALUES (1, 1, now())
+                ON CONFLICT (id) DO UPDATE
+                SET version = {VERSION_TABLE}.version + 1, updated_at = excluded.updated_at
+                RETURNING version
+                """
+            )
+        ).scalar()
+    )
+
+
+# (database url, dimension table) -> name -> id; dimension ids never change once assigned
+_KEYS: Dict[Tuple[str, str], Dict[str, int]] = {}
+_KEYS_LOCK = threading.Lock()
+
+
+def dimension_keys(engine: Engine, dim: Dimension, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Ids for dimension values, from a process-wide cache; values not cached yet are read (and
+    created when new) in one round trip and committed right away, so cached ids are always durable.
+    """
+    cache_key = (engine.url.render_as_string(hide_password=True), dim.table)
+    wanted = {str(n) for n in names}
+    with _KEYS_LOCK:
+        cache = _KEYS.setdefault(cache_key, {})
+        missing = sorted(wanted - cache.keys())
+
+    if missing:
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    f"""
+                    INSERT INTO {dim.table} ({dim.column})
+                    SELECT n FROM unnest(CAST(:names AS text[])) AS n
+                    WHERE NOT EXISTS (SELECT 1 FROM {dim.table} x WHERE x.{dim.column} = n)
+                    ON CONFLICT ({dim.column}) DO NOTHING
+                    """
+                ),
+                {"names": missing},
+            )
+            rows = conn.execute(
+                text(f"SELECT {dim.column}, {dim.key_col} FROM {dim.table} WHERE {dim.column} = ANY(CAST(:names AS text[]))"),
+                {"names": missing},
+            ).all()
+        with _KEYS_LOCK:
+            cache.update({str(r[0]): int(r[1]) for r in rows})
+
+    with _KEYS_LOCK:
+        return {n: cache[n] for n in wanted}
+
+
+def resolve_keys(engine: Engine, rows: Dict[str, List[str]]) -> Dict[str, List[int]]:
+    """Per dimension column, the ids of a column of names (e.g. {"department": [...]} -> {"department_id": [...]})."""
+    out: Dict[str, List[int]] = {}
+    for d in DIMENSIONS:
+        names = [str(v) for v in rows[d.column]]
+        ids = dimension_keys(engine, d, names)
+        out[d.key_col] = [ids[n] for n in names]
+    return out
+
+
+def dependent_views(conn, relation: str) -> List[Tuple[str, str]]:
+    """
+    (view name, definition) of the views reading `relation`, directly or through other views,
+    in creation order, so a swap or migration that drops it can re-create them.
+    """
+    rows = conn.execute(
+        text(
+            """
+            WITH RECURSIVE deps(oid, depth) AS (
+                SELECT CAST(:rel AS regclass)::oid, 0
+                UNION
+                SELECT v.oid, deps.depth + 1
+                FROM deps
+                JOIN pg_depend d ON d.refobjid = deps.oid
+                JOIN pg_rewrite r ON r.oid = d.objid
+                JOIN pg_class v ON v.oid = r.ev_class
+                WHERE v.relkind = 'v' AND v.oid <> deps.oid
+            )
+            SELECT oid::regclass::text AS name, pg_get_viewdef(oid) AS definition
+            FROM deps
+            WHERE depth > 0
+            GROUP BY oid
+            ORDER BY max(depth), 1
+            """
+        ),
+        {"rel": relation},
+    ).all()
+    return [(str(r[0]), str(r[1])) for r in rows]
+
+
+def ensure_fact_storage(engine: Engine) -> bool:
+    """
+    Make fact_finance_monthly the compatibility view over the compact table. A database still
+    holding fact_finance_monthly as a table is migrated once: its rows move to the compact table
+    (keys resolved through the dimension tables) and the table is replaced by the view.
+    Views built on the old table are re-created on the new view.
+    Returns True when a migration ran.
+    """
+    with engine.begin() as conn:
+        kind = conn.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {"t": FACT_VIEW}
+        ).scalar()
+
+        if kind == "v":
+            return False
+        if kind is None:
+            conn.execute(text(compat_view_sql()))
+            return False
+
+        views = dependent_views(conn, FACT_VIEW)
+        conn.execute(text(f"ALTER TABLE {FACT_VIEW} RENAME TO {LEGACY_TABLE}"))
+        # a table from before row_count existed: its keys get NULL (unknown staging rows behind them)
+        conn.execute(text(f"ALTER TABLE {LEGACY_TABLE} ADD COLUMN IF NOT EXISTS row_count BIGINT"))
+        conn.execute(text(f"TRUNCATE TABLE {FACT_STORE}"))
+        store_resolved(conn, LEGACY_TABLE)
+        conn.execute(text(f"DROP TABLE {LEGACY_TABLE} CASCADE"))
+        conn.execute(text(compat_view_sql()))
+        for name, definition in views:
+            conn.execute(text(f"CREATE OR REPLACE VIEW {name} AS {definition}"))
+        bump_fact_version(conn)
+    return True
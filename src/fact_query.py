@@ -0,0 +1,200 @@
+# src/fact_query.py
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+@dataclass(frozen=True)
+class FactQuery:
+    """Filter over fact_finance_monthly; None/empty means no filter on that field."""
+    start: Optional[str] = None  # first month, 'YYYY-MM-01' (inclusive)
+    end: Optional[str] = None  # last month, 'YYYY-MM-01' (inclusive)
+    departments: Tuple[str, ...] = ()
+    categories: Tuple[str, ...] = ()
+    scenarios: Tuple[str, ...] = ()
+
+    @classmethod
+    def of(
+        cls,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        departments: Optional[Sequence[str]] = None,
+        categories: Optional[Sequence[str]] = None,
+        scenarios: Optional[Sequence[str]] = None,
+    ) -> "FactQuery":
+        """Normalized query: filter lists are sorted and de-duplicated so equal filters share a cache key."""
+        norm = lambda v: tuple(sorted({str(x) for x in v or []}))  # noqa: E731
+        return cls(start, end, norm(departments), norm(categories), norm(scenarios))
+
+    def where(self, month_col: str = "month_start", *, with_scenario: bool = True) -> Tuple[str, Dict[str, Any]]:
+        clauses: List[str] = []
+        params: Dict[str, Any] = {}
+        if self.start:
+            clauses.append(f"{month_col} >= CAST(:start AS date)")
+            params["start"] = self.start
+        if self.end:
+            clauses.append(f"{month_col} <= CAST(:end AS date)")
+            params["end"] = self.end
+        filters = [("department", "departments", self.departments), ("category", "categories", self.categories)]
+        if with_scenario:
+            filters.append(("scenario", "scenarios", self.scenarios))
+        for col, name, values in filters:
+            if values:
+                clauses.append(f"{col} = ANY(CAST(:{name} AS text[]))")
+                params[name] = list(values)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def fact_version(engine: Engine) -> int:
+    """
+    Version of fact_finance_monthly: the fact_version stamp, read by primary key. Every rebuild,
+    delta or bootstrap bumps it in the transaction that writes the fact rows (fact_dims.bump_fact_version),
+    so any committed change to the table (including one that only deletes keys) moves it.
+    """
+    with engine.begin() as conn:
+        version = conn.execute(text("SELECT version FROM fact_version WHERE id = 1")).scalar()
+    return int(version or 0)
+
+
+class ResultCache:
+    """
+    In-process LRU of query results keyed on (query, fact version). With spill_dir, entries
+    evicted from memory are pickled there and read back on a later hit. Entries for older fact
+    versions are dropped (memory and disk) as soon as a newer version is seen.
+    """
+
+    def __init__(self, max_entries: int = 128, spill_dir: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self._mem: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.spill_dir:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _digest(value: Any) -> str:
+        return hashlib.sha1(repr(value).encode("utf-8")).hexdigest()
+
+    def key(self, kind: str, query: FactQuery, version: int) -> str:
+        # version digest first: spilled files of other versions can be recognized and removed
+        return f"{self._digest(version)[:16]}_{self._digest((kind, query))}"
+
+    def _spill_path(self, key: str) -> Path:
+        assert self.spill_dir is not None
+        return self.spill_dir / f"{key}.pkl"
+
+    def set_version(self, version: int) -> None:
+        """Forget entries of any other fact version (spilled ones from earlier processes too)."""
+        with self._lock:
+            if version == self._version:
+                return
+            self._version = version
+            self._mem.clear()
+            if self.spill_dir:
+                current = self._digest(version)[:16]
+                for p in self.spill_dir.glob("*.pkl"):
+                    if not p.name.startswith(current):
+                        p.unlink(missing_ok=True)
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        with self._lock:
+            df = self._mem.get(key)
+            if df is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return df
+            if self.spill_dir and self._spill_path(key).exists():
+                with self._spill_path(key).open("rb") as f:
+                    df = pickle.load(f)
+                self._put(key, df)
+                self.hits += 1
+                return df
+            self.misses += 1
+            return None
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        with self._lock:
+            self._put(key, df)
+
+    def _put(self, key: str, df: pd.DataFrame) -> None:
+        self._mem[key] = df
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            old_key, old_df = self._mem.popitem(last=False)
+            if self.spill_dir:
+                # temp file + rename: a concurrent reader never sees a half-written pickle
+                path = self._spill_path(old_key)
+                tmp = path.with_suffix(".tmp")
+                with tmp.open("wb") as f:
+                    pickle.dump(old_df, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, path)
+
+
+class FactQueryAPI:
+    """
+    Read API over the fact table for report consumers:
+      - fact():     fact rows filtered by month range / department / category / scenario
+      - variance(): actual vs budget per month (fact_finance_variance rollup)
+    Results are cached per (query, fact version); every import, rebuild or bootstrap that writes
+    fact_finance_monthly bumps the version in the same transaction, so stale results are never
+    served. Each call costs one primary-key read of the version row; cached results are shared,
+    treat them as read-only.
+    """
+
+    def __init__(self, engine: Engine, *, max_entries: int = 128, spill_dir: Optional[Path] = None):
+        self.engine = engine
+        self.cache = ResultCache(max_entries=max_entries, spill_dir=spill_dir)
+
+    def _cached(self, kind: str, query: FactQuery, sql: str, params: Dict[str, Any]) -> pd.DataFrame:
+        version = fact_version(self.engine)
+        self.cache.set_version(version)
+        key = self.cache.key(kind, query, version)
+
+        df = self.cache.get(key)
+        if df is None:
+            with self.engine.begin() as conn:
+                df = pd.read_sql(text(sql), conn, params=params)
+            self.cache.put(key, df)
+        return df
+
+    def fact(self, query: Optional[FactQuery] = None, **filters: Any) -> pd.DataFrame:
+        query = query or FactQuery.of(**filters)
+        where, params = query.where()
+        sql = f"""
+            SELECT month_start, department, category, scenario, source, amount
+            FROM fact_finance_monthly
+            {where}
+            ORDER BY month_start, department, category, scenario, source
+        """
+        return self._cached("fact", query, sql, params)
+
+    def variance(self, query: Optional[FactQuery] = None, **filters: Any) -> pd.DataFrame:
+        """
+        Pivoted actual / budget / variance (and year-to-date) per month, department and category.
+        The scenario filter does not apply (both scenarios are the columns).
+        """
+        query = query or FactQuery.of(**filters)
+        where, params = query.where(with_scenario=False)
+        sql = f"""
+            SELECT month_start, department, category,
+                   actual_amount, budget_amount, variance_amount,
+                   ytd_actual_amount, ytd_budget_amount, ytd_variance_amount
+            FROM fact_finance_variance
+            {where}
+            ORDER BY month_start, department, category
+        """
+        return self._cached("variance", query, sql, params)
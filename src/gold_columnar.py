@@ -0,0 +1,160 @@
+# src/gold_columnar.py
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import pandas as pd
+
+
+# Typed, columnar copies of the gold fact for downstream analytics. pyarrow is optional:
+# it is imported on first use, and CSV output works without it.
+COLUMNAR_FORMATS = ("parquet", "arrow")
+GOLD_FORMATS = ("csv",) + COLUMNAR_FORMATS
+FORMAT_SUFFIXES = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+DIM_COLUMNS = ("department", "category", "scenario", "source")
+AMOUNT_PRECISION, AMOUNT_SCALE = 18, 2  # NUMERIC money, two places (see src/amounts.py)
+
+# One streamed batch = one Parquet row group; rows arrive ordered by month_start, so each
+# row group covers a narrow month range and its min/max statistics let readers skip it.
+BATCH_ROWS = 128 * 1024
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute  # noqa: F401
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("Parquet / Arrow output needs the 'pyarrow' package (pip install pyarrow)") from e
+    return pyarrow
+
+
+def gold_format(path: Path, fmt: Optional[str] = None) -> str:
+    """Output format: `fmt` when given, else from the file suffix (CSV for unknown suffixes)."""
+    fmt = fmt or FORMAT_SUFFIXES.get(Path(path).suffix.lower(), "csv")
+    if fmt not in GOLD_FORMATS:
+        raise ValueError(f"Unknown gold format '{fmt}'. Expected one of {GOLD_FORMATS}")
+    return fmt
+
+
+def columnar_path(path: Path, fmt: str) -> Path:
+    """gold_fact_finance.csv -> gold_fact_finance.parquet / .arrow"""
+    return Path(path).with_suffix("." + fmt)
+
+
+def gold_schema(columns: Sequence[str]):
+    """
+    Arrow schema of the gold columns: month_start date32, dimensions dictionary<int16, string>,
+    amount decimal128(18, 2); any other column (e.g. load_id) is a string.
+    """
+    pa = require_pyarrow()
+    types = {
+        "month_start": pa.date32(),
+        "amount": pa.decimal128(AMOUNT_PRECISION, AMOUNT_SCALE),
+        **{c: pa.dictionary(pa.int16(), pa.string()) for c in DIM_COLUMNS},
+    }
+    return pa.schema([pa.field(c, types.get(c, pa.string()), nullable=c not in types) for c in columns])
+
+
+class GoldColumnarWriter:
+    """
+    Streaming Parquet / Arrow IPC file writer. Dimension columns are encoded against fixed
+    dictionaries given up front (every batch shares them, as the IPC file format requires);
+    the file is written under a temp name and renamed into place on close().
+    """
+
+    def __init__(self, path: Path, fmt: str, columns: Sequence[str], dictionaries: Mapping[str, Iterable[str]]):
+        pa = self._pa = require_pyarrow()
+        if fmt not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unknown columnar format '{fmt}'. Expected one of {COLUMNAR_FORMATS}")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self.schema = gold_schema(columns)
+        self.rows = 0
+        self._dicts = {
+            c: pa.array(sorted({str(v) for v in dictionaries[c]}), pa.string())
+            for c in columns if c in DIM_COLUMNS
+        }
+
+        if fmt == "parquet":
+            pq = pa.parquet
+            sorting = [pq.SortingColumn(0)] if hasattr(pq, "SortingColumn") else None
+            self._writer = pq.ParquetWriter(
+                self._tmp, self.schema, compression="zstd", write_statistics=True, sorting_columns=sorting
+            )
+        else:
+            self._writer = pa.ipc.new_file(self._tmp, self.schema)
+
+    def _column(self, name: str, values: Any):
+        pa, pc = self._pa, self._pa.compute
+        field = self.schema.field(name)
+        if name in self._dicts:
+            values = pa.array(values, pa.string()) if not isinstance(values, pa.Array) else values.cast(pa.string())
+            indices = pc.index_in(values, value_set=self._dicts[name]).cast(pa.int16())
+            if indices.null_count != values.null_count:
+                raise ValueError(f"[gold] {name} values missing from the dictionary")
+            return pa.DictionaryArray.from_arrays(indices, self._dicts[name])
+        if isinstance(values, pa.Array):
+            return values.cast(field.type)
+        if name == "month_start":
+            # 'YYYY-MM-01' strings, dates or timestamps
+            return pa.array(pd.to_datetime(pd.Series(values)).dt.date, pa.date32())
+        return pa.array(values, field.type)
+
+    def write_columns(self, columns: Mapping[str, Any]) -> None:
+        """Write one batch given as {column: values} (lists, arrays or Arrow arrays)."""
+        batch = self._pa.record_batch(
+            [self._column(f.name, columns[f.name]) for f in self.schema], schema=self.schema
+        )
+        if batch.num_rows:
+            self._writer.write_batch(batch)
+            self.rows += batch.num_rows
+
+    def close(self) -> Path:
+        self._writer.close()
+        os.replace(self._tmp, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        try:
+            self._writer.close()
+        finally:
+            self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self) -> "GoldColumnarWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _frame_values(s: pd.Series) -> Any:
+    pa = require_pyarrow()
+    if s.name == "month_start":
+        return s.tolist()
+    if s.name == "amount":
+        # float amounts (cents / 100); the decimal(18, 2) cast lands them back on the cent
+        return pa.array(s.to_numpy(dtype="float64"), pa.float64())
+    return pa.array(s.astype(object).where(s.notna(), None), pa.string())
+
+
+def write_frame_columnar(df: pd.DataFrame, path: Path, fmt: str, *, batch_rows: int = BATCH_ROWS) -> int:
+    """Write a gold frame (categorical or plain dimension columns) as Parquet / Arrow IPC, in batches."""
+    columns: List[str] = list(df.columns)
+    dictionaries: Dict[str, Iterable[str]] = {
+        c: df[c].cat.categories if isinstance(df[c].dtype, pd.CategoricalDtype) else df[c].dropna().unique()
+        for c in columns if c in DIM_COLUMNS
+    }
+    with GoldColumnarWriter(path, fmt, columns, dictionaries) as w:
+        for start in range(0, len(df), batch_rows):
+            chunk = df.iloc[start:start + batch_rows]
+            w.write_columns({c: _frame_values(chunk[c]) for c in columns})
+    return w.rows
@@ -2,7 +2,7 @@
 from pathlib import Path
 import argparse
 
-from pipeline import run_import
+from pipeline import run_import, run_staging_backfill
 
 ROOT = Path(__file__).resolve().parents[1]
 
@@ -11,12 +11,37 @@ def main():
     parser.add_argument("--sales", type=str, default=None, help="Path to sales CSV (optional).")
     parser.add_argument("--budget", type=str, default=None, help="Path to budget CSV (optional).")
     parser.add_argument("--dry-run", action="store_true", help="Run without writing gold CSV.")
+    parser.add_argument(
+        "--gold-format", action="append", choices=["parquet", "arrow"], default=[],
+        help="Also write the gold fact as Parquet / Arrow IPC (repeatable; needs pyarrow).",
+    )
+    parser.add_argument(
+        "--backfill-archive", type=str, default=None, metavar="DIR",
+        help="Bootstrap: backfill the staging tables from historical raw files in DIR, then exit.",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --backfill-archive (default: CPUs).")
+    parser.add_argument(
+        "--rebuild-fact", action="store_true", help="With --backfill-archive: rebuild the fact table for the backfilled months."
+    )
     args = parser.parse_args()
 
+    if args.backfill_archive:
+        res = run_staging_backfill(
+            archive_dir=Path(args.backfill_archive),
+            workers=args.workers,
+            rebuild_fact=args.rebuild_fact,
+            progress_cb=print,
+        )
+        print(res["status"], "-", f"Staging backfilled from {res['files']} archive file(s).")
+        for table, counts in res["tables"].items():
+            print(f"  {table}: {counts['inserted']} inserted, {counts['updated']} updated, {counts['unchanged']} unchanged")
+        return
+
     res = run_import(
         sales_path=Path(args.sales) if args.sales else None,
         budget_path=Path(args.budget) if args.budget else None,
         dry_run=args.dry_run,
+        gold_formats=args.gold_format,
     )
     print(res["status"], "-", res["message"])
     if res.get("gold_path"):
@@ -1,14 +1,17 @@
 # src/merge.py
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from collections import defaultdict
-from typing import Dict, Any, List, Optional, Tuple, Callable, DefaultDict
+from datetime import date
+from typing import Dict, Any, List, Optional, Set, Tuple, Callable, DefaultDict
 
+import numpy as np
 import pandas as pd
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
+from .amounts import cents_to_decimal, decimal_to_cents
 from .audit import log_row_change
 
 
@@ -19,6 +22,23 @@ class MergeStats:
     unchanged: int = 0
     conflicted: int = 0
     rejected: int = 0
+    # 'YYYY-MM-01' months touched by inserted/updated rows (new and previous date)
+    impacted_months: Set[str] = field(default_factory=set)
+    # (db_before or None, incoming) per inserted/updated row; filled when collect_changes=True
+    changes: List[Tuple[Optional[Dict[str, Any]], Dict[str, Any]]] = field(default_factory=list)
+
+
+def _month_key(value: Any) -> Optional[str]:
+    """Month start ('YYYY-MM-01') of a date/datetime/ISO string; None when missing or unparseable."""
+    if value is None:
+        return None
+    if isinstance(value, date):
+        return value.strftime("%Y-%m-01")
+    try:
+        ts = pd.Timestamp(value)
+    except (ValueError, TypeError):
+        return None
+    return None if pd.isna(ts) else ts.strftime("%Y-%m-01")
 
 
 def _row_to_json(row: pd.Series) -> Dict[str, Any]:
@@ -42,13 +62,34 @@ def _diff_cols(existing: Optional[Dict[str, Any]], incoming: Dict[str, Any], col
     return changed
 
 
+def _money_to_db(row: Dict[str, Any], money_cols: List[str]) -> Dict[str, Any]:
+    """Copy of a row with int-cent money columns converted to Decimal (NUMERIC params / audit JSON)."""
+    if not money_cols:
+        return row
+    out = dict(row)
+    for c in money_cols:
+        if c in out:
+            out[c] = cents_to_decimal(out[c])
+    return out
+
+
+def _row_from_db(row: Any, money_cols: Optional[List[str]]) -> Dict[str, Any]:
+    d = dict(row)
+    for c in money_cols or []:
+        if c in d:
+            d[c] = decimal_to_cents(d[c])
+    return d
+
+
 def _fetch_existing_bulk(
     engine: Engine,
     table: str,
     pk_col: str,
     pk_vals: List[Any],
     chunk_size: int = 2000,
+    money_cols: Optional[List[str]] = None,
 ) -> Dict[str, Dict[str, Any]]:
+    """Existing rows keyed by str(pk); money_cols come back as int cents to compare with staging."""
     out: Dict[str, Dict[str, Any]] = {}
     if not pk_vals:
         return out
@@ -61,7 +102,29 @@ def _fetch_existing_bulk(
             sql = text(f"SELECT * FROM {table} WHERE {pk_col} IN ({placeholders})")
             rows = conn.execute(sql, params).mappings().all()
             for r in rows:
-                out[str(r[pk_col])] = dict(r)
+                out[str(r[pk_col])] = _row_from_db(r, money_cols)
+    return out
+
+
+def _fetch_existing_by_surrogate(
+    engine: Engine,
+    table: str,
+    sk_col: str,
+    sk_vals: List[int],
+    chunk_size: int = 20000,
+    money_cols: Optional[List[str]] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """Existing rows keyed by their BIGINT surrogate key, fetched with a bigint[] parameter."""
+    out: Dict[int, Dict[str, Any]] = {}
+    if not sk_vals:
+        return out
+
+    sql = text(f"SELECT * FROM {table} WHERE {sk_col} = ANY(CAST(:ids AS BIGINT[]))")
+    with engine.begin() as conn:
+        for i in range(0, len(sk_vals), chunk_size):
+            rows = conn.execute(sql, {"ids": sk_vals[i : i + chunk_size]}).mappings().all()
+            for r in rows:
+                out[int(r[sk_col])] = _row_from_db(r, money_cols)
     return out
 
 
@@ -70,6 +133,61 @@ def _push_sample(sample_list: List[str], value: str, limit: int) -> None:
         sample_list.append(value)
 
 
+DUPLICATE_POLICIES = ("last", "first", "reject")
+
+
+def _resolve_duplicate_pks(
+    df: pd.DataFrame,
+    pk_col: str,
+    policy: str,
+    order_col: Optional[str],
+    sample_size: int,
+) -> Tuple[pd.DataFrame, int, Dict[str, Any]]:
+    """
+    Collapse rows that share a PK within one upload, so each PK is classified once
+    against the DB snapshot and the batched ON CONFLICT never touches a row twice.
+
+    policy:
+      - "last":   keep the row with the highest order_col (source_row_num), i.e. last in the file
+      - "first":  keep the lowest
+      - "reject": drop every row whose PK is duplicated
+    Returns (deduped df, rejected row count, summary).
+    """
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"merge_upsert: duplicate_policy must be one of {DUPLICATE_POLICIES}, got '{policy}'")
+
+    summary: Dict[str, Any] = {
+        "duplicate_policy": policy,
+        "duplicate_pk_count": 0,
+        "duplicate_rows_dropped": 0,
+        "duplicate_pks_sample": [],
+    }
+
+    pk = df[pk_col]
+    dup_any = pk.duplicated(keep=False).to_numpy()
+    if not dup_any.any():
+        return df, 0, summary
+
+    # Positions in file order, so keep="first"/"last" follow source_row_num rather than frame order
+    if order_col and order_col in df.columns:
+        order = np.argsort(df[order_col].to_numpy(), kind="stable")
+    else:
+        order = np.arange(len(df))
+
+    keep_arg = {"last": "last", "first": "first", "reject": False}[policy]
+    drop_sorted = pk.iloc[order].duplicated(keep=keep_arg).to_numpy()
+    drop = np.zeros(len(df), dtype=bool)
+    drop[order] = drop_sorted
+
+    dup_pks = pk[dup_any].drop_duplicates()
+    summary["duplicate_pk_count"] = int(len(dup_pks))
+    summary["duplicate_rows_dropped"] = int(drop.sum())
+    summary["duplicate_pks_sample"] = [str(v) for v in dup_pks.head(sample_size)]
+
+    rejected = int(drop.sum()) if policy == "reject" else 0
+    return df.loc[~drop], rejected, summary
+
+
 def merge_upsert(
     *,
     engine: Engine,
@@ -88,9 +206,17 @@ def merge_upsert(
     fetch_chunk_size: int = 2000,
     write_chunk_size: int = 2000,
     backfill_hash: bool = True,
+    duplicate_policy: str = "last",
+    order_col: Optional[str] = "source_row_num",
+    money_cols: Optional[List[str]] = None,
+    surrogate_col: Optional[str] = None,
+    month_col: Optional[str] = None,
+    collect_changes: bool = False,
+    mark_pending_months: bool = False,
 ) -> Tuple[MergeStats, pd.DataFrame, Dict[str, Any]]:
     """
     Fast upsert with:
+      - in-file duplicate PK resolution (duplicate_policy: last | first | reject)
       - bulk fetch existing rows
       - row_hash short-circuit (when available)
       - batch upsert
@@ -99,11 +225,24 @@ def merge_upsert(
     Important:
       - A difference in row_hash alone is NOT treated as a business update.
       - Metadata-only columns (meta_cols) do not count as business updates.
+      - money_cols hold int cents in df; existing NUMERIC values are converted to cents on fetch,
+        so diffs are exact integer comparisons. Cents become Decimal only in the written
+        parameters and audit JSON.
+      - surrogate_col (BIGINT key column in df, see src/surrogate.py) makes the fetch and the
+        in-memory index use integer keys; pk_col stays the conflict target and audit key.
+      - month_col: date column whose month (incoming and, for updates, db_before) is recorded
+        in stats.impacted_months for every inserted/updated row. Unchanged, conflicted and
+        rejected rows never mark a month.
+      - collect_changes=True keeps the before/after images of inserted/updated rows in
+        stats.changes (money_cols in cents), for incremental fact maintenance.
+      - mark_pending_months=True records stats.impacted_months in fact_pending_months in the
+        same transaction as the upsert, so a fact update that never commits is redone later.
     """
     stats = MergeStats()
     conflicts: List[Dict[str, Any]] = []
 
     meta_cols = meta_cols or ["source_row_num"]
+    money_cols = [c for c in (money_cols or []) if c in df.columns]
 
     updated_by_column_counts: DefaultDict[str, int] = defaultdict(int)
     updated_by_column_samples: DefaultDict[str, List[str]] = defaultdict(list)
@@ -115,6 +254,11 @@ def merge_upsert(
         "conflicted_count": 0,
         "rejected_count": 0,
         "hash_backfilled_count": 0,
+        "impacted_months": [],
+        "duplicate_policy": duplicate_policy,
+        "duplicate_pk_count": 0,
+        "duplicate_rows_dropped": 0,
+        "duplicate_pks_sample": [],
         "inserted_pks_sample": [],
         "updated_pks_sample": [],
         "conflicted_pks_sample": [],
@@ -122,8 +266,6 @@ def merge_upsert(
         "updated_by_column_samples": {},
     }
 
-    df = df.copy()
-
     if pk_col not in df.columns:
         raise KeyError(f"merge_upsert: pk_col '{pk_col}' not found in df columns: {list(df.columns)}")
 
@@ -134,24 +276,47 @@ def merge_upsert(
         rej = int(bad_pk_mask.sum())
         stats.rejected += rej
         diff_summary["rejected_count"] = rej
-        df = df.loc[~bad_pk_mask].copy()
+        df = df.loc[~bad_pk_mask]
+
+    # Same PK more than once in this upload: resolve before classifying against the DB
+    df, dup_rejected, dup_summary = _resolve_duplicate_pks(df, pk_col, duplicate_policy, order_col, diff_sample_size)
+    diff_summary.update(dup_summary)
+    if dup_rejected:
+        stats.rejected += dup_rejected
+        diff_summary["rejected_count"] = stats.rejected
 
     if df.empty:
         return stats, pd.DataFrame(conflicts), diff_summary
 
-    pk_vals = df[pk_col].tolist()
-    existing_map = _fetch_existing_bulk(
-        engine=engine,
-        table=table,
-        pk_col=pk_col,
-        pk_vals=pk_vals,
-        chunk_size=fetch_chunk_size,
-    )
+    if surrogate_col and surrogate_col not in df.columns:
+        raise KeyError(f"merge_upsert: surrogate_col '{surrogate_col}' not found in df columns: {list(df.columns)}")
+
+    existing_map: Dict[Any, Dict[str, Any]]
+    if surrogate_col:
+        existing_map = _fetch_existing_by_surrogate(
+            engine=engine,
+            table=table,
+            sk_col=surrogate_col,
+            sk_vals=[int(v) for v in df[surrogate_col].to_numpy()],
+            chunk_size=max(fetch_chunk_size, 20000),
+            money_cols=money_cols,
+        )
+    else:
+        existing_map = _fetch_existing_bulk(
+            engine=engine,
+            table=table,
+            pk_col=pk_col,
+            pk_vals=df[pk_col].tolist(),
+            chunk_size=fetch_chunk_size,
+            money_cols=money_cols,
+        )
 
     total = int(len(df))
 
     # Build batch upsert statement. compare_cols are the columns written to the table.
     cols = [pk_col] + [c for c in compare_cols if c != pk_col]
+    if surrogate_col and surrogate_col not in cols:
+        cols.append(surrogate_col)
     cols_sql = ", ".join(cols + ["last_change_event_id", "last_updated_at"])
     vals_sql = ", ".join([f":{c}" for c in cols] + [":last_change_event_id", "now()"])
     update_sql = ", ".join(
@@ -169,17 +334,21 @@ def merge_upsert(
     )
 
     # Business columns for diffing: exclude pk, hash, and metadata
-    business_cols = [c for c in compare_cols if c != pk_col and c != hash_col and c not in set(meta_cols)]
+    business_cols = [
+        c for c in compare_cols
+        if c != pk_col and c != hash_col and c != surrogate_col and c not in set(meta_cols)
+    ]
 
     to_write_params: List[Dict[str, Any]] = []
     to_write_audit: List[Dict[str, Any]] = []
+    to_backfill: List[Dict[str, Any]] = []
 
     for idx, (_, row) in enumerate(df.iterrows(), start=1):
         pk_val = row[pk_col]
         pk_key = str(pk_val)
 
         incoming = _row_to_json(row)
-        existing = existing_map.get(pk_key)
+        existing = existing_map.get(int(row[surrogate_col]) if surrogate_col else pk_key)
 
         inc_h = incoming.get(hash_col) if hash_col else None
         ex_h = existing.get(hash_col) if (hash_col and existing is not None) else None
@@ -198,7 +367,7 @@ def merge_upsert(
         if existing is not None and not changed_cols:
             stats.unchanged += 1
 
-            # Optional: backfill hash without counting as update
+            # Optional: backfill hash without counting as update (written in batches below)
             if (
                 backfill_hash
                 and (not dry_run)
@@ -206,23 +375,7 @@ def merge_upsert(
                 and inc_h is not None
                 and (ex_h is None or ex_h != inc_h)
             ):
-                try:
-                    with engine.begin() as conn:
-                        conn.execute(
-                            text(
-                                f"""
-                                UPDATE {table}
-                                SET {hash_col} = :h,
-                                    last_change_event_id = :eid,
-                                    last_updated_at = now()
-                                WHERE {pk_col} = :pk
-                                """
-                            ),
-                            {"h": inc_h, "eid": change_event_id, "pk": pk_val},
-                        )
-                    diff_summary["hash_backfilled_count"] += 1
-                except Exception:
-                    pass
+                to_backfill.append({"h": inc_h, "eid": change_event_id, "pk": pk_val})
 
             if progress_cb and (idx % progress_every == 0 or idx == total):
                 progress_cb(idx, total, f"{table}: scanning")
@@ -248,8 +401,8 @@ def merge_upsert(
                     pk=pk_key,
                     op="UPDATE",
                     changed_columns=changed_cols,
-                    db_before=existing,
-                    db_after=incoming,
+                    db_before=_money_to_db(existing, money_cols),
+                    db_after=_money_to_db(incoming, money_cols),
                     applied=False,
                     conflict=True,
                     conflict_reason=f"Protected field mismatch: {', '.join(conflict_cols)}",
@@ -259,8 +412,8 @@ def merge_upsert(
                 {
                     "pk": pk_key,
                     "conflict_columns": ", ".join(conflict_cols),
-                    "db_before": existing,
-                    "patch_after": incoming,
+                    "db_before": _money_to_db(existing, money_cols),
+                    "patch_after": _money_to_db(incoming, money_cols),
                 }
             )
 
@@ -284,27 +437,72 @@ def merge_upsert(
                 updated_by_column_counts[col] += 1
                 _push_sample(updated_by_column_samples[col], pk_key, diff_sample_size)
 
+        if month_col:
+            for v in (incoming.get(month_col), existing.get(month_col) if existing is not None else None):
+                m = _month_key(v)
+                if m is not None:
+                    stats.impacted_months.add(m)
+        if collect_changes:
+            stats.changes.append((existing, incoming))
+
         if dry_run:
             if progress_cb and (idx % progress_every == 0 or idx == total):
                 progress_cb(idx, total, f"{table}: scanning")
             continue
 
         # Write params (we write compare_cols + meta cols, as provided)
-        params = {c: incoming.get(c) for c in cols}
+        params = _money_to_db({c: incoming.get(c) for c in cols}, money_cols)
         params["last_change_event_id"] = change_event_id
         to_write_params.append(params)
         to_write_audit.append(
-            dict(pk=pk_key, op=op, changed_columns=changed_cols, db_before=existing, db_after=incoming)
+            dict(
+                pk=pk_key,
+                op=op,
+                changed_columns=changed_cols,
+                db_before=None if existing is None else _money_to_db(existing, money_cols),
+                db_after=_money_to_db(incoming, money_cols),
+            )
         )
 
         if progress_cb and (idx % progress_every == 0 or idx == total):
             progress_cb(idx, total, f"{table}: scanning")
 
+    # Hash backfill for unchanged rows (best-effort, batched)
+    if to_backfill:
+        backfill_sql = text(
+            f"""
+            UPDATE {table}
+            SET {hash_col} = :h,
+                last_change_event_id = :eid,
+                last_updated_at = now()
+            WHERE {pk_col} = :pk
+            """
+        )
+        for i in range(0, len(to_backfill), write_chunk_size):
+            batch = to_backfill[i : i + write_chunk_size]
+            try:
+                with engine.begin() as conn:
+                    conn.execute(backfill_sql, batch)
+                diff_summary["hash_backfilled_count"] += len(batch)
+            except Exception:
+                pass
+
     # Batch write + audit only for changed rows
     if (not dry_run) and to_write_params:
         with engine.begin() as conn:
             for i in range(0, len(to_write_params), write_chunk_size):
                 conn.execute(upsert_sql, to_write_params[i : i + write_chunk_size])
+            if mark_pending_months and stats.impacted_months:
+                conn.execute(
+                    text(
+                        """
+                        INSERT INTO fact_pending_months (change_event_id, month_start)
+                        SELECT CAST(:eid AS uuid), m FROM unnest(CAST(:months AS date[])) AS m
+                        ON CONFLICT DO NOTHING
+                        """
+                    ),
+                    {"eid": str(change_event_id), "months": sorted(stats.impacted_months)},
+                )
 
         for a in to_write_audit:
             log_row_change(
@@ -325,5 +523,6 @@ def merge_upsert(
         sorted(updated_by_column_counts.items(), key=lambda kv: (-kv[1], kv[0]))
     )
     diff_summary["updated_by_column_samples"] = dict(updated_by_column_samples)
+    diff_summary["impacted_months"] = sorted(stats.impacted_months)
 
     return stats, pd.DataFrame(conflicts), diff_summary
@@ -1,19 +1,35 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Optional, Any, Callable, Dict, List
+from typing import Optional, Any, Callable, Dict, List, Sequence
 import inspect
 
 import pandas as pd
 
 from src.db import load_db_config, make_engine
 from src.ddl import apply_schema
+from src.fact_dims import ensure_fact_storage
 from src.extract import read_table_clean_cols
 from src.validate import require_columns
-from src.merge import merge_upsert
+from src.merge import MergeStats, merge_upsert
 from src.rebuild_fact import rebuild_fact_months
-from src.export import export_gold_fact_to_csv
-from src.audit import start_change_event, finish_change_event
+from src.export import export_gold_partitions
+from src.gold_columnar import COLUMNAR_FORMATS
+from src.audit import start_change_event, finish_change_event, log_rejected_rows
+from src.bootstrap_staging import backfill_staging_from_archive
+from src.category_map import load_db_category_map, sync_category_map
+from src.cow import copy_on_write_mode
+from src.dq import DEFAULT_DQ_RULES_PATH, load_dq_rules
+from src.fact_delta import (
+    apply_fact_deltas,
+    clear_pending_fact_months,
+    compute_fact_deltas,
+    pending_fact_months,
+    verify_due,
+    verify_fact,
+)
+from src.surrogate import backfill_surrogate_column, resolve_surrogate_keys
+from src.transform_plan import DEFAULT_COLUMN_MAPS_PATH, load_transform_plans
 
 try:
     from src.state import create_state_image
@@ -23,7 +39,9 @@ except Exception:
 
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_GOLD_PATH = ROOT / "data" / "gold" / "gold_fact_finance.csv"
-DEFAULT_CATEGORY_MAP_PATH = ROOT / "data" / "category_map.csv"
+DEFAULT_CATEGORY_MAP_PATH = ROOT / "config" / "category_map.csv"
+
+FACT_MODES = ("rebuild", "incremental")
 
 
 def call_with_supported_kwargs(func: Callable[..., Any], *args, **kwargs) -> Any:
@@ -36,50 +54,138 @@ def call_with_supported_kwargs(func: Callable[..., Any], *args, **kwargs) -> Any
         raise TypeError(f"{func.__name__}{sig} failed: {e}. Passed kwargs: {sorted(filtered.keys())}") from e
 
 
-def _month_starts_from_dates(s: pd.Series) -> List[str]:
-    dt = pd.to_datetime(s, errors="coerce").dropna()
-    if dt.empty:
-        return []
-    months = dt.dt.to_period("M").dt.to_timestamp().dt.date.astype(str).unique().tolist()
-    months.sort()
-    return months
-
-
-def _compute_row_hash(df: pd.DataFrame, cols: List[str]) -> pd.Series:
-    """
-    Fast fingerprint of selected columns.
-    Uses pandas hashing for speed and stability within pandas.
-    Returns a hex string (16 chars).
-    """
-    base = df[cols].copy()
-    base = base.fillna("")
-    # Ensure stable string representation
-    for c in cols:
-        base[c] = base[c].astype(str)
-
-    h = pd.util.hash_pandas_object(base, index=False).astype("uint64")
-    return h.map(lambda x: f"{int(x):016x}")
-
-
-def _clean_pk_series(series: pd.Series) -> pd.Series:
-    """Clean a would-be PK column into a nullable string series (reject NaN/blank/'nan')."""
-    s = series.copy()
-    s = s.where(~s.isna(), pd.NA)
-    s = s.astype("string").str.strip()
-    bad = s.isna() | (s == "") | (s.str.lower().isin(["nan", "none"]))
-    s = s.where(~bad, pd.NA)
-    return s
-
-
 def run_import(
     *,
     sales_path: Optional[Path] = None,
     budget_path: Optional[Path] = None,
+    source_paths: Optional[Dict[str, Path]] = None,
     dry_run: bool = False,
     actor: str = "streamlit",
     source_name: str = "file_upload",
     gold_out_path: Path = DEFAULT_GOLD_PATH,
+    column_maps_path: Path = DEFAULT_COLUMN_MAPS_PATH,
+    copy_on_write: bool = True,
+    duplicate_policy: Optional[str] = None,
+    dq_rules_path: Path = DEFAULT_DQ_RULES_PATH,
+    fact_mode: str = "rebuild",
+    verify_fact_every: int = 0,
+    rebuild_workers: int = 1,
+    category_map_path: Path = DEFAULT_CATEGORY_MAP_PATH,
+    gold_formats: Sequence[str] = (),
+    progress_cb: Optional[Callable[[str], None]] = None,
+) -> dict:
+    """
+    Run one import of every source in column_maps.yml (load_transform_plans).
+
+    source_paths maps a source name to its input file; sources without one are discovered in
+    data/raw by their `files:` patterns. sales_path / budget_path are shorthands for
+    source_paths["sales"] / source_paths["budget_actual"].
+
+    With copy_on_write=True (default) the frame work runs under pandas Copy-on-Write, so
+    staging/merge/transform steps share buffers instead of copying inputs.
+
+    duplicate_policy overrides each source's `duplicates:` setting (last | first | reject)
+    for PKs that appear more than once in a file.
+
+    Rows failing the data-quality rules in dq_rules_path are not loaded; they are counted
+    as rejected and logged to etl_rejected_rows (not on dry runs). They don't stop a re-run
+    of the same files from finishing as NO_CHANGES, and such a run logs nothing.
+
+    fact_mode:
+      - "rebuild" (default): delete and re-aggregate the impacted months
+      - "incremental": apply signed per-key deltas from the merged rows' before/after images
+    Months whose staging rows an import committed without its fact update (a failure in
+    between; see fact_pending_months) are rebuilt by the next import, in either mode.
+    verify_fact_every=N compares the whole fact table with a fresh aggregate on every N-th
+    successful import (incremental mode) and rebuilds any month that drifted.
+    rebuild_workers > 1 rebuilds month groups on parallel DB connections.
+
+    category_map_path is loaded into the DB map (dim_category_map) when it changed; the fact
+    rebuild applies the DB map, and only months holding re-mapped raw categories are rebuilt.
+
+    gold_formats ("parquet", "arrow") adds typed columnar copies next to the gold CSV
+    (e.g. gold_fact_finance.parquet), rewritten whenever a gold partition changed.
+    """
+    if fact_mode not in FACT_MODES:
+        raise ValueError(f"fact_mode must be one of {FACT_MODES}, got '{fact_mode}'")
+    unknown = sorted(set(gold_formats) - set(COLUMNAR_FORMATS))
+    if unknown:
+        raise ValueError(f"gold_formats must be among {COLUMNAR_FORMATS}, got {unknown}")
+
+    paths: Dict[str, Path] = {}
+    if sales_path is not None:
+        paths["sales"] = Path(sales_path)
+    if budget_path is not None:
+        paths["budget_actual"] = Path(budget_path)
+    paths.update({name: Path(p) for name, p in (source_paths or {}).items()})
+
+    with copy_on_write_mode(copy_on_write):
+        return _run_import(
+            source_paths=paths,
+            dry_run=dry_run,
+            actor=actor,
+            source_name=source_name,
+            gold_out_path=gold_out_path,
+            column_maps_path=column_maps_path,
+            duplicate_policy=duplicate_policy,
+            dq_rules_path=dq_rules_path,
+            fact_mode=fact_mode,
+            verify_fact_every=verify_fact_every,
+            rebuild_workers=rebuild_workers,
+            category_map_path=category_map_path,
+            gold_formats=tuple(gold_formats),
+            progress_cb=progress_cb,
+        )
+
+
+def run_staging_backfill(
+    *,
+    archive_dir: Path,
+    actor: str = "bootstrap",
+    workers: Optional[int] = None,
+    rebuild_fact: bool = False,
+    column_maps_path: Path = DEFAULT_COLUMN_MAPS_PATH,
+    dq_rules_path: Path = DEFAULT_DQ_RULES_PATH,
+    category_map_path: Path = DEFAULT_CATEGORY_MAP_PATH,
     progress_cb: Optional[Callable[[str], None]] = None,
+) -> dict:
+    """
+    Backfill the staging tables from a directory of historical raw files (see
+    src/bootstrap_staging.py), parsed and hashed on `workers` processes. Run it once after
+    bootstrapping the fact table, so the first import takes the row_hash fast path.
+    """
+    engine = make_engine(load_db_config(ROOT / "config" / "db.yml"))
+    apply_schema(engine, ROOT / "sql" / "schema.sql")
+    ensure_fact_storage(engine)
+    return backfill_staging_from_archive(
+        engine,
+        archive_dir=archive_dir,
+        actor=actor,
+        column_maps_path=column_maps_path,
+        dq_rules_path=dq_rules_path,
+        workers=workers,
+        rebuild_fact=rebuild_fact,
+        category_map_path=category_map_path,
+        progress_cb=progress_cb,
+    )
+
+
+def _run_import(
+    *,
+    source_paths: Dict[str, Path],
+    dry_run: bool,
+    actor: str,
+    source_name: str,
+    gold_out_path: Path,
+    column_maps_path: Path,
+    duplicate_policy: Optional[str],
+    dq_rules_path: Path,
+    fact_mode: str,
+    verify_fact_every: int,
+    rebuild_workers: int,
+    category_map_path: Path,
+    gold_formats: Sequence[str],
+    progress_cb: Optional[Callable[[str], None]],
 ) -> dict:
     def _progress(msg: str) -> None:
         if progress_cb:
@@ -94,134 +200,140 @@ def run_import(
 
     _progress("Applying schema (best-effort)…")
     apply_schema(engine, ROOT / "sql" / "schema.sql")
+    ensure_fact_storage(engine)
+
+    plans = load_transform_plans(column_maps_path)
+    unknown = sorted(set(source_paths) - set(plans))
+    if unknown:
+        raise ValueError(f"No staging plan in {column_maps_path} for source(s) {unknown}")
 
     # Discover if not provided
     raw_dir = ROOT / "data" / "raw"
-    if sales_path is None:
-        sfiles = list(raw_dir.glob("*sales*.csv"))
-        sales_path = sfiles[0] if sfiles else None
-    if budget_path is None:
-        bfiles = list(raw_dir.glob("*budget*.csv")) + list(raw_dir.glob("*budget*.xlsx")) + list(raw_dir.glob("*budget*.xls"))
-        budget_path = bfiles[0] if bfiles else None
-
-    if not sales_path or not budget_path:
-        return {"status": "FAILED", "message": "Sales and budget files not found.", "change_event_id": None}
+    paths: Dict[str, Path] = {}
+    for name, plan in plans.items():
+        found = [source_paths[name]] if name in source_paths else plan.find_files(raw_dir)
+        if found:
+            paths[name] = found[0]
+    missing = [plan.label for name, plan in plans.items() if name not in paths]
+    if missing:
+        return {"status": "FAILED", "message": f"Input files not found: {', '.join(missing)}.", "change_event_id": None}
 
     _progress("Starting change event…")
     ctx = start_change_event(
         engine,
         actor=actor,
         source_name=source_name,
-        file_name=f"{sales_path.name}, {budget_path.name}",
+        file_name=", ".join(p.name for p in paths.values()),
         dry_run=dry_run,
     )
     change_event_id = ctx.change_event_id
 
     try:
+        map_summary: Dict[str, Any] = {}
+        # set when any fact rebuild this run escalated past its months: every month may have changed
+        full_rebuild = False
+        if not dry_run:
+            _progress("Syncing category map…")
+            map_sync = sync_category_map(engine, category_map_path)
+            map_summary = {"category_map_version": map_sync.version_id}
+            if map_sync.months:
+                # Re-map the fact months holding changed raw categories before this run's merges
+                _progress(f"Re-mapping categories ({len(map_sync.months)} month(s))…")
+                rebuild = rebuild_fact_months(
+                    engine=engine, months=map_sync.months, change_event_id=str(change_event_id), workers=rebuild_workers
+                )
+                full_rebuild |= rebuild.scope != "months"
+                map_summary.update(
+                    category_map_changed=map_sync.changed_raw_categories,
+                    category_map_rebuilt_months=map_sync.months,
+                )
+
         _progress("Reading input files…")
-        sales_df = read_table_clean_cols(sales_path)
-        bud_df = read_table_clean_cols(budget_path)
+        sources = [
+            (plan, read_table_clean_cols(paths[name], categorical_cols=plan.categorical_source_cols))
+            for name, plan in plans.items()
+        ]
+        source_rows = {plan.name: int(len(raw)) for plan, raw in sources}
 
         _progress("Validating columns…")
-        call_with_supported_kwargs(require_columns, sales_df, ["order_id", "order_date", "revenue"], context="sales")
-        call_with_supported_kwargs(require_columns, bud_df, ["Transaction ID", "Date", "Budget Amount", "Actual Amount"], context="budget")
+        for plan, raw in sources:
+            call_with_supported_kwargs(require_columns, raw, list(plan.required), context=plan.label)
 
         # -----------------------
-        # Build staging dataframes
+        # Build staging dataframes (compiled from config/column_maps.yml)
         # -----------------------
         _progress("Preparing staging frames…")
 
-        sales_stg = sales_df.copy()
-        sales_stg["order_id"] = pd.to_numeric(sales_stg["order_id"], errors="coerce").astype("Int64")
-        sales_stg["order_date"] = pd.to_datetime(sales_stg["order_date"], errors="coerce").dt.date
-        sales_stg["revenue"] = pd.to_numeric(sales_stg["revenue"], errors="coerce")
-
-        stg_sales_cols = ["order_id", "source_row_num", "order_date", "region", "payment_method", "revenue"]
-        for c in stg_sales_cols:
-            if c not in sales_stg.columns:
-                sales_stg[c] = None
-        sales_stg = sales_stg[stg_sales_cols].dropna(subset=["order_id"])
-        sales_stg["order_id"] = sales_stg["order_id"].astype(int)
-
-        # Add fingerprint
-        sales_hash_cols = ["order_date", "region", "payment_method", "revenue"]
-        sales_stg["row_hash"] = _compute_row_hash(sales_stg, sales_hash_cols)
-
-        budget_stg = bud_df.copy()
-        # PK cleaning: reject NaN/blank IDs so we never upsert a literal "nan" transaction_id
-        budget_stg["transaction_id"] = _clean_pk_series(budget_stg["Transaction ID"])
-        budget_stg = budget_stg.dropna(subset=["transaction_id"])
-        budget_stg["date"] = pd.to_datetime(budget_stg["Date"], errors="coerce").dt.date
-        budget_stg["department"] = budget_stg["Department"].astype("string").str.strip() if "Department" in budget_stg.columns else None
-        budget_stg["category"] = budget_stg["Category"].astype("string").str.strip() if "Category" in budget_stg.columns else None
-        for c in ["region", "payment_method"]:
-            if c not in budget_stg.columns:
-                budget_stg[c] = None
-        budget_stg["budget_amount"] = pd.to_numeric(budget_stg["Budget Amount"], errors="coerce")
-        budget_stg["actual_amount"] = pd.to_numeric(budget_stg["Actual Amount"], errors="coerce")
-
-        budget_stg = budget_stg[
-            ["transaction_id", "source_row_num", "date", "department", "category", "region", "budget_amount", "actual_amount", "payment_method"]
-        ]
-
-        # Add fingerprint
-        budget_hash_cols = ["date", "department", "category", "region", "budget_amount", "actual_amount", "payment_method"]
-        budget_stg["row_hash"] = _compute_row_hash(budget_stg, budget_hash_cols)
+        dq_rules = load_dq_rules(dq_rules_path)
+        builds = [plan.build(raw, dq_rules.get(plan.name, ())) for plan, raw in sources]
 
         # -----------------------
         # Merge (staging) — hash optimized
         # -----------------------
-        sales_compare = ["order_id", "source_row_num", "order_date", "region", "payment_method", "revenue", "row_hash"]
-        sales_protected = ["order_date"]  # your existing rule
-
-        budget_compare = ["transaction_id", "source_row_num", "date", "department", "category", "region", "budget_amount", "actual_amount", "payment_method", "row_hash"]
-        budget_protected: List[str] = []
-
         def _merge_progress(done: int, total: int, stage: str) -> None:
             _progress(f"{stage} {done:,}/{total:,}")
 
-        _progress("Merging sales staging…")
-        sales_stats, _sales_conflicts, sales_diff = merge_upsert(
-            engine=engine,
-            change_event_id=change_event_id,
-            table="stg_sales_orders",
-            pk_col="order_id",
-            df=sales_stg,
-            compare_cols=sales_compare,
-            protected_cols=sales_protected,
-            dry_run=dry_run,
-            hash_col="row_hash",
-            meta_cols=["source_row_num"],
-            progress_cb=_merge_progress,
-        )
-
-        _progress("Merging budget staging…")
-        budget_stats, _budget_conflicts, budget_diff = merge_upsert(
-            engine=engine,
-            change_event_id=change_event_id,
-            table="stg_budget_transactions",
-            pk_col="transaction_id",
-            df=budget_stg,
-            compare_cols=budget_compare,
-            protected_cols=budget_protected,
-            dry_run=dry_run,
-            hash_col="row_hash",
-            meta_cols=["source_row_num"],
-            progress_cb=_merge_progress,
+        all_stats: List[MergeStats] = []
+        merged: List[tuple] = []  # (plan, stats) for incremental fact maintenance
+        dq_rejected = 0
+        diff_summary: Dict[str, Any] = {}
+        for (plan, _raw), build in zip(sources, builds):
+            stg = build.frame
+            # Dry runs keep the text-key path: they must not write dictionary entries or backfill keys
+            surrogate_col = plan.surrogate_col if not dry_run else None
+            if surrogate_col:
+                _progress(f"Resolving {plan.label} surrogate keys…")
+                backfill_surrogate_column(engine, plan.key_space, plan.table, plan.pk_col, surrogate_col)
+                stg = stg.assign(**{surrogate_col: resolve_surrogate_keys(engine, plan.key_space, stg[plan.pk_col])})
+
+            _progress(f"Merging {plan.label} staging…")
+            stats, _conflicts, diff = merge_upsert(
+                engine=engine,
+                change_event_id=change_event_id,
+                table=plan.table,
+                pk_col=plan.pk_col,
+                df=stg,
+                compare_cols=plan.compare_cols,
+                protected_cols=list(plan.protected_cols),
+                dry_run=dry_run,
+                hash_col=plan.hash_col,
+                meta_cols=list(plan.meta_cols),
+                progress_cb=_merge_progress,
+                duplicate_policy=duplicate_policy or plan.duplicate_policy,
+                money_cols=plan.money_cols,
+                surrogate_col=surrogate_col,
+                month_col=plan.date_col,
+                collect_changes=(fact_mode == "incremental" and not dry_run),
+                mark_pending_months=not dry_run,
+            )
+            diff["unparseable_amount_counts"] = build.unparseable
+
+            # Data-quality rejects (rows never reached the merge)
+            stats.rejected += build.rejected_rows
+            diff["rejected_count"] = stats.rejected
+            diff["dq_rejected_count"] = build.rejected_rows
+            diff["dq_reject_counts"] = build.reject_counts()
+            dq_rejected += build.rejected_rows
+
+            diff_summary[plan.label] = diff
+            all_stats.append(stats)
+            merged.append((plan, stats))
+
+        inserted = sum(st.inserted for st in all_stats)
+        updated = sum(st.updated for st in all_stats)
+        unchanged = sum(st.unchanged for st in all_stats)
+        conflicted = sum(st.conflicted for st in all_stats)
+        rejected = sum(st.rejected for st in all_stats)
+
+        # Fact months an earlier, failed import left behind: its staging merge committed, its fact update didn't
+        pending_months, pending_events = pending_fact_months(engine, str(change_event_id)) if not dry_run else ([], [])
+
+        # Data-quality rejects come back on every re-run of the same file, so they don't count;
+        # a category map change has already re-mapped fact months, which still need exporting
+        no_changes = (
+            inserted == 0 and updated == 0 and conflicted == 0 and rejected == dq_rejected and not pending_months
+            and not map_summary.get("category_map_rebuilt_months")
         )
-
-        inserted = sales_stats.inserted + budget_stats.inserted
-        updated = sales_stats.updated + budget_stats.updated
-        unchanged = sales_stats.unchanged + budget_stats.unchanged
-        conflicted = sales_stats.conflicted + budget_stats.conflicted
-        rejected = sales_stats.rejected + budget_stats.rejected
-
-        diff_summary = {
-            "sales": sales_diff,
-            "budget": budget_diff,
-        }
-
-        no_changes = (inserted == 0 and updated == 0 and conflicted == 0 and rejected == 0)
         if no_changes:
             _progress("No changes detected — finishing early.")
             finish_change_event(
@@ -239,8 +351,7 @@ def run_import(
                 "status": "NO_CHANGES",
                 "message": "No changes detected — database already matches these files.",
                 "change_event_id": str(change_event_id),
-                "sales_rows": int(len(sales_df)),
-                "budget_rows": int(len(bud_df)),
+                "source_rows": source_rows,
                 "inserted": 0,
                 "updated": 0,
                 "unchanged": int(unchanged),
@@ -249,14 +360,91 @@ def run_import(
                 "diff_summary": diff_summary,
             }
 
-        gold_path: Optional[Path] = None
         if not dry_run:
-            _progress("Rebuilding fact table…")
-            months = sorted(set(_month_starts_from_dates(sales_df["order_date"]) + _month_starts_from_dates(bud_df["Date"])))
-            rebuild_fact_months(engine=engine, months=months or None, change_event_id=str(change_event_id))
+            for plan, build in zip((plan for plan, _raw in sources), builds):
+                if build.rejected_rows:
+                    log_rejected_rows(engine, change_event_id=change_event_id, table_name=plan.table, rejects=build.rejects)
 
-            _progress("Exporting gold CSV…")
-            gold_path = export_gold_fact_to_csv(engine, gold_out_path)
+        gold_path: Optional[Path] = None
+        fact_summary: Dict[str, Any] = {"mode": fact_mode, "rebuilt_months": [], **map_summary}
+        if not dry_run:
+            # Only months touched by applied inserts/updates (incl. a moved row's old month)
+            months = sorted(set().union(*(st.impacted_months for st in all_stats)))
+            if pending_months:
+                fact_summary["pending_months"] = pending_months
+            # Fact months this event changed (None = possibly all), for the partitioned gold export
+            fact_months: Optional[set] = set(map_summary.get("category_map_rebuilt_months", []))
+            if fact_mode == "incremental":
+                _progress("Applying fact deltas…")
+                cmap = load_db_category_map(engine)
+                deltas = [compute_fact_deltas(plan.table, st.changes, cmap) for plan, st in merged]
+                deltas = [d for d in deltas if not d.empty]
+                if deltas:
+                    delta_frame = pd.concat(deltas, ignore_index=True)
+                    fact_months |= set(delta_frame["month_start"])
+                    res = apply_fact_deltas(engine, delta_frame, str(change_event_id))
+                    fact_summary.update(
+                        keys_upserted=res.keys_upserted,
+                        keys_deleted=res.keys_deleted,
+                        rebuilt_months=res.rebuilt_months,
+                    )
+                    full_rebuild |= res.rebuild_scope not in (None, "months")
+
+                if pending_months:
+                    _progress(f"Rebuilding {len(pending_months)} month(s) left by a failed import…")
+                    rebuild = rebuild_fact_months(
+                        engine=engine, months=pending_months, change_event_id=str(change_event_id), workers=rebuild_workers
+                    )
+                    full_rebuild |= rebuild.scope != "months"
+                    fact_summary["rebuilt_months"] = sorted(set(fact_summary["rebuilt_months"]) | set(pending_months))
+                    fact_months |= set(pending_months)
+
+                if verify_due(engine, verify_fact_every):
+                    _progress("Verifying fact table against staging…")
+                    drift = verify_fact(engine)
+                    drift_months = sorted({str(m) for m in drift["month_start"]}) if not drift.empty else []
+                    fact_summary["verify_mismatches"] = int(len(drift))
+                    if drift_months:
+                        rebuild = rebuild_fact_months(
+                            engine=engine, months=drift_months, change_event_id=str(change_event_id), workers=rebuild_workers
+                        )
+                        full_rebuild |= rebuild.scope != "months"
+                        fact_summary["rebuilt_months"] = sorted(set(fact_summary["rebuilt_months"]) | set(drift_months))
+                        fact_months |= set(drift_months)
+            elif months or pending_months:
+                months = sorted(set(months) | set(pending_months))
+                _progress(f"Rebuilding fact table ({len(months)} month(s))…")
+                plan = rebuild_fact_months(
+                    engine=engine, months=months, change_event_id=str(change_event_id), workers=rebuild_workers
+                )
+                fact_summary.update(rebuild_scope=plan.scope, rebuild_reason=plan.reason)
+                fact_summary["rebuilt_months"] = plan.months or []  # [] with scope "full" = every month
+                fact_months |= set(plan.months or [])
+                full_rebuild |= plan.scope != "months"
+            if full_rebuild:
+                fact_months = None
+                fact_summary["rebuild_scope"] = "full"
+
+            clear_pending_fact_months(engine, [str(change_event_id)] + pending_events)
+
+            _progress("Exporting gold partitions…")
+            export = export_gold_partitions(
+                engine,
+                gold_out_path.parent,
+                months=sorted(fact_months) if fact_months is not None else None,
+                change_event_id=str(change_event_id),
+                combined_path=gold_out_path,
+                columnar=gold_formats,
+            )
+            gold_path = export.combined_path
+            fact_summary.update(
+                gold_partitions_written=export.written,
+                gold_partitions_removed=export.removed,
+                gold_columnar_paths=[str(p) for p in export.columnar_paths],
+                gold_export_skipped=export.skipped,
+            )
+            if export.skipped:
+                _progress("Gold export up to date (fact fingerprint unchanged).")
 
         _progress("Finishing change event…")
         finish_change_event(
@@ -283,14 +471,14 @@ def run_import(
             "status": "SUCCESS" if not dry_run else "DRY_RUN",
             "message": "ETL completed successfully." if not dry_run else "Dry run completed (no DB writes).",
             "change_event_id": str(change_event_id),
-            "sales_rows": int(len(sales_df)),
-            "budget_rows": int(len(bud_df)),
+            "source_rows": source_rows,
             "inserted": int(inserted),
             "updated": int(updated),
             "unchanged": int(unchanged),
             "rejected": int(rejected),
             "gold_path": str(gold_path) if gold_path else None,
             "diff_summary": diff_summary,
+            "fact_summary": fact_summary,
         }
 
     except Exception as e:
@@ -1,9 +1,366 @@
 # src/rebuild_fact.py
 from __future__ import annotations
 
-from typing import Optional, List
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, List, Tuple
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from src.fact_dims import FACT_STORE, bump_fact_version, dependent_views, store_resolved
+from src.rollups import ROLLUPS, fill_rollup_shadows, refresh_rollups
+
+
+@dataclass(frozen=True)
+class FactContribution:
+    """
+    How one staging table feeds fact_finance_monthly: each staging row adds `amount_col` to the
+    (month, department, category, scenario, source) key. A dimension with no column is the
+    constant default; with a column, NULLs fall back to the default.
+    """
+    table: str
+    date_col: str
+    amount_col: str
+    scenario: str
+    source: str
+    department_col: Optional[str] = None
+    department_default: str = "Unknown"
+    category_col: Optional[str] = None
+    category_default: str = "Uncategorized"
+    # map category_col through the current category map (category_map_current view)
+    category_map: bool = False
+
+    def dims_key(self) -> Tuple[str, str, Optional[str], str, Optional[str], str, bool]:
+        """Contributions sharing this key can be produced by one scan of their table."""
+        return (
+            self.table, self.date_col,
+            self.department_col, self.department_default,
+            self.category_col, self.category_default,
+            self.category_map,
+        )
+
+
+FACT_CONTRIBUTIONS: Tuple[FactContribution, ...] = (
+    # Revenue actual from sales
+    FactContribution(
+        table="stg_sales_orders", date_col="order_date", amount_col="revenue", scenario="Actual",
+        source="sales_orders", department_default="Sales", category_default="Revenue",
+    ),
+    # Actuals from budget
+    FactContribution(
+        table="stg_budget_transactions", date_col="date", amount_col="actual_amount", scenario="Actual",
+        source="budget_vs_actual", department_col="department", category_col="category", category_map=True,
+    ),
+    # Budgets from budget
+    FactContribution(
+        table="stg_budget_transactions", date_col="date", amount_col="budget_amount", scenario="Budget",
+        source="budget_vs_actual", department_col="department", category_col="category", category_map=True,
+    ),
+)
+
+
+def _scan_sql(group: List[FactContribution], month_filter: bool) -> str:
+    """
+    One scan of a staging table producing all of its contributions: the rows are aggregated once
+    (one SUM per contribution) and the small aggregate is unpivoted into (scenario, amount, source)
+    with CROSS JOIN LATERAL (VALUES ...).
+    A category_map contribution is aggregated on its raw category first; the current category
+    map is then applied to that aggregate and the result re-aggregated on the canonical names.
+    With month_filter, rows are range-joined to the :months list (date >= m AND date < m + 1 month),
+    which the plain btree index on the date column serves as index range scans.
+    """
+    c = group[0]
+    mapped = c.category_map and c.category_col is not None
+    if mapped:
+        # Aggregate on the raw values; the map is applied to the (small) aggregate below
+        dept = f"t.{c.department_col}" if c.department_col else "CAST(NULL AS text)"
+        cat = f"t.{c.category_col}"
+    else:
+        dept = f"COALESCE(t.{c.department_col}, '{c.department_default}')" if c.department_col else f"'{c.department_default}'"
+        cat = f"COALESCE(t.{c.category_col}, '{c.category_default}')" if c.category_col else f"'{c.category_default}'"
+    sums = ",\n              ".join(f"SUM(t.{g.amount_col}) AS amount_{i}" for i, g in enumerate(group))
+    values = ", ".join(f"('{g.scenario}', a.amount_{i}, '{g.source}')" for i, g in enumerate(group))
+
+    if month_filter:
+        month_expr = "m.month_start"
+        scope = (
+            "JOIN unnest(CAST(:months AS date[])) AS m(month_start)\n"
+            f"              ON t.{c.date_col} >= m.month_start\n"
+            f"             AND t.{c.date_col} < (m.month_start + INTERVAL '1 month')::date"
+        )
+    else:
+        month_expr = f"date_trunc('month', t.{c.date_col})::date"
+        scope = f"WHERE t.{c.date_col} IS NOT NULL"
+
+    aggregate = f"""
+            SELECT
+              {month_expr} AS month_start,
+              {dept} AS department,
+              {cat} AS category,
+              {sums},
+              COUNT(*) AS row_count
+            FROM {c.table} t
+            {scope}
+            GROUP BY 1, 2, 3
+        """
+    if mapped:
+        # raw category -> canonical category; a missing department takes the map's default
+        resums = ", ".join(f"SUM(r.amount_{i}) AS amount_{i}" for i in range(len(group)))
+        aggregate = f"""
+            SELECT
+              r.month_start,
+              COALESCE(r.department, cm.default_department, '{c.department_default}') AS department,
+              COALESCE(cm.canonical_category, r.category, '{c.category_default}') AS category,
+              {resums},
+              SUM(r.row_count) AS row_count
+            FROM ({aggregate}) r
+            LEFT JOIN category_map_current cm ON cm.raw_category = r.category
+            GROUP BY 1, 2, 3
+        """
+
+    return f"""
+        SELECT
+          a.month_start,
+          a.department,
+          a.category,
+          v.scenario,
+          COALESCE(v.amount, 0) AS amount,
+          v.source,
+          a.row_count
+        FROM ({aggregate}) a
+        CROSS JOIN LATERAL (VALUES {values}) AS v(scenario, amount, source)
+        """
+
+
+def fact_aggregate_sql(month_filter: bool) -> str:
+    """Fresh aggregate of every contribution (optionally limited to :months), one scan per staging table."""
+    groups: Dict[Tuple, List[FactContribution]] = {}
+    for c in FACT_CONTRIBUTIONS:
+        groups.setdefault(c.dims_key(), []).append(c)
+    return "\nUNION ALL\n".join(_scan_sql(g, month_filter) for g in groups.values())
+
+
+def staging_backed_sql(month: str, source: str, row_count: str) -> str:
+    """
+    SQL condition: a fact row (given its month_start, source name and row_count expressions) is
+    one a rebuild from staging reproduces. That holds for a FACT_CONTRIBUTIONS source when the
+    row came from staging (row_count set) or staging has that source's rows in that month;
+    rows loaded without staging behind them (gold bootstrap, other sources) never qualify.
+    """
+    probes: Dict[str, List[str]] = {}
+    for c in FACT_CONTRIBUTIONS:
+        probe = (
+            f"EXISTS (SELECT 1 FROM {c.table} t WHERE t.{c.date_col} >= {month}"
+            f" AND t.{c.date_col} < ({month} + INTERVAL '1 month')::date)"
+        )
+        if probe not in probes.setdefault(c.source, []):
+            probes[c.source].append(probe)
+    return "(" + " OR ".join(
+        f"({source} = '{name}' AND ({row_count} IS NOT NULL OR {' OR '.join(p)}))" for name, p in probes.items()
+    ) + ")"
+
+
+def staging_covers_fact(conn) -> bool:
+    """True when every fact row is staging-backed (staging_backed_sql), so the table may be replaced."""
+    unbacked = conn.execute(
+        text(
+            f"""
+            SELECT EXISTS (
+              SELECT 1
+              FROM {FACT_STORE} f
+              JOIN dim_source ds ON ds.source_id = f.source_id
+              WHERE NOT {staging_backed_sql("f.month_start", "ds.source", "f.row_count")}
+            )
+            """
+        )
+    ).scalar()
+    return not unbacked
+
+
+@dataclass(frozen=True)
+class RebuildPlan:
+    scope: str  # "months" | "full"
+    months: Optional[List[str]]
+    impacted_fraction: Optional[float]  # share of staging rows in the requested months (estimate)
+    reason: str
+    # full scope: staging backs every fact row, so the table is replaced (shadow swap / TRUNCATE);
+    # otherwise only staging-backed rows are replaced and the rest kept
+    replace_table: bool = False
+
+
+def _full_plan(conn, fraction: Optional[float], reason: str) -> RebuildPlan:
+    if staging_covers_fact(conn):
+        return RebuildPlan(scope="full", months=None, impacted_fraction=fraction, reason=reason, replace_table=True)
+    return RebuildPlan(
+        scope="full", months=None, impacted_fraction=fraction,
+        reason=f"{reason}; fact rows without staging behind them are kept",
+    )
+
+
+def plan_rebuild(conn, months: Optional[List[str]], full_threshold: float = 0.5) -> RebuildPlan:
+    """
+    Choose month-scoped vs full rebuild. The impacted fraction comes from fact row_count (staging
+    rows behind each month); when row_count is missing it falls back to the share of months.
+    Above full_threshold a full sequential rebuild is cheaper than many index range scans.
+    A full rebuild replaces the whole table only when staging backs every fact row
+    (staging_covers_fact); otherwise it replaces the staging-backed rows of every month.
+    """
+    if not months:
+        return _full_plan(conn, None, "no month list")
+
+    row = conn.execute(
+        text(
+            """
+            SELECT
+              SUM(row_count) FILTER (WHERE month_start = ANY(CAST(:months AS date[]))) AS impacted_rows,
+              SUM(row_count) AS total_rows,
+              COUNT(*) FILTER (WHERE row_count IS NULL) AS legacy_keys,
+              COUNT(DISTINCT month_start) FILTER (WHERE month_start = ANY(CAST(:months AS date[]))) AS impacted_months,
+              COUNT(DISTINCT month_start) AS total_months
+            FROM fact_finance_compact
+            """
+        ),
+        {"months": months},
+    ).mappings().first()
+
+    if not row or not row["total_months"]:
+        return RebuildPlan(scope="months", months=months, impacted_fraction=None, reason="empty fact table")
+
+    if row["legacy_keys"] or not row["total_rows"]:
+        fraction = float(row["impacted_months"] or 0) / float(row["total_months"])
+        basis = "month share"
+    else:
+        fraction = float(row["impacted_rows"] or 0) / float(row["total_rows"])
+        basis = "row share"
+
+    if fraction > full_threshold:
+        return _full_plan(conn, fraction, f"{basis} {fraction:.0%} > {full_threshold:.0%}")
+    return RebuildPlan(
+        scope="months", months=months, impacted_fraction=fraction,
+        reason=f"{basis} {fraction:.0%} <= {full_threshold:.0%}",
+    )
+
+
+def explain_rebuild(engine: Engine, months: Optional[List[str]] = None, *, analyze: bool = False) -> List[str]:
+    """EXPLAIN of the rebuild aggregate (scoped when months are given), one line per plan row."""
+    explain = "EXPLAIN (ANALYZE, BUFFERS)" if analyze else "EXPLAIN"
+    params = {"months": months} if months else {}
+    with engine.begin() as conn:
+        rows = conn.execute(text(f"{explain} {fact_aggregate_sql(bool(months))}"), params).all()
+    return [str(r[0]) for r in rows]
+
+
+FACT_COLUMNS = (
+    "month_start, department, category, scenario, amount, source, row_count, "
+    "last_change_event_id, last_updated_at"
+)
+
+
+def _insert_aggregate(conn, table: str, months: Optional[List[str]], change_event_id: str) -> None:
+    """INSERT the fresh aggregate (all months, or just `months`) into `table`, a text-keyed work table."""
+    conn.execute(
+        text(
+            f"""
+            INSERT INTO {table}
+            ({FACT_COLUMNS})
+            SELECT
+              agg.month_start, agg.department, agg.category, agg.scenario, agg.amount, agg.source,
+              agg.row_count, :eid AS last_change_event_id, now() AS last_updated_at
+            FROM ({fact_aggregate_sql(bool(months))}) agg
+            """
+        ),
+        {"eid": change_event_id, **({"months": months} if months else {})},
+    )
+
+
+FACT_TABLE = FACT_STORE
+SHADOW_SUFFIX = "_next"
+RETIRED_SUFFIX = "_old"
+SHADOW_TABLE = f"{FACT_STORE}{SHADOW_SUFFIX}"
+
+# Indexes/constraints the fact table carries; the shadow gets them after its bulk load.
+# name -> DDL template ({table} / {name} filled in; the shadow's copies are named after it,
+# e.g. fact_finance_compact_next_pkey, and take the live names in the swap)
+FACT_INDEXES: Dict[str, str] = {
+    f"{FACT_STORE}_pkey": (
+        "ALTER TABLE {table} ADD CONSTRAINT {name} "
+        "PRIMARY KEY (month_start, department_id, category_id, scenario_id, source_id)"
+    ),
+}
+
+
+def table_properties_sql(conn, table: str) -> List[str]:
+    """
+    Statements re-applying what a table carries besides its rows and indexes (grants, table and
+    column comments, user triggers, owner), written against its name: run after a replacement
+    table has taken that name.
+    """
+    rows = conn.execute(
+        text(
+            """
+            WITH t AS (SELECT c.* , c.oid AS relid FROM pg_class c WHERE c.oid = CAST(:t AS regclass))
+            SELECT 1 AS ord, format('GRANT %s ON %I TO %s%s', a.privilege_type, t.relname,
+                                    CASE WHEN a.grantee = 0 THEN 'PUBLIC' ELSE quote_ident(pg_get_userbyid(a.grantee)) END,
+                                    CASE WHEN a.is_grantable THEN ' WITH GRANT OPTION' ELSE '' END) AS stmt
+            FROM t, aclexplode(t.relacl) a
+            WHERE a.grantee <> t.relowner
+            UNION ALL
+            SELECT 2, format('COMMENT ON TABLE %I IS %L', t.relname, obj_description(t.relid, 'pg_class'))
+            FROM t WHERE obj_description(t.relid, 'pg_class') IS NOT NULL
+            UNION ALL
+            SELECT 2, format('COMMENT ON COLUMN %I.%I IS %L', t.relname, a.attname, col_description(t.relid, a.attnum))
+            FROM t JOIN pg_attribute a ON a.attrelid = t.relid
+            WHERE a.attnum > 0 AND NOT a.attisdropped AND col_description(t.relid, a.attnum) IS NOT NULL
+            UNION ALL
+            SELECT 3, pg_get_triggerdef(tg.oid)
+            FROM t JOIN pg_trigger tg ON tg.tgrelid = t.relid
+            WHERE NOT tg.tgisinternal
+            UNION ALL
+            SELECT 4, format('ALTER TABLE %I OWNER TO %I', t.relname, pg_get_userbyid(t.relowner))
+            FROM t WHERE t.relowner <> (SELECT oid FROM pg_roles WHERE rolname = current_user)
+            ORDER BY 1, 2
+            """
+        ),
+        {"t": table},
+    ).all()
+    return [str(r[1]) for r in rows]
+
+
+def _swap_table(conn, live: str, shadow: str) -> None:
+    """
+    Replace `live` with `shadow` on the caller's (swap) connection: views are pointed at the new
+    table, never dropped; the old table's grants, comments, triggers and owner move over; the
+    shadow's indexes take the live names (shadow prefix -> live prefix). Only catalog work.
+    """
+    retired = f"{live}{RETIRED_SUFFIX}"
+    # captured while the definitions still name the live table
+    views = dependent_views(conn, live)
+    properties = table_properties_sql(conn, live)
+    conn.execute(text(f"ALTER TABLE {live} RENAME TO {retired}"))
+    conn.execute(text(f"ALTER TABLE {shadow} RENAME TO {live}"))
+    for name, definition in views:
+        conn.execute(text(f"CREATE OR REPLACE VIEW {name} AS {definition}"))
+    # no CASCADE: anything still reading the old table fails the swap instead of being dropped
+    conn.execute(text(f"DROP TABLE {retired}"))
+    indexes = conn.execute(
+        text("SELECT i.relname FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid WHERE x.indrelid = CAST(:t AS regclass)"),
+        {"t": live},
+    ).scalars().all()
+    for name in indexes:
+        if name.startswith(shadow):
+            conn.execute(text(f"ALTER INDEX {name} RENAME TO {live}{name[len(shadow):]}"))
+    for stmt in properties:
+        conn.execute(text(stmt))
+
+
+def _create_work_table(conn, name: str, *, temporary: bool) -> None:
+    """Text-keyed table shaped like the fact_finance_monthly view, for aggregates before key resolution."""
+    kind = "TEMPORARY" if temporary else "UNLOGGED"
+    suffix = " ON COMMIT DROP" if temporary else ""
+    conn.execute(text(f"CREATE {kind} TABLE {name} (LIKE fact_finance_monthly){suffix}"))
 
 
 def rebuild_fact_months(
@@ -11,94 +368,186 @@ def rebuild_fact_months(
     engine: Engine,
     months: Optional[List[str]],  # list of 'YYYY-MM-01' strings
     change_event_id: str,
-) -> None:
+    full_threshold: float = 0.5,
+    workers: int = 1,
+    shadow: bool = True,
+) -> RebuildPlan:
     """
     Rebuild fact_finance_monthly for impacted months only.
     months: list of month_start dates as strings 'YYYY-MM-01'. If None -> rebuild all.
+    When the months cover more than full_threshold of the data, every month is rebuilt instead.
+    Only staging-backed fact rows are replaced (staging_backed_sql): rows with no staging behind
+    them, e.g. history bootstrapped from a gold CSV, are kept. When staging backs every fact row,
+    a full rebuild goes through a shadow table swap (shadow=True, see rebuild_fact_shadow) so
+    readers are never blocked behind a TRUNCATE; shadow=False truncates in place.
+    workers > 1 aggregates month groups on parallel connections.
+    The BI rollups (src/rollups.py) are refreshed for the same months in the same transaction.
+    Returns the plan that was executed.
     """
     with engine.begin() as conn:
-        if months:
-            conn.execute(
-                text(
-                    "DELETE FROM fact_finance_monthly "
-                    "WHERE month_start = ANY(CAST(:months AS date[]))"
-                ),
-                {"months": months},
-            )
-            month_filter_sales = "WHERE date_trunc('month', order_date)::date = ANY(CAST(:months AS date[]))"
-            month_filter_budget = "WHERE date_trunc('month', date)::date = ANY(CAST(:months AS date[]))"
-            params_months = {"months": months}
+        plan = plan_rebuild(conn, months, full_threshold)
+
+    if plan.replace_table and shadow:
+        rebuild_fact_shadow(engine=engine, change_event_id=change_event_id, workers=workers)
+    elif workers > 1:
+        _rebuild_parallel(engine, plan, change_event_id, workers)
+    else:
+        with engine.begin() as conn:
+            work = f"fact_work_{uuid.uuid4().hex[:12]}"
+            _create_work_table(conn, work, temporary=True)
+            _insert_aggregate(conn, work, plan.months, change_event_id)
+            _replace_months(conn, plan)
+            store_resolved(conn, work)
+            refresh_rollups(conn, plan.months)
+    return plan
+
+
+def _replace_months(conn, plan: RebuildPlan) -> None:
+    """
+    Clear the fact rows about to be re-inserted: the staging-backed rows of plan.months (of every
+    month for a full plan). A plan with replace_table truncates instead.
+    """
+    if plan.replace_table:
+        conn.execute(text(f"TRUNCATE TABLE {FACT_TABLE}"))
+        return
+    if plan.months is not None and not plan.months:
+        return
+    month_filter = "AND f.month_start = ANY(CAST(:months AS date[]))" if plan.months else ""
+    conn.execute(
+        text(
+            f"""
+            DELETE FROM {FACT_TABLE} f
+            USING dim_source ds
+            WHERE ds.source_id = f.source_id {month_filter}
+              AND {staging_backed_sql("f.month_start", "ds.source", "f.row_count")}
+            """
+        ),
+        {"months": plan.months} if plan.months else {},
+    )
+
+
+def _staging_months(conn) -> List[str]:
+    """Every month present in the staging tables ('YYYY-MM-01')."""
+    selects = " UNION ".join(
+        f"SELECT DISTINCT date_trunc('month', {date_col})::date AS m FROM {table} WHERE {date_col} IS NOT NULL"
+        for table, date_col in sorted({(c.table, c.date_col) for c in FACT_CONTRIBUTIONS})
+    )
+    rows = conn.execute(text(f"SELECT m::text FROM ({selects}) u ORDER BY 1")).scalars().all()
+    return [str(m) for m in rows]
+
+
+def _month_groups(months: List[str], n: int) -> List[List[str]]:
+    """Split months into at most n contiguous, near-equal groups (each worker reads one date range)."""
+    months = sorted(months)
+    size, extra = divmod(len(months), n)
+    groups, start = [], 0
+    for i in range(n):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(months[start:end])
+        start = end
+    return [g for g in groups if g]
+
+
+def _fill_parallel(engine: Engine, table: str, months: List[str], change_event_id: str, workers: int) -> None:
+    """Aggregate month groups into `table`, one connection per group."""
+    def _fill(group: List[str]) -> None:
+        with engine.begin() as conn:
+            _insert_aggregate(conn, table, group, change_event_id)
+
+    groups = _month_groups(months, workers)
+    if not groups:
+        return
+    with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="fact-rebuild") as pool:
+        for fut in [pool.submit(_fill, g) for g in groups]:
+            fut.result()
+
+
+def _rebuild_parallel(engine: Engine, plan: RebuildPlan, change_event_id: str, workers: int) -> None:
+    """
+    The plan's months split into `workers` groups, each aggregated on its own connection into a
+    per-run UNLOGGED table, then swapped into the fact table in one transaction (delete the
+    staging-backed rows / truncate, insert from the run table): readers see either the old or
+    the new fact rows, never a partial rebuild.
+    """
+    run_table = f"fact_rebuild_{uuid.uuid4().hex[:12]}"
+
+    with engine.begin() as conn:
+        target_months = plan.months if plan.months is not None else _staging_months(conn)
+        _create_work_table(conn, run_table, temporary=False)
+
+    try:
+        _fill_parallel(engine, run_table, target_months, change_event_id, workers)
+
+        with engine.begin() as conn:
+            _replace_months(conn, plan)
+            store_resolved(conn, run_table)
+            refresh_rollups(conn, plan.months)
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {run_table}"))
+
+
+def rebuild_fact_shadow(
+    *,
+    engine: Engine,
+    change_event_id: str,
+    workers: int = 1,
+    lock_timeout: str = "5s",
+    swap_attempts: int = 5,
+) -> None:
+    """
+    Full rebuild without blocking readers:
+      1. aggregate the staging tables into a text-keyed work table, in parallel month groups
+         when workers > 1, and load fact_finance_compact_next (no indexes) from it
+      2. add the primary key in one pass over the loaded table, and build every rollup from it
+         into its own shadow table (fill_rollup_shadows)
+      3. swap names in one short transaction and drop the old tables (_swap_table)
+    Readers keep using the old tables until the swap commits. The swap holds ACCESS EXCLUSIVE
+    locks only for renames and catalog work, taken with a lock_timeout and retried, so it never
+    queues readers behind a long wait. Views on the fact table (the fact_finance_monthly
+    compatibility view and anything built on it) are pointed at the new table with CREATE OR
+    REPLACE VIEW before the old one is dropped, so they keep their grants, comments and owners;
+    each table's own grants, comments, triggers and owner are re-applied (table_properties_sql).
+    """
+    run_table = f"fact_rebuild_{uuid.uuid4().hex[:12]}"
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {SHADOW_TABLE}"))
+        conn.execute(text(f"CREATE TABLE {SHADOW_TABLE} (LIKE {FACT_TABLE} INCLUDING DEFAULTS)"))
+        _create_work_table(conn, run_table, temporary=False)
+
+    try:
+        if workers > 1:
+            with engine.begin() as conn:
+                months = _staging_months(conn)
+            _fill_parallel(engine, run_table, months, change_event_id, workers)
         else:
-            conn.execute(text("TRUNCATE TABLE fact_finance_monthly"))
-            month_filter_sales = ""
-            month_filter_budget = ""
-            params_months = {}
-
-        # Revenue actual from sales
-        conn.execute(
-            text(
-                f"""
-                INSERT INTO fact_finance_monthly
-                (month_start, department, category, scenario, amount, source, last_change_event_id, last_updated_at)
-                SELECT
-                  date_trunc('month', order_date)::date AS month_start,
-                  'Sales' AS department,
-                  'Revenue' AS category,
-                  'Actual' AS scenario,
-                  SUM(revenue) AS amount,
-                  'sales_orders' AS source,
-                  :eid AS last_change_event_id,
-                  now() AS last_updated_at
-                FROM stg_sales_orders
-                {month_filter_sales}
-                GROUP BY 1
-                """
-            ),
-            {"eid": change_event_id, **params_months},
-        )
+            with engine.begin() as conn:
+                _insert_aggregate(conn, run_table, None, change_event_id)
 
-        # Actuals from budget
-        conn.execute(
-            text(
-                f"""
-                INSERT INTO fact_finance_monthly
-                (month_start, department, category, scenario, amount, source, last_change_event_id, last_updated_at)
-                SELECT
-                  date_trunc('month', date)::date AS month_start,
-                  COALESCE(department, 'Unknown') AS department,
-                  COALESCE(category, 'Uncategorized') AS category,
-                  'Actual' AS scenario,
-                  SUM(actual_amount) AS amount,
-                  'budget_vs_actual' AS source,
-                  :eid AS last_change_event_id,
-                  now() AS last_updated_at
-                FROM stg_budget_transactions
-                {month_filter_budget}
-                GROUP BY 1,2,3
-                """
-            ),
-            {"eid": change_event_id, **params_months},
-        )
+        with engine.begin() as conn:
+            store_resolved(conn, run_table, SHADOW_TABLE)
+            for name, ddl in FACT_INDEXES.items():
+                conn.execute(text(ddl.format(table=SHADOW_TABLE, name=name.replace(FACT_TABLE, SHADOW_TABLE, 1))))
+            conn.execute(text(f"ANALYZE {SHADOW_TABLE}"))
+            rollup_shadows = fill_rollup_shadows(conn, SHADOW_TABLE, SHADOW_SUFFIX)
 
-        # Budgets from budget
-        conn.execute(
-            text(
-                f"""
-                INSERT INTO fact_finance_monthly
-                (month_start, department, category, scenario, amount, source, last_change_event_id, last_updated_at)
-                SELECT
-                  date_trunc('month', date)::date AS month_start,
-                  COALESCE(department, 'Unknown') AS department,
-                  COALESCE(category, 'Uncategorized') AS category,
-                  'Budget' AS scenario,
-                  SUM(budget_amount) AS amount,
-                  'budget_vs_actual' AS source,
-                  :eid AS last_change_event_id,
-                  now() AS last_updated_at
-                FROM stg_budget_transactions
-                {month_filter_budget}
-                GROUP BY 1,2,3
-                """
-            ),
-            {"eid": change_event_id, **params_months},
-        )
+        for attempt in range(1, swap_attempts + 1):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+                    _swap_table(conn, FACT_TABLE, SHADOW_TABLE)
+                    for table, shadow in rollup_shadows.items():
+                        _swap_table(conn, table, shadow)
+                    bump_fact_version(conn)
+                break
+            except OperationalError:
+                # lock_timeout: a long reader holds the old table; try again shortly
+                if attempt == swap_attempts:
+                    raise
+                time.sleep(min(2 ** attempt, 10))
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {SHADOW_TABLE}"))
+            for r in ROLLUPS:
+                conn.execute(text(f"DROP TABLE IF EXISTS {r.table}{SHADOW_SUFFIX}"))
+            conn.execute(text(f"DROP TABLE IF EXISTS {run_table}"))
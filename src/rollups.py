@@ -0,0 +1,266 @@
+# src/rollups.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from src.fact_dims import DIMENSIONS, FACT_STORE, bump_fact_version
+
+
+@dataclass(frozen=True)
+class Rollup:
+    """
+    A rollup of fact_finance_monthly, refreshed per period (month/quarter/year) from the fact table.
+    `select_sql` aggregates the compact fact rows (alias f) on their integer keys and joins the
+    dimension names onto the small result ({names}); it is also given the fact table ({fact}), the
+    period expression and, for scoped refreshes, a join limiting f to the :periods list.
+    """
+    table: str
+    grain: str  # period refreshed as a unit: "month" | "quarter" | "year"
+    key: Tuple[str, ...]  # primary key; the period column first
+    values: Tuple[str, ...]
+    select_sql: str
+
+    @property
+    def columns(self) -> str:
+        return ", ".join(self.key + self.values)
+
+
+_GRAIN_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+
+ROLLUPS: Tuple[Rollup, ...] = (
+    Rollup(
+        table="fact_finance_quarterly",
+        grain="quarter",
+        key=("quarter_start", "department", "category", "scenario", "source"),
+        values=("amount", "row_count"),
+        select_sql="""
+            SELECT a.quarter_start, department, category, scenario, source, a.amount, a.row_count
+            FROM (
+                SELECT {period} AS quarter_start, f.department_id, f.category_id, f.scenario_id, f.source_id,
+                       SUM(f.amount) AS amount, SUM(f.row_count) AS row_count
+                FROM {fact} f
+                {scope}
+                GROUP BY 1, 2, 3, 4, 5
+            ) a
+            {names}
+        """,
+    ),
+    Rollup(
+        table="fact_finance_yearly",
+        grain="year",
+        key=("year_start", "department", "category", "scenario", "source"),
+        values=("amount", "row_count"),
+        select_sql="""
+            SELECT a.year_start, department, category, scenario, source, a.amount, a.row_count
+            FROM (
+                SELECT {period} AS year_start, f.department_id, f.category_id, f.scenario_id, f.source_id,
+                       SUM(f.amount) AS amount, SUM(f.row_count) AS row_count
+                FROM {fact} f
+                {scope}
+                GROUP BY 1, 2, 3, 4, 5
+            ) a
+            {names}
+        """,
+    ),
+    # Actual vs budget per month with year-to-date running totals; refreshed a whole year at a
+    # time so the YTD columns of later months follow a change in an earlier one.
+    Rollup(
+        table="fact_finance_variance",
+        grain="year",
+        key=("month_start", "department", "category"),
+        values=(
+            "actual_amount", "budget_amount", "variance_amount",
+            "ytd_actual_amount", "ytd_budget_amount", "ytd_variance_amount",
+        ),
+        select_sql="""
+            SELECT m.month_start, m.department, m.category,
+                   m.actual, m.budget, m.actual - m.budget,
+                   SUM(m.actual) OVER ytd, SUM(m.budget) OVER ytd, SUM(m.actual - m.budget) OVER ytd
+            FROM (
+                SELECT a.*, department, category
+                FROM (
+                    SELECT f.month_start, f.department_id, f.category_id,
+                           COALESCE(SUM(f.amount) FILTER (WHERE f.scenario_id = {actual_id}), 0) AS actual,
+                           COALESCE(SUM(f.amount) FILTER (WHERE f.scenario_id = {budget_id}), 0) AS budget
+                    FROM {fact} f
+                    {scope}
+                    GROUP BY 1, 2, 3
+                ) a
+                {names}
+            ) m
+            WINDOW ytd AS (
+                PARTITION BY date_trunc('year', m.month_start), m.department, m.category
+                ORDER BY m.month_start
+            )
+        """,
+    ),
+    # Fingerprint of each month's fact rows (ids are never re-assigned, so hashing them is as good
+    # as hashing the names, without the joins); the gold export compares it with its manifest.
+    Rollup(
+        table="fact_month_digests",
+        grain="month",
+        key=("month_start",),
+        values=("fingerprint", "row_count"),
+        select_sql="""
+            SELECT {period} AS month_start,
+                   md5(string_agg(
+                     concat_ws('|', f.department_id, f.category_id, f.scenario_id, f.source_id, f.amount),
+                     ',' ORDER BY f.department_id, f.category_id, f.scenario_id, f.source_id
+                   )),
+                   count(*)
+            FROM {fact} f
+            {scope}
+            GROUP BY 1
+        """,
+    ),
+)
+
+
+def period_starts(months: Sequence[str], grain: str) -> List[str]:
+    """Distinct quarter/year starts ('YYYY-MM-01') covering the given 'YYYY-MM-01' months."""
+    step = _GRAIN_MONTHS[grain]
+    out = set()
+    for m in months:
+        d = date.fromisoformat(str(m)[:10])
+        out.add(date(d.year, (d.month - 1) // step * step + 1, 1).isoformat())
+    return sorted(out)
+
+
+def _in_periods(col: str, grain: str) -> str:
+    """Join condition putting `col` inside one of the :periods (a range, so indexes apply)."""
+    return (
+        f"{col} >= p.period_start "
+        f"AND {col} < (p.period_start + INTERVAL '{_GRAIN_MONTHS[grain]} months')::date"
+    )
+
+
+def rollup_sql(rollup: Rollup, scoped: bool, fact: str = FACT_STORE) -> str:
+    """Fresh aggregate for the rollup over `fact`: every period, or only the :periods list when scoped."""
+    if scoped:
+        scope = (
+            "JOIN unnest(CAST(:periods AS date[])) AS p(period_start)\n"
+            f"              ON {_in_periods('f.month_start', rollup.grain)}"
+        )
+    else:
+        scope = ""
+    period = f"date_trunc('{rollup.grain}', f.month_start)::date"
+    names = "\n".join(f"JOIN {d.table} USING ({d.key_col})" for d in DIMENSIONS if d.column in rollup.key)
+    # scenario ids as one-time subqueries rather than a join per fact row
+    scenario_id = "(SELECT scenario_id FROM dim_scenario WHERE scenario = '{}')".format
+    return rollup.select_sql.format(
+        fact=fact, period=period, scope=scope, names=names,
+        actual_id=scenario_id("Actual"), budget_id=scenario_id("Budget"),
+    )
+
+
+def refresh_rollups(
+    conn, months: Optional[Sequence[str]], tables: Optional[Sequence[str]] = None
+) -> Dict[str, int]:
+    """
+    Bring every rollup (or just `tables`) in line with fact_finance_monthly, on the caller's
+    connection (so the fact change and its rollups commit together). With months, only the
+    periods containing them are deleted and re-aggregated; months=None refreshes everything.
+    Uses DELETE rather than TRUNCATE so dashboard readers are never blocked.
+    Every fact write ends here, so a refresh of all rollups also bumps the fact version stamp.
+    Returns rows written per rollup table.
+    """
+    if months is not None and not months:
+        return {}
+    if tables is None:
+        bump_fact_version(conn)
+
+    written: Dict[str, int] = {}
+    for r in ROLLUPS:
+        if tables is not None and r.table not in tables:
+            continue
+        scoped = months is not None
+        if scoped:
+            # A rollup created after the fact table was loaded starts with a full fill
+            scoped = bool(conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {r.table})")).scalar())
+
+        if scoped:
+            params = {"periods": period_starts(months, r.grain)}
+            conn.execute(
+                text(
+                    f"DELETE FROM {r.table} t USING unnest(CAST(:periods AS date[])) AS p(period_start) "
+                    f"WHERE {_in_periods('t.' + r.key[0], r.grain)}"
+                ),
+                params,
+            )
+        else:
+            params = {}
+            conn.execute(text(f"DELETE FROM {r.table}"))
+
+        res = conn.execute(
+            text(f"INSERT INTO {r.table} ({r.columns}) {rollup_sql(r, scoped)}"),
+            params,
+        )
+        written[r.table] = int(res.rowcount or 0)
+    return written
+
+
+def fill_rollup_shadows(conn, fact: str, suffix: str) -> Dict[str, str]:
+    """
+    Build every rollup afresh from `fact` into `<table><suffix>` (created LIKE the rollup, indexes
+    included), for a full fact rebuild to rename in with its shadow table rather than refresh
+    the live rollups under the swap's lock. Returns rollup table -> shadow table.
+    """
+    shadows: Dict[str, str] = {}
+    for r in ROLLUPS:
+        shadow = f"{r.table}{suffix}"
+        conn.execute(text(f"DROP TABLE IF EXISTS {shadow}"))
+        conn.execute(text(f"CREATE TABLE {shadow} (LIKE {r.table} INCLUDING ALL)"))
+        conn.execute(text(f"INSERT INTO {shadow} ({r.columns}) {rollup_sql(r, False, fact=fact)}"))
+        conn.execute(text(f"ANALYZE {shadow}"))
+        shadows[r.table] = shadow
+    return shadows
+
+
+def verify_rollups(engine: Engine) -> Dict[str, int]:
+    """
+    Compare every rollup with a fresh GROUP BY over fact_finance_monthly.
+    Returns mismatching rows per rollup table (both directions of EXCEPT ALL; 0 = exact).
+    """
+    out: Dict[str, int] = {}
+    with engine.begin() as conn:
+        for r in ROLLUPS:
+            fresh = rollup_sql(r, scoped=False)
+            n = conn.execute(
+                text(
+                    f"""
+                    SELECT
+                      (SELECT count(*) FROM (SELECT {r.columns} FROM {r.table} EXCEPT ALL {fresh}) a)
+                    + (SELECT count(*) FROM ({fresh} EXCEPT ALL SELECT {r.columns} FROM {r.table}) b)
+                    """
+                )
+            ).scalar()
+            out[r.table] = int(n or 0)
+    return out
+
+
+def read_rollup(engine: Engine, table: str, *, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+    """Rows of one rollup table, optionally limited to periods in [start, end] (PK range lookup)."""
+    rollup = next((r for r in ROLLUPS if r.table == table), None)
+    if rollup is None:
+        raise ValueError(f"Unknown rollup '{table}'. Expected one of {[r.table for r in ROLLUPS]}")
+
+    period_col = rollup.key[0]
+    where, params = [], {}
+    if start:
+        where.append(f"{period_col} >= CAST(:start AS date)")
+        params["start"] = start
+    if end:
+        where.append(f"{period_col} <= CAST(:end AS date)")
+        params["end"] = end
+    sql = f"SELECT {rollup.columns} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    with engine.begin() as conn:
+        rows = conn.execute(text(sql + f" ORDER BY {', '.join(rollup.key)}"), params).mappings().all()
+    return pd.DataFrame([dict(r) for r in rows])
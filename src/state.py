@@ -2,12 +2,17 @@
 from __future__ import annotations
 
 import uuid
-from typing import Optional, Dict, Any, List, Tuple
+from datetime import date
+from typing import Optional, Dict, Any, List, Set, Tuple
 
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import IntegrityError
 
+from src.fact_delta import clear_pending_fact_months
+from src.rebuild_fact import rebuild_fact_months
+from src.transform_plan import load_transform_plans
+
 
 # ---------------------------
 # Internal helpers
@@ -20,18 +25,8 @@ def _one(conn, sql: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
 
 def _table_exists(conn, table_name: str) -> bool:
     try:
-        r = conn.execute(
-            text(
-                """
-                SELECT 1
-                FROM information_schema.tables
-                WHERE table_schema = 'public' AND table_name = :t
-                LIMIT 1
-                """
-            ),
-            {"t": table_name},
-        ).first()
-        return bool(r)
+        # resolved through search_path, like every other statement here
+        return bool(conn.execute(text("SELECT to_regclass(:t) IS NOT NULL"), {"t": table_name}).scalar())
     except Exception:
         return False
 
@@ -335,8 +330,13 @@ def rollback_change_event(engine: Engine, change_event_id: str, actor: str = "ro
 
     Creates a NEW change_event_id for the rollback action (audited),
     and advances HEAD by creating/reusing a state image for that rollback event.
+    The fact months of the reverted staging rows (before and after images) are then rebuilt,
+    which also moves the fact version; they are recorded in fact_pending_months with the
+    reverted rows, so an interrupted rebuild is redone by the next import.
     """
     rollback_eid = str(uuid.uuid4())
+    date_cols = {p.table: p.date_col for p in load_transform_plans().values() if p.date_col}
+    fact_months: Set[str] = set()
 
     with engine.begin() as conn:
         if not _table_exists(conn, "etl_change_events") or not _table_exists(conn, "etl_row_changes"):
@@ -378,6 +378,12 @@ def rollback_change_event(engine: Engine, change_event_id: str, actor: str = "ro
             op = (r["op"] or "").upper()
             db_before = r["db_before"] or {}
 
+            if table in date_cols:
+                for image in (db_before, r["db_after"] or {}):
+                    value = image.get(date_cols[table])
+                    if value:
+                        fact_months.add(date.fromisoformat(str(value)[:10]).replace(day=1).isoformat())
+
             if op == "INSERT":
                 # Best-effort delete using common PK cols; compare as text to support numeric PKs too
                 for pk_col in ("order_id", "transaction_id", "id"):
@@ -415,6 +421,18 @@ def rollback_change_event(engine: Engine, change_event_id: str, actor: str = "ro
                 except Exception:
                     pass
 
+        if fact_months:
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO fact_pending_months (change_event_id, month_start)
+                    SELECT CAST(:eid AS uuid), m FROM unnest(CAST(:months AS date[])) AS m
+                    ON CONFLICT DO NOTHING
+                    """
+                ),
+                {"eid": rollback_eid, "months": sorted(fact_months)},
+            )
+
         conn.execute(
             text(
                 """
@@ -426,6 +444,10 @@ def rollback_change_event(engine: Engine, change_event_id: str, actor: str = "ro
             {"eid": rollback_eid},
         )
 
+    if fact_months:
+        rebuild_fact_months(engine=engine, months=sorted(fact_months), change_event_id=rollback_eid)
+        clear_pending_fact_months(engine, [rollback_eid])
+
     # Advance HEAD (best effort)
     try:
         create_state_image(engine, rollback_eid, notes=f"rollback of {change_event_id}")
@@ -436,6 +458,7 @@ def rollback_change_event(engine: Engine, change_event_id: str, actor: str = "ro
         "status": "SUCCESS",
         "message": f"Rollback complete. Created rollback change_event_id: {rollback_eid}",
         "change_event_id": rollback_eid,
+        "fact_months": sorted(fact_months),
     }
 
 
@@ -0,0 +1,98 @@
+# src/surrogate.py
+from __future__ import annotations
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+def _fetch_keys(conn, key_space: str, external_ids: List[str]) -> Dict[str, int]:
+    rows = conn.execute(
+        text(
+            """
+            SELECT external_id, surrogate_id
+            FROM etl_key_dictionary
+            WHERE key_space = :ks AND external_id = ANY(:ids)
+            """
+        ),
+        {"ks": key_space, "ids": external_ids},
+    ).all()
+    return {str(r[0]): int(r[1]) for r in rows}
+
+
+def resolve_surrogate_keys(
+    engine: Engine,
+    key_space: str,
+    external_ids: pd.Series,
+    *,
+    chunk_size: int = 50000,
+) -> pd.Series:
+    """
+    Map external IDs (e.g. 'TXN100000') to BIGINT surrogate keys from etl_key_dictionary.
+
+    Each distinct ID is looked up once (array parameter, not an IN list); unknown IDs are added
+    to the dictionary. Returns an int64 series aligned to external_ids.
+    """
+    codes, uniques = pd.factorize(external_ids, use_na_sentinel=True)
+    if (codes < 0).any():
+        raise ValueError(f"[{key_space}] surrogate keys require non-null external IDs")
+
+    ids = [str(v) for v in uniques]
+    mapping: Dict[str, int] = {}
+
+    with engine.begin() as conn:
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i : i + chunk_size]
+            found = _fetch_keys(conn, key_space, chunk)
+            missing = [v for v in chunk if v not in found]
+            if missing:
+                conn.execute(
+                    text(
+                        """
+                        INSERT INTO etl_key_dictionary (key_space, external_id)
+                        SELECT :ks, unnest(CAST(:ids AS TEXT[]))
+                        ON CONFLICT (key_space, external_id) DO NOTHING
+                        """
+                    ),
+                    {"ks": key_space, "ids": missing},
+                )
+                found.update(_fetch_keys(conn, key_space, missing))
+            mapping.update(found)
+
+    per_unique = np.fromiter((mapping[v] for v in ids), dtype=np.int64, count=len(ids))
+    return pd.Series(per_unique[codes], index=external_ids.index, name=external_ids.name)
+
+
+def backfill_surrogate_column(engine: Engine, key_space: str, table: str, pk_col: str, sk_col: str) -> int:
+    """
+    Give rows loaded before the surrogate column existed their key (set-based, idempotent).
+    Returns the number of rows updated.
+    """
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"""
+                INSERT INTO etl_key_dictionary (key_space, external_id)
+                SELECT :ks, {pk_col}::text FROM {table} WHERE {sk_col} IS NULL
+                ON CONFLICT (key_space, external_id) DO NOTHING
+                """
+            ),
+            {"ks": key_space},
+        )
+        res = conn.execute(
+            text(
+                f"""
+                UPDATE {table} t
+                SET {sk_col} = d.surrogate_id
+                FROM etl_key_dictionary d
+                WHERE t.{sk_col} IS NULL
+                  AND d.key_space = :ks
+                  AND d.external_id = t.{pk_col}::text
+                """
+            ),
+            {"ks": key_space},
+        )
+        return int(res.rowcount or 0)
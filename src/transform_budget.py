@@ -1,77 +1,28 @@
 from __future__ import annotations
 
-from typing import Any, Optional
+from typing import Any
 import pandas as pd
-from dateutil import parser
 
+from src.amounts import cents_to_amount, parse_cents
+from src.categorical import as_categorical, categorize
+from src.category_map import compile_category_map
+from src.dates import month_start_strings
 
-def _to_month_start(x) -> str | None:
-    if pd.isna(x):
-        return None
-    try:
-        dt = parser.parse(str(x))
-        return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0).date().isoformat()
-    except Exception:
-        return None
 
+# Same fallbacks as the budget contributions in rebuild_fact.FACT_CONTRIBUTIONS
+MISSING_CATEGORY = "Uncategorized"
+MISSING_DEPARTMENT = "Unknown"
 
-def _to_number(x):
-    if pd.isna(x):
-        return None
-    s = str(x).strip().replace("$", "").replace(",", "")
-    if s.startswith("(") and s.endswith(")"):
-        s = "-" + s[1:-1]
-    try:
-        return float(s)
-    except Exception:
-        return None
 
-
-def _normalize_category_map(category_map: Any) -> pd.DataFrame:
+def apply_category_map(df: pd.DataFrame, category_col: str, category_map: Any) -> pd.DataFrame:
     """
-    Accepts:
-      - pd.DataFrame with raw_category/canonical_category (and optional default_department)
-      - dict mapping raw_category -> canonical_category
-      - None / {} / empty -> identity mapping (no-op)
-    Returns a DataFrame with required columns.
+    Add canonical_category and default_department columns via a compiled lookup (no join).
+    category_map: anything compile_category_map accepts (path, DataFrame, dict, compiled map, None).
+    A missing raw category maps to MISSING_CATEGORY.
     """
-    if category_map is None:
-        return pd.DataFrame(columns=["raw_category", "canonical_category", "default_department"])
-
-    if isinstance(category_map, pd.DataFrame):
-        df = category_map.copy()
-        # Ensure expected columns exist (empty if missing)
-        for c in ["raw_category", "canonical_category", "default_department"]:
-            if c not in df.columns:
-                df[c] = None
-        return df[["raw_category", "canonical_category", "default_department"]]
-
-    if isinstance(category_map, dict):
-        rows = [{"raw_category": str(k), "canonical_category": str(v), "default_department": None} for k, v in category_map.items()]
-        return pd.DataFrame(rows, columns=["raw_category", "canonical_category", "default_department"])
-
-    # Fallback: treat as empty/no-op
-    return pd.DataFrame(columns=["raw_category", "canonical_category", "default_department"])
-
-
-def apply_category_map(df: pd.DataFrame, category_col: str, map_df: pd.DataFrame) -> pd.DataFrame:
-    # map raw_category -> canonical_category (+ optional default_department)
-    map_df = map_df.copy()
-
-    if map_df.empty:
-        out = df.copy()
-        out["canonical_category"] = out[category_col].astype(str)
-        return out
-
-    map_df["raw_category"] = map_df["raw_category"].astype(str)
-    map_df["canonical_category"] = map_df["canonical_category"].astype(str)
-
-    df = df.copy()
-    df[category_col] = df[category_col].astype(str)
-
-    merged = df.merge(map_df, how="left", left_on=category_col, right_on="raw_category")
-    merged["canonical_category"] = merged["canonical_category"].fillna(merged[category_col])
-    return merged
+    cmap = compile_category_map(category_map)
+    canonical, department = cmap.lookup(df[category_col], missing=MISSING_CATEGORY)
+    return df.assign(canonical_category=canonical, default_department=department)
 
 
 def transform_budget_vs_actual_to_fact(
@@ -83,45 +34,51 @@ def transform_budget_vs_actual_to_fact(
     budget_col: str,
     category_map: Any,
 ) -> pd.DataFrame:
-    df = df.copy()
-    df["month_start"] = df[date_col].apply(_to_month_start)
+    df = df.assign(month_start=month_start_strings(df[date_col], source=f"budget.{date_col}"))
     df = df.dropna(subset=["month_start"])
 
-    map_df = _normalize_category_map(category_map)
-    df = apply_category_map(df, category_col, map_df)
+    df = apply_category_map(df, category_col, category_map)
 
     # Department: use provided column, else fallback to default_department from mapping, else "Finance"
+    # (a missing value in the column falls back like the rebuild SQL: mapping default, else "Unknown")
     if dept_col and dept_col in df.columns:
-        df["department"] = df[dept_col].astype(str)
+        dept = df[dept_col].astype(object)
+        if dept.isna().any():
+            dept = dept.fillna(df["default_department"].astype(object)).fillna(MISSING_DEPARTMENT)
+        df["department"] = as_categorical(dept)
     else:
-        df["department"] = df.get("default_department", pd.Series(["Finance"] * len(df))).fillna("Finance").astype(str)
+        df["department"] = as_categorical(df["default_department"].astype(object).fillna("Finance"))
+
+    category = as_categorical(df["canonical_category"])
 
     # Build two fact sets
     actual = pd.DataFrame({
         "month_start": df["month_start"],
         "department": df["department"],
-        "category": df["canonical_category"],
+        "category": category,
         "scenario": "Actual",
-        "amount": df[actual_col].apply(_to_number),
+        "amount_cents": parse_cents(df[actual_col]).values,
         "source": "kaggle_budget_vs_actual"
     })
 
     budget = pd.DataFrame({
         "month_start": df["month_start"],
         "department": df["department"],
-        "category": df["canonical_category"],
+        "category": category,
         "scenario": "Budget",
-        "amount": df[budget_col].apply(_to_number),
+        "amount_cents": parse_cents(df[budget_col]).values,
         "source": "kaggle_budget_vs_actual"
     })
 
     out = pd.concat([actual, budget], ignore_index=True)
-    out = out.dropna(subset=["month_start", "amount"])
+    out = out.dropna(subset=["month_start", "amount_cents"])
+    categorize(out, ["scenario", "source"])
 
-    # Aggregate monthly
+    # Aggregate monthly in integer cents (categorical keys: only observed combinations)
     out = (
-        out.groupby(["month_start", "department", "category", "scenario", "source"], as_index=False)
-           .agg(amount=("amount", "sum"))
+        out.groupby(["month_start", "department", "category", "scenario", "source"], as_index=False, observed=True)
+           .agg(amount_cents=("amount_cents", "sum"))
     )
+    out["amount"] = cents_to_amount(out.pop("amount_cents"))
 
     return out
@@ -0,0 +1,288 @@
+# src/transform_plan.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.amounts import parse_cents
+from src.categorical import as_categorical, is_categorical
+from src.dates import to_dates
+from src.dq import REJECT_COLUMNS, DQRule, evaluate_rules
+from src.merge import DUPLICATE_POLICIES
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_COLUMN_MAPS_PATH = ROOT / "config" / "column_maps.yml"
+
+COLUMN_TYPES = ("int", "pk_text", "date", "amount", "category", "passthrough")
+
+
+def _hash_input(s: pd.Series) -> pd.Series:
+    """
+    String form of a column for hashing ('' for missing), as a categorical.
+    A categorical hashes exactly like its string values, so str() runs once per distinct
+    value and each row only costs an integer code.
+    """
+    if is_categorical(s):
+        cats = s.cat.rename_categories(s.cat.categories.astype(str))
+        if "" not in cats.cat.categories:
+            cats = cats.cat.add_categories("")
+        return cats.fillna("")
+
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    categories = pd.Index(uniques, dtype=object).astype(str)
+    if "" in categories:
+        blank = categories.get_loc("") if categories.is_unique else -1
+    else:
+        blank = len(categories)
+        categories = categories.append(pd.Index([""], dtype=object))
+    if not categories.is_unique or blank < 0:
+        # Distinct values with the same string form (e.g. 1 and "1"): hash the strings directly
+        return s.fillna("").astype(str)
+
+    codes = np.where(codes < 0, blank, codes)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=s.index)
+
+
+def compute_row_hash(df: pd.DataFrame, cols: List[str]) -> pd.Series:
+    """
+    Fast fingerprint of selected columns.
+    Uses pandas hashing for speed and stability within pandas.
+    Returns a hex string (16 chars).
+    """
+    # Build the hash input column by column; the source frame is never copied
+    base = pd.DataFrame({c: _hash_input(df[c]) for c in cols}, index=df.index, copy=False)
+
+    h = pd.util.hash_pandas_object(base, index=False).astype("uint64")
+    # Hex-encode all hashes in one buffer instead of formatting row by row
+    hex_buf = h.to_numpy().astype(">u8").tobytes().hex().encode("ascii")
+    return pd.Series(np.frombuffer(hex_buf, dtype="S16").astype("U16"), index=h.index).astype(str)
+
+
+def clean_pk_series(series: pd.Series) -> pd.Series:
+    """Clean a would-be PK column into a nullable string series (reject NaN/blank/'nan')."""
+    s = series.where(~series.isna(), pd.NA)
+    s = s.astype("string").str.strip()
+    bad = s.isna() | (s == "") | (s.str.lower().isin(["nan", "none"]))
+    s = s.where(~bad, pd.NA)
+    return s
+
+
+@dataclass(frozen=True)
+class ColumnRule:
+    target: str
+    source: str
+    type: str = "passthrough"
+    strip: bool = True  # category only: strip whitespace from categories
+
+
+@dataclass
+class StagingBuild:
+    frame: pd.DataFrame
+    unparseable: Dict[str, int] = field(default_factory=dict)  # amount column -> unparseable count
+    rejects: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=REJECT_COLUMNS))
+    rejected_rows: int = 0
+
+    def reject_counts(self) -> Dict[str, int]:
+        """Reject log entries per rule code."""
+        if self.rejects.empty:
+            return {}
+        return {str(k): int(v) for k, v in self.rejects["rule_code"].value_counts().items()}
+
+
+@dataclass(frozen=True)
+class StagingPlan:
+    """
+    Compiled staging plan for one source, built from column_maps.yml.
+    build() makes the staging frame in a single pass over the raw frame's columns.
+    """
+    name: str
+    label: str
+    table: str
+    pk_col: str
+    date_col: Optional[str]
+    required: Tuple[str, ...]
+    columns: Tuple[ColumnRule, ...]
+    hash_cols: Tuple[str, ...]
+    protected_cols: Tuple[str, ...]
+    meta_cols: Tuple[str, ...]
+    duplicate_policy: str = "last"
+    surrogate_col: Optional[str] = None  # BIGINT key column resolved from the PK via etl_key_dictionary
+    hash_col: str = "row_hash"
+    file_patterns: Tuple[str, ...] = ()  # globs that find this source's raw files in a directory
+
+    @property
+    def staging_cols(self) -> List[str]:
+        return [r.target for r in self.columns]
+
+    @property
+    def compare_cols(self) -> List[str]:
+        return self.staging_cols + [self.hash_col]
+
+    @property
+    def key_space(self) -> str:
+        """Namespace of this source's PKs in etl_key_dictionary."""
+        return f"{self.table}.{self.pk_col}"
+
+    @property
+    def money_cols(self) -> List[str]:
+        """Amount columns, carried as Int64 cents in the staging frame."""
+        return [r.target for r in self.columns if r.type == "amount"]
+
+    @property
+    def categorical_source_cols(self) -> List[str]:
+        """Raw columns worth reading straight into categoricals."""
+        return [r.source for r in self.columns if r.type == "category"]
+
+    def find_files(self, directory: Path, recursive: bool = False) -> List[Path]:
+        """Raw files for this source under directory (file_patterns), sorted by path."""
+        directory = Path(directory)
+        found = {
+            p
+            for pattern in self.file_patterns
+            for p in (directory.rglob(pattern) if recursive else directory.glob(pattern))
+            if p.is_file()
+        }
+        return sorted(found)
+
+    def source_of(self, target: str) -> str:
+        for r in self.columns:
+            if r.target == target:
+                return r.source
+        raise KeyError(f"[{self.name}] no staging column '{target}'")
+
+    def _convert(self, rule: ColumnRule, raw: pd.Series, unparseable: Dict[str, int]) -> pd.Series:
+        if rule.type == "int":
+            return pd.to_numeric(raw, errors="coerce").astype("Int64")
+        if rule.type == "pk_text":
+            return clean_pk_series(raw)
+        if rule.type == "date":
+            return to_dates(raw, source=f"{self.label}.{rule.source}")
+        if rule.type == "amount":
+            parsed = parse_cents(raw)
+            unparseable[rule.target] = parsed.unparseable
+            return parsed.values
+        if rule.type == "category":
+            return as_categorical(raw, strip=rule.strip)
+        return raw
+
+    def build(self, df: pd.DataFrame, rules: Sequence[DQRule] = ()) -> StagingBuild:
+        """
+        Build the staging frame (staging columns + row hash) from a raw frame.
+
+        Each staging column is converted straight from its source column into the new frame;
+        the raw frame is never copied. Missing optional source columns load as NULL.
+        Rows without a PK (PK_MISSING) or failing a data-quality rule are left out of the
+        frame and returned in the reject log.
+        """
+        unparseable: Dict[str, int] = {}
+        data: Dict[str, Any] = {}
+        for rule in self.columns:
+            if rule.source in df.columns:
+                data[rule.target] = self._convert(rule, df[rule.source], unparseable)
+            else:
+                data[rule.target] = pd.Series(None, index=df.index, dtype=object)
+
+        # copy=False: adopt the converted columns as-is instead of consolidating them into new blocks
+        stg = pd.DataFrame(data, index=df.index, copy=False)
+
+        pk_rule = next(r for r in self.columns if r.target == self.pk_col)
+        checks = (DQRule(code="PK_MISSING", kind="not_null", column=self.pk_col),) + tuple(rules)
+        dq = evaluate_rules(
+            stg,
+            checks,
+            pk_col=self.pk_col,
+            raw=df,
+            source_of=self.source_of,
+            money_cols=self.money_cols,
+        )
+        if not dq.valid.all():
+            stg = stg.loc[dq.valid]
+        if pk_rule.type == "int":
+            stg[self.pk_col] = stg[self.pk_col].astype(int)
+
+        stg[self.hash_col] = compute_row_hash(stg, list(self.hash_cols))
+        return StagingBuild(frame=stg, unparseable=unparseable, rejects=dq.rejects, rejected_rows=dq.rejected_rows)
+
+
+def compile_staging_plan(name: str, spec: Dict[str, Any]) -> StagingPlan:
+    """Compile one source's `staging:` section; raises ValueError on an invalid spec."""
+    columns: List[ColumnRule] = []
+    for target, rule in (spec.get("columns") or {}).items():
+        rule = rule or {}
+        col_type = rule.get("type", "passthrough")
+        if col_type not in COLUMN_TYPES:
+            raise ValueError(f"[{name}] column '{target}': unknown type '{col_type}'. Expected one of {COLUMN_TYPES}")
+        columns.append(
+            ColumnRule(
+                target=str(target),
+                source=str(rule.get("source", target)),
+                type=col_type,
+                strip=bool(rule.get("strip", True)),
+            )
+        )
+
+    targets = {c.target for c in columns}
+    pk_col = spec.get("pk")
+    if pk_col not in targets:
+        raise ValueError(f"[{name}] pk '{pk_col}' must be one of the staging columns: {sorted(targets)}")
+
+    hash_cols = tuple(spec.get("hash") or [])
+    unknown = [c for c in hash_cols if c not in targets]
+    if unknown:
+        raise ValueError(f"[{name}] hash columns not in staging columns: {unknown}")
+
+    duplicate_policy = str(spec.get("duplicates", "last"))
+    if duplicate_policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"[{name}] duplicates must be one of {DUPLICATE_POLICIES}, got '{duplicate_policy}'")
+
+    surrogate_col = spec.get("surrogate_key")
+    if surrogate_col in targets:
+        raise ValueError(f"[{name}] surrogate_key '{surrogate_col}' must not be a staging column")
+
+    return StagingPlan(
+        name=name,
+        label=str(spec.get("label", name)),
+        table=str(spec["table"]),
+        pk_col=str(pk_col),
+        date_col=spec.get("date"),
+        required=tuple(spec.get("required") or []),
+        columns=tuple(columns),
+        hash_cols=hash_cols,
+        protected_cols=tuple(spec.get("protected") or []),
+        meta_cols=tuple(spec.get("meta") or ["source_row_num"]),
+        duplicate_policy=duplicate_policy,
+        surrogate_col=str(surrogate_col) if surrogate_col else None,
+        file_patterns=tuple(str(p) for p in spec.get("files") or [f"*{name}*.csv"]),
+    )
+
+
+# resolved path -> (mtime_ns, plans)
+_CACHE: Dict[Path, Tuple[int, Dict[str, StagingPlan]]] = {}
+
+
+def load_transform_plans(path: Path = DEFAULT_COLUMN_MAPS_PATH) -> Dict[str, StagingPlan]:
+    """
+    Compile every source in column_maps.yml that has a `staging:` section, keyed by source name.
+    Compiled once per file version (mtime).
+    """
+    path = Path(path).resolve()
+    mtime_ns = path.stat().st_mtime_ns
+
+    cached = _CACHE.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
+    cfg = yaml.safe_load(path.read_text()) or {}
+    plans = {
+        str(name): compile_staging_plan(str(name), section["staging"])
+        for name, section in cfg.items()
+        if isinstance(section, dict) and section.get("staging")
+    }
+    _CACHE[path] = (mtime_ns, plans)
+    return plans
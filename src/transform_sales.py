@@ -1,41 +1,26 @@
 import pandas as pd
-from dateutil import parser
 
-def _to_month_start(x) -> str | None:
-    if pd.isna(x):
-        return None
-    try:
-        dt = parser.parse(str(x))
-        # month start
-        return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0).date().isoformat()
-    except Exception:
-        return None
-
-def _to_number(x):
-    if pd.isna(x):
-        return None
-    s = str(x).strip().replace("$", "").replace(",", "")
-    if s.startswith("(") and s.endswith(")"):
-        s = "-" + s[1:-1]
-    try:
-        return float(s)
-    except Exception:
-        return None
+from src.amounts import cents_to_amount, parse_cents
+from src.categorical import categorize
+from src.dates import month_start_strings
 
 def transform_sales_to_fact(df: pd.DataFrame, date_col: str, revenue_col: str) -> pd.DataFrame:
     out = pd.DataFrame()
-    out["month_start"] = df[date_col].apply(_to_month_start)
+    out["month_start"] = month_start_strings(df[date_col], source=f"sales.{date_col}")
     out["department"] = "Sales"
     out["category"] = "Revenue"
     out["scenario"] = "Actual"
-    out["amount"] = df[revenue_col].apply(_to_number)
+    out["amount_cents"] = parse_cents(df[revenue_col]).values
 
     # drop invalid
-    out = out.dropna(subset=["month_start", "amount"])
+    out = out.dropna(subset=["month_start", "amount_cents"])
+    categorize(out, ["department", "category", "scenario"])
 
-    # aggregate monthly
-    out = (out.groupby(["month_start","department","category","scenario"], as_index=False)
-              .agg(amount=("amount","sum")))
+    # aggregate monthly in integer cents (exact, order-independent), then back to currency units
+    out = (out.groupby(["month_start","department","category","scenario"], as_index=False, observed=True)
+              .agg(amount_cents=("amount_cents","sum")))
+    out["amount"] = cents_to_amount(out.pop("amount_cents"))
 
     out["source"] = "kaggle_sales_2025"
+    categorize(out, ["source"])
     return out
@@ -0,0 +1,27 @@
+# tests/test_amounts.py
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pandas as pd
+
+from src.amounts import decimal_to_cents, parse_amounts, parse_cents, to_cents
+
+
+def test_accounting_negative_behind_a_currency_symbol():
+    parsed = parse_amounts(pd.Series(["$(1,234.50)", "($1,234.50)", "(4) €", "$4"]))
+    assert parsed.values.tolist() == [-1234.5, -1234.5, -4.0, 4.0]
+    assert parsed.unparseable == 0
+
+
+def test_cents_round_half_away_from_zero_like_numeric():
+    raw = pd.Series(["0.125", "1.005", "-1.005", "2.675", "0.115", "10.5", "1.004", "$1,234.565", ""])
+    cents = parse_cents(raw).values
+    assert cents.tolist() == [13, 101, -101, 268, 12, 1050, 100, 123457, pd.NA]
+    # the same amounts already parsed as floats by read_csv
+    floats = pd.to_numeric(raw.str.replace("[$,]", "", regex=True), errors="coerce")
+    assert to_cents(floats).tolist() == cents.tolist()
+
+
+def test_decimal_to_cents_matches_to_cents():
+    assert [decimal_to_cents(v) for v in (Decimal("0.125"), Decimal("12.34"), 1.005, None)] == [13, 1234, 101, None]
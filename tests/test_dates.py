@@ -0,0 +1,29 @@
+# tests/test_dates.py
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+
+from src.dates import clear_format_cache, to_dates
+
+
+def test_cached_format_is_redetected_when_the_next_file_switches_layout():
+    clear_format_cache()
+    day_first = pd.Series(["13/01/2024", "02/03/2024", "25/12/2024"])
+    assert to_dates(day_first, source="budget.Date").tolist() == [date(2024, 1, 13), date(2024, 3, 2), date(2024, 12, 25)]
+
+    # same source, month-first file: mostly ambiguous values, but one that only fits month-first
+    month_first = pd.Series(["01/02/2024", "03/04/2024", "05/06/2024", "07/08/2024", "01/13/2024"])
+    assert to_dates(month_first, source="budget.Date").tolist() == [
+        date(2024, 1, 2), date(2024, 3, 4), date(2024, 5, 6), date(2024, 7, 8), date(2024, 1, 13),
+    ]
+
+
+def test_cached_format_is_kept_when_it_parses_the_file():
+    clear_format_cache()
+    to_dates(pd.Series(["13/01/2024"]), source="budget.Date")
+    # ambiguous values keep the source's day-first layout
+    assert to_dates(pd.Series(["01/02/2024"]), source="budget.Date").tolist() == [date(2024, 2, 1)]
+    # unparseable values do not displace it
+    assert to_dates(pd.Series(["02/01/2024", "n/a"]), source="budget.Date").tolist() == [date(2024, 1, 2), None]
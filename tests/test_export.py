@@ -0,0 +1,39 @@
+# tests/test_export.py
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from src.bootstrap_gold import bootstrap_fact_from_gold_csv
+from src.export import export_gold_columnar
+
+GOLD_ROWS = """month_start,department,category,scenario,amount,source
+2022-01-01,Sales,Revenue,Actual,1234.5600000000002,sales_orders
+2022-02-01,Sales,Revenue,Actual,0.30000000000000004,sales_orders
+"""
+
+
+def test_float_gold_amounts_land_on_the_cent(pg_engine, tmp_path):
+    gold = tmp_path / "gold_fact_finance.csv"
+    gold.write_text(GOLD_ROWS)
+    bootstrap_fact_from_gold_csv(pg_engine, gold_csv_path=gold)
+
+    with pg_engine.begin() as conn:
+        amounts = conn.execute(text("SELECT amount FROM fact_finance_monthly ORDER BY month_start")).scalars().all()
+    assert amounts == [Decimal("1234.56"), Decimal("0.30")]
+
+
+def test_columnar_export_rounds_unrounded_fact_amounts(pg_engine, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    gold = tmp_path / "gold_fact_finance.csv"
+    gold.write_text(GOLD_ROWS)
+    bootstrap_fact_from_gold_csv(pg_engine, gold_csv_path=gold)
+    # a fact row bootstrapped before amounts were rounded
+    with pg_engine.begin() as conn:
+        conn.execute(text("UPDATE fact_finance_compact SET amount = 1234.5600000000002 WHERE month_start = '2022-01-01'"))
+
+    out = tmp_path / "gold_fact_finance.parquet"
+    assert export_gold_columnar(pg_engine, out) == 2
+    assert pq.read_table(out).column("amount").to_pylist() == [Decimal("1234.56"), Decimal("0.30")]
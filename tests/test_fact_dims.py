@@ -0,0 +1,48 @@
+# tests/test_fact_dims.py
+from __future__ import annotations
+
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from src.fact_dims import ensure_fact_storage
+
+
+def test_baseline_fact_table_is_migrated(pg_engine):
+    # fact_finance_monthly as the baseline schema created it: a table, no row_count
+    with pg_engine.begin() as conn:
+        conn.execute(text("DROP VIEW fact_finance_monthly"))
+        conn.execute(text("""
+            CREATE TABLE fact_finance_monthly (
+              month_start DATE NOT NULL,
+              department TEXT NOT NULL,
+              category TEXT NOT NULL,
+              scenario TEXT NOT NULL,
+              amount NUMERIC NOT NULL,
+              source TEXT NOT NULL,
+              last_change_event_id UUID,
+              last_updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+              PRIMARY KEY (month_start, department, category, scenario, source)
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO fact_finance_monthly (month_start, department, category, scenario, amount, source)
+            VALUES ('2022-01-01', 'Sales', 'Revenue', 'Actual', 1234.56, 'sales_orders'),
+                   ('2022-01-01', 'Ops', 'Travel', 'Budget', 99.00, 'budget_vs_actual')
+        """))
+        conn.execute(text("CREATE VIEW fact_report AS SELECT month_start, sum(amount) AS amount FROM fact_finance_monthly GROUP BY 1"))
+
+    assert ensure_fact_storage(pg_engine)
+    assert not ensure_fact_storage(pg_engine)
+
+    with pg_engine.begin() as conn:
+        assert conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('fact_finance_monthly')")).scalar() == "v"
+        rows = conn.execute(text("""
+            SELECT department, category, scenario, source, amount, row_count
+            FROM fact_finance_monthly ORDER BY department
+        """)).all()
+        assert [tuple(r) for r in rows] == [
+            ("Ops", "Travel", "Budget", "budget_vs_actual", Decimal("99.00"), None),
+            ("Sales", "Revenue", "Actual", "sales_orders", Decimal("1234.56"), None),
+        ]
+        assert conn.execute(text("SELECT amount FROM fact_report")).scalar() == Decimal("1333.56")
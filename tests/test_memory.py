@@ -0,0 +1,121 @@
+# tests/test_memory.py
+"""
+Peak memory of a dry-run run_import relative to its input size (the copy-on-write path, see
+src/cow.py). Dry run only: it needs no database and covers read, build, hash and merge
+classification, not the merge writes, the fact update or the export.
+
+The import runs in a fresh interpreter so ru_maxrss only sees it; the database is stubbed
+with an engine that returns no rows, so every staged row is classified as new. A real import
+also buffers every changed row's upsert parameters and audit images in merge_upsert before
+writing them (about 1.2 GiB for the 27 MiB input here), which this bound does not cover.
+"""
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+SAMPLE_BUDGET = ROOT / "data" / "raw" / "budget_vs_actual.csv"
+
+BUDGET_ROWS = 400_000
+# Peak RSS growth during the dry run, as a multiple of the input files' size on disk
+# (about 9.5x at 400k rows here; read_csv's own peak is most of it)
+MAX_RSS_MULTIPLE = 12
+
+_SCRIPT = r"""
+import json, resource, sys
+from contextlib import contextmanager
+from pathlib import Path
+
+root, sales_path, budget_path = sys.argv[1:4]
+sys.path.insert(0, root)
+import src.pipeline as P
+
+
+class _Result:
+    def mappings(self):
+        return self
+
+    def all(self):
+        return []
+
+    def first(self):
+        return None
+
+
+class _Conn:
+    def execute(self, *args, **kwargs):
+        return _Result()
+
+
+class _Engine:
+    @contextmanager
+    def begin(self):
+        yield _Conn()
+
+
+class _Ctx:
+    change_event_id = "00000000-0000-0000-0000-000000000000"
+
+
+P.load_db_config = lambda path: None
+P.make_engine = lambda cfg: _Engine()
+P.apply_schema = lambda engine, path: None
+P.ensure_fact_storage = lambda engine: None
+P.start_change_event = lambda engine, **kw: _Ctx()
+P.finish_change_event = lambda engine, **kw: None
+P.create_state_image = None
+
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+res = P.run_import(sales_path=Path(sales_path), budget_path=Path(budget_path), dry_run=True)
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"status": res["status"], "inserted": res["inserted"], "base_kb": base, "peak_kb": peak}))
+"""
+
+
+def _write_inputs(tmp_path: Path) -> tuple:
+    budget = pd.read_csv(SAMPLE_BUDGET, dtype=str)
+    reps = -(-BUDGET_ROWS // len(budget))
+    big = pd.concat([budget] * reps, ignore_index=True).iloc[:BUDGET_ROWS]
+    big["Transaction ID"] = [f"TXN{i:09d}" for i in range(len(big))]
+    budget_path = tmp_path / "budget_big.csv"
+    big.to_csv(budget_path, index=False)
+
+    sales = pd.DataFrame(
+        {
+            "order_id": range(1, 1001),
+            "order_date": big["Date"].iloc[:1000].to_numpy(),
+            "region": "North",
+            "payment_method": "Card",
+            "revenue": "100.00",
+        }
+    )
+    sales_path = tmp_path / "sales_small.csv"
+    sales.to_csv(sales_path, index=False)
+    return sales_path, budget_path
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="resource.getrusage is POSIX only")
+def test_dry_run_peak_rss_is_bounded_by_input_size(tmp_path):
+    sales_path, budget_path = _write_inputs(tmp_path)
+    input_bytes = sales_path.stat().st_size + budget_path.stat().st_size
+
+    proc = subprocess.run(
+        [sys.executable, "-c", _SCRIPT, str(ROOT), str(sales_path), str(budget_path)],
+        capture_output=True, text=True, timeout=600,
+    )
+    assert proc.returncode == 0, proc.stderr
+    out = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    assert out["status"] == "DRY_RUN"
+    assert out["inserted"] == BUDGET_ROWS + 1000
+    # ru_maxrss is KiB on Linux
+    growth = (out["peak_kb"] - out["base_kb"]) * 1024
+    assert growth < MAX_RSS_MULTIPLE * input_bytes, (
+        f"peak RSS grew {growth / 2**20:.0f} MiB for {input_bytes / 2**20:.0f} MiB of input"
+    )
@@ -0,0 +1,131 @@
+# tests/test_pipeline.py
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+import src.pipeline as pipeline
+from src.fact_delta import verify_fact
+from src.fact_query import FactQueryAPI, fact_version
+from src.state import rollback_change_event
+
+from tests.conftest import ROOT
+
+
+def _count(engine, sql: str) -> int:
+    with engine.begin() as conn:
+        return int(conn.execute(text(sql)).scalar())
+
+
+def _fail(*args, **kwargs):
+    raise RuntimeError("connection lost")
+
+
+def test_rerun_with_dq_rejects_is_no_changes(run_import, pg_engine, sample_paths):
+    first = run_import(source_paths=sample_paths)
+    assert first["status"] == "SUCCESS"
+    assert first["diff_summary"]["budget"]["dq_rejected_count"] > 0
+    logged = _count(pg_engine, "SELECT count(*) FROM etl_rejected_rows")
+    assert logged > 0
+
+    second = run_import(source_paths=sample_paths)
+    assert second["status"] == "NO_CHANGES"
+    assert second["rejected"] == first["rejected"]
+    # the same rejects are not logged again
+    assert _count(pg_engine, "SELECT count(*) FROM etl_rejected_rows") == logged
+
+
+def test_failed_fact_update_is_repaired_by_next_import(run_import, pg_engine, sample_paths, tmp_path, monkeypatch):
+    run_import(source_paths=sample_paths, fact_mode="incremental")
+
+    budget = pd.read_csv(sample_paths["budget_actual"], dtype=str)
+    budget.loc[:99, "Actual Amount"] = "1"
+    changed = dict(sample_paths, budget_actual=tmp_path / "budget_changed.csv")
+    budget.to_csv(changed["budget_actual"], index=False)
+
+    with monkeypatch.context() as m:
+        m.setattr(pipeline, "apply_fact_deltas", _fail)
+        with pytest.raises(RuntimeError):
+            run_import(source_paths=changed, fact_mode="incremental")
+    # staging committed, the fact did not follow
+    assert not verify_fact(pg_engine).empty
+    assert _count(pg_engine, "SELECT count(*) FROM fact_pending_months") > 0
+
+    # the same file again: staging already matches, the left-behind months are rebuilt
+    res = run_import(source_paths=changed, fact_mode="incremental")
+    assert res["status"] == "SUCCESS"
+    assert res["inserted"] == 0 and res["updated"] == 0
+    assert verify_fact(pg_engine).empty
+    assert _count(pg_engine, "SELECT count(*) FROM fact_pending_months") == 0
+
+
+def test_escalated_rebuild_exports_every_month(run_import, pg_engine, sample_paths, tmp_path, monkeypatch):
+    run_import(source_paths=sample_paths, fact_mode="incremental")
+
+    budget = pd.read_csv(sample_paths["budget_actual"], dtype=str)
+    budget.loc[:99, "Actual Amount"] = "1"
+    changed = dict(sample_paths, budget_actual=tmp_path / "budget_changed.csv")
+    budget.to_csv(changed["budget_actual"], index=False)
+
+    with monkeypatch.context() as m:
+        m.setattr(pipeline, "apply_fact_deltas", _fail)
+        with pytest.raises(RuntimeError):
+            run_import(source_paths=changed, fact_mode="incremental")
+
+    # the pending months' rebuild escalates to a full one: the export must check every month
+    rebuild, export = pipeline.rebuild_fact_months, pipeline.export_gold_partitions
+    exported = []
+
+    def _export(*args, **kwargs):
+        exported.append(kwargs["months"])
+        return export(*args, **kwargs)
+
+    monkeypatch.setattr(pipeline, "rebuild_fact_months", lambda **kw: rebuild(**kw, full_threshold=0.0))
+    monkeypatch.setattr(pipeline, "export_gold_partitions", _export)
+    res = run_import(source_paths=changed, fact_mode="incremental")
+
+    assert res["fact_summary"]["rebuild_scope"] == "full"
+    assert exported == [None]
+    assert verify_fact(pg_engine).empty
+
+
+def test_rollback_moves_the_fact_and_its_version(run_import, pg_engine, sample_paths, tmp_path):
+    run_import(source_paths=sample_paths)
+    original = FactQueryAPI(pg_engine).fact()
+
+    budget = pd.read_csv(sample_paths["budget_actual"], dtype=str)
+    budget.loc[:99, "Actual Amount"] = "1"
+    changed = dict(sample_paths, budget_actual=tmp_path / "budget_changed.csv")
+    budget.to_csv(changed["budget_actual"], index=False)
+    res = run_import(source_paths=changed)
+    assert res["updated"] > 0
+
+    api = FactQueryAPI(pg_engine)
+    assert not api.fact().equals(original)
+    version = fact_version(pg_engine)
+
+    rolled = rollback_change_event(pg_engine, res["change_event_id"])
+    assert rolled["fact_months"]
+    assert fact_version(pg_engine) > version
+    assert verify_fact(pg_engine).empty
+    # the cached API serves the rolled-back fact, not the cached one
+    pd.testing.assert_frame_equal(api.fact(), original)
+    assert _count(pg_engine, "SELECT count(*) FROM fact_pending_months") == 0
+
+
+def test_category_map_change_alone_is_exported(run_import, pg_engine, sample_paths, tmp_path):
+    first = run_import(source_paths=sample_paths)
+    gold = pd.read_csv(first["gold_path"])
+    assert "Payroll" in set(gold["category"])
+
+    category_map = tmp_path / "category_map.csv"
+    text_map = (ROOT / "config" / "category_map.csv").read_text()
+    category_map.write_text(text_map.replace("Salaries,Payroll,HR", "Salaries,Wages,HR"))
+
+    res = run_import(source_paths=sample_paths, category_map_path=category_map)
+    assert res["status"] == "SUCCESS"
+    assert res["inserted"] == 0 and res["updated"] == 0
+    assert res["fact_summary"]["category_map_rebuilt_months"]
+    gold = pd.read_csv(res["gold_path"])
+    assert "Wages" in set(gold["category"]) and "Payroll" not in set(gold["category"])
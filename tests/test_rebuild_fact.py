@@ -0,0 +1,165 @@
+# tests/test_rebuild_fact.py
+from __future__ import annotations
+
+import re
+
+import pytest
+from sqlalchemy import text
+
+from src.bootstrap_gold import bootstrap_fact_from_gold_csv
+from src.fact_delta import verify_fact
+from src.fact_query import FactQueryAPI, fact_version
+from src.rollups import verify_rollups
+from src.rebuild_fact import (
+    explain_rebuild,
+    plan_rebuild,
+    rebuild_fact_months,
+    rebuild_fact_shadow,
+    staging_covers_fact,
+)
+
+from tests.conftest import ROOT
+
+GOLD_CSV = ROOT / "data" / "gold" / "gold_fact_finance.csv"
+
+
+def _scans(plan: str, table: str) -> int:
+    """Scan nodes reading `table` itself (index scans included, bitmap index probes not)."""
+    return len(re.findall(rf"Scan (?:using \S+ )?on {table}\b", plan))
+
+
+@pytest.fixture
+def loaded(run_import, pg_engine, sample_paths):
+    run_import(source_paths=sample_paths)
+    with pg_engine.begin() as conn:
+        conn.execute(text("ANALYZE stg_budget_transactions"))
+        conn.execute(text("ANALYZE stg_sales_orders"))
+    return pg_engine
+
+
+def test_scoped_aggregate_is_one_index_range_scan_per_table(loaded):
+    plan = "\n".join(explain_rebuild(loaded, ["2023-03-01"]))
+
+    # actuals and budgets come from a single pass over the budget table
+    assert _scans(plan, "stg_budget_transactions") == 1
+    assert _scans(plan, "stg_sales_orders") == 1
+    # the month filter is a range on the plain date index, not a date_trunc() filter
+    assert "idx_stg_budget_transactions_date" in plan
+    assert "idx_stg_sales_orders_order_date" in plan
+    assert "Seq Scan on stg_budget_transactions" not in plan
+    assert "date_trunc" not in plan
+
+
+def test_full_aggregate_is_one_scan_per_table(loaded):
+    plan = "\n".join(explain_rebuild(loaded, None))
+
+    assert _scans(plan, "stg_budget_transactions") == 1
+    assert _scans(plan, "stg_sales_orders") == 1
+
+
+def test_planner_replaces_table_only_when_staging_covers_it(loaded):
+    with loaded.begin() as conn:
+        assert staging_covers_fact(conn)
+        assert plan_rebuild(conn, ["2023-03-01"]).scope == "months"
+        full = plan_rebuild(conn, None)
+    assert full.scope == "full" and full.replace_table
+
+    # a fact row no staging row stands behind (e.g. bootstrapped history)
+    with loaded.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO fact_finance_compact (month_start, department_id, category_id, scenario_id, source_id, amount)
+            SELECT DATE '2019-01-01', department_id, category_id, scenario_id, source_id, 1
+            FROM fact_finance_compact LIMIT 1
+        """))
+        assert not staging_covers_fact(conn)
+        full = plan_rebuild(conn, None)
+    assert full.scope == "full" and not full.replace_table
+
+
+def test_shadow_swap_keeps_views_rollups_and_table_properties(loaded):
+    with loaded.begin() as conn:
+        conn.execute(text("DROP ROLE IF EXISTS etl_test_reader"))
+        conn.execute(text("CREATE ROLE etl_test_reader"))
+    try:
+        with loaded.begin() as conn:
+            conn.execute(text("GRANT SELECT ON fact_finance_monthly TO etl_test_reader"))
+            conn.execute(text("GRANT SELECT ON fact_finance_compact TO etl_test_reader"))
+            conn.execute(text("GRANT SELECT ON fact_finance_quarterly TO etl_test_reader"))
+            conn.execute(text("COMMENT ON VIEW fact_finance_monthly IS 'finance facts'"))
+            conn.execute(text("COMMENT ON COLUMN fact_finance_compact.amount IS 'cents-rounded'"))
+            view_oid = conn.execute(text("SELECT CAST('fact_finance_monthly' AS regclass)::oid")).scalar()
+            before = conn.execute(text("SELECT count(*), sum(amount) FROM fact_finance_monthly")).one()
+            event_id = conn.execute(text("SELECT change_event_id FROM etl_change_events ORDER BY started_at DESC LIMIT 1")).scalar()
+
+        rebuild_fact_shadow(engine=loaded, change_event_id=str(event_id))
+
+        with loaded.begin() as conn:
+            assert conn.execute(text("SELECT CAST('fact_finance_monthly' AS regclass)::oid")).scalar() == view_oid
+            assert conn.execute(text("SELECT count(*), sum(amount) FROM fact_finance_monthly")).one() == before
+            for rel in ("fact_finance_monthly", "fact_finance_compact", "fact_finance_quarterly"):
+                assert conn.execute(
+                    text("SELECT has_table_privilege('etl_test_reader', CAST(:r AS regclass), 'SELECT')"), {"r": rel}
+                ).scalar()
+            assert conn.execute(text("SELECT obj_description(CAST('fact_finance_monthly' AS regclass), 'pg_class')")).scalar() == "finance facts"
+            assert conn.execute(text("""
+                SELECT col_description(CAST('fact_finance_compact' AS regclass), a.attnum)
+                FROM pg_attribute a WHERE a.attrelid = CAST('fact_finance_compact' AS regclass) AND a.attname = 'amount'
+            """)).scalar() == "cents-rounded"
+            # the rollups were built beside the shadow and renamed in, under their live index names
+            assert conn.execute(text("SELECT to_regclass('fact_finance_quarterly_pkey') IS NOT NULL")).scalar()
+            assert not conn.execute(text("""
+                SELECT relname FROM pg_class
+                WHERE relnamespace = CAST(current_schema() AS regnamespace) AND relname LIKE '%\\_next%'
+            """)).all()
+        assert not any(verify_rollups(loaded).values())
+    finally:
+        with loaded.begin() as conn:
+            conn.execute(text("DROP OWNED BY etl_test_reader"))
+            conn.execute(text("DROP ROLE etl_test_reader"))
+
+
+def test_every_fact_write_moves_the_version(loaded):
+    with loaded.begin() as conn:
+        event_id = str(conn.execute(text("SELECT change_event_id FROM etl_change_events ORDER BY started_at DESC LIMIT 1")).scalar())
+    api = FactQueryAPI(loaded)
+    first = api.fact(start="2023-03-01", end="2023-03-01")
+    v0 = fact_version(loaded)
+    assert v0 > 0
+
+    assert api.fact(start="2023-03-01", end="2023-03-01") is first
+    assert fact_version(loaded) == v0
+
+    rebuild_fact_months(engine=loaded, months=["2023-03-01"], change_event_id=event_id)
+    v1 = fact_version(loaded)
+    assert v1 > v0
+    assert api.fact(start="2023-03-01", end="2023-03-01") is not first
+
+    rebuild_fact_shadow(engine=loaded, change_event_id=event_id)
+    assert fact_version(loaded) > v1
+
+
+def test_full_rebuild_keeps_gold_history_without_staging(run_import, pg_engine, sample_paths):
+    bootstrap_fact_from_gold_csv(pg_engine, gold_csv_path=GOLD_CSV)
+
+    def _history():
+        """Bootstrapped 2025 sales: no staging row stands behind them."""
+        with pg_engine.begin() as conn:
+            return conn.execute(text("""
+                SELECT month_start, department, category, scenario, source, amount
+                FROM fact_finance_monthly WHERE month_start >= DATE '2025-01-01'
+                ORDER BY 1, 2, 3, 4, 5
+            """)).all()
+
+    before = _history()
+    assert len(before) == 12
+
+    # the sample files touch 2021-2024: 48 of the 60 bootstrapped months, so the rebuild goes full
+    res = run_import(source_paths=sample_paths)
+    assert res["fact_summary"]["rebuild_scope"] == "full"
+    assert _history() == before
+    assert verify_fact(pg_engine).empty
+
+    # an explicit full rebuild keeps them too
+    rebuild_fact_months(engine=pg_engine, months=None, change_event_id=res["change_event_id"])
+    assert _history() == before
+    assert verify_fact(pg_engine).empty